@@ -4,6 +4,71 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://user:password@db:5432/workflow_db")
+# Optional read replica; read-only lib calls and list endpoints are served from it
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL") or None
 SECRET_KEY = os.getenv("SECRET_KEY", "change-me-in-production-please")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 8  # 8 hours
+
+# Connection pool (per process; size it for API threads + executions + report workers)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds to wait for a free connection before raising
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Connections older than this many seconds are replaced (-1 disables)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Test connections on checkout, so restarted/failed-over databases don't surface as errors
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Server-side statement timeout in milliseconds, 0 disables (PostgreSQL only)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+# Rows per INSERT round trip of the bulk lib writes (response_data/prompts *_bulk)
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", "1000"))
+
+# Largest page size of paginated list endpoints (see core/pagination.py)
+LIST_MAX_LIMIT = int(os.getenv("LIST_MAX_LIMIT", "1000"))
+
+# Seconds the locked ids of an entity type are cached per process (see core/locks.py)
+LOCK_CACHE_TTL = float(os.getenv("LOCK_CACHE_TTL", "10"))
+
+# Report result cache (per-report TTL is configured via Report.meta["cache_ttl"])
+REPORT_CACHE_DEFAULT_TTL = int(os.getenv("REPORT_CACHE_DEFAULT_TTL", "0"))
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "256"))
+
+# Report run snapshots (see services/report_snapshots.py): compressed size limit and
+# how many snapshots are kept per report, parameter set and user
+REPORT_SNAPSHOT_MAX_BYTES = int(os.getenv("REPORT_SNAPSHOT_MAX_BYTES", str(16 * 1024 * 1024)))
+REPORT_SNAPSHOT_KEEP = int(os.getenv("REPORT_SNAPSHOT_KEEP", "3"))
+
+# Scheduled report pre-computation (see services/report_refresh.py). Off by default; on
+# PostgreSQL an advisory lock lets only one of the processes that enable it run schedules.
+REPORT_REFRESH_ENABLED = os.getenv("REPORT_REFRESH_ENABLED", "false").lower() in ("1", "true", "yes")
+REPORT_REFRESH_POLL_SECONDS = int(os.getenv("REPORT_REFRESH_POLL_SECONDS", "60"))
+# Daily run time (server local time) of schedules that don't list "times"
+REPORT_REFRESH_DEFAULT_TIME = os.getenv("REPORT_REFRESH_DEFAULT_TIME", "05:00")
+# Cache TTL of scheduled reports without an explicit cache_ttl (one daily cycle)
+REPORT_REFRESH_CACHE_TTL = int(os.getenv("REPORT_REFRESH_CACHE_TTL", "86400"))
+
+# Upper bound on reports generated concurrently for grouped exports
+REPORT_GROUP_MAX_WORKERS = int(os.getenv("REPORT_GROUP_MAX_WORKERS", "4"))
+
+# Background PDF rendering (WeasyPrint runs in separate worker processes)
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "2"))
+
+# Markdown -> HTML cache of report templates (see services/report_markdown.py)
+MARKDOWN_CACHE_MAX_ENTRIES = int(os.getenv("MARKDOWN_CACHE_MAX_ENTRIES", "4096"))
+
+# Rendered chart SVG cache (see services/chart_cache.py)
+CHART_CACHE_MAX_ENTRIES = int(os.getenv("CHART_CACHE_MAX_ENTRIES", "256"))
+CHART_CACHE_MAX_BYTES = int(os.getenv("CHART_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Line/area/scatter charts are downsampled above this many points (0 disables)
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "2000"))
+
+# Chart rendering worker processes (0 renders in the API process)
+CHART_RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Parameter option lists (form dropdowns backed by "@table" or SELECT sources)
+PARAMETER_OPTIONS_TTL = int(os.getenv("PARAMETER_OPTIONS_TTL", "30"))
+PARAMETER_OPTIONS_MAX_ENTRIES = int(os.getenv("PARAMETER_OPTIONS_MAX_ENTRIES", "512"))
+PARAMETER_OPTIONS_MAX_ROWS = int(os.getenv("PARAMETER_OPTIONS_MAX_ROWS", "10000"))
+PARAMETER_OPTIONS_MAX_WORKERS = int(os.getenv("PARAMETER_OPTIONS_MAX_WORKERS", "4"))
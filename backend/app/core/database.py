@@ -1,9 +1,212 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
-from .config import DATABASE_URL
+import bisect
+import re
+import threading
+import time
+from contextlib import contextmanager
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+from fastapi import Depends
+from sqlalchemy import Table, TextClause, create_engine, event, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.selectable import CompoundSelect, Select
+from sqlalchemy.sql.util import find_tables
+from .config import (
+    DATABASE_REPLICA_URL,
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_STATEMENT_TIMEOUT_MS,
+)
+
+# Table names read / written by raw SQL statements
+READ_TABLES_RE = re.compile(r'\b(?:FROM|JOIN)\s+(?:ONLY\s+)?["`]?(?:\w+["`]?\.["`]?)?(\w+)', re.IGNORECASE)
+WRITE_TABLE_RE = re.compile(
+    r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|TRUNCATE(?:\s+TABLE)?|ALTER\s+TABLE|DROP\s+TABLE(?:\s+IF\s+EXISTS)?)'
+    r'\s+(?:ONLY\s+)?["`]?(?:\w+["`]?\.["`]?)?(\w+)',
+    re.IGNORECASE,
+)
+_LOCKING_READ_RE = re.compile(r'\bFOR\s+(?:UPDATE|SHARE|NO\s+KEY\s+UPDATE|KEY\s+SHARE)\b', re.IGNORECASE)
+
+# Upper bounds (seconds) of the connection wait time histogram
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+class PoolMetrics:
+    """Counts how long checkouts waited for a connection (including connect time)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(POOL_WAIT_BUCKETS) + 1)
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def observe(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.counts[bisect.bisect_left(POOL_WAIT_BUCKETS, seconds)] += 1
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            labels = [f"<={b}s" for b in POOL_WAIT_BUCKETS] + [f">{POOL_WAIT_BUCKETS[-1]}s"]
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait": round(self.total_wait / self.checkouts, 6) if self.checkouts else 0.0,
+                "max_wait": round(self.max_wait, 6),
+                "wait_histogram": dict(zip(labels, self.counts)),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records checkout wait times in self.metrics."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.observe(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.observe(time.perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        # engine.dispose() replaces the pool; keep the counters
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def _engine_options(url: str) -> dict:
+    parsed = make_url(url)
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # In-memory SQLite keeps its single-connection pool
+        return options
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    if DB_STATEMENT_TIMEOUT_MS > 0 and parsed.get_backend_name() == "postgresql":
+        options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+def pool_stats(bind=None) -> dict:
+    """Live state of an engine's connection pool (default: the primary engine)."""
+    pool = (bind or engine).pool
+    stats = {"status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": pool._max_overflow,
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(metrics.snapshot())
+    return stats
+
+
+def _read_tables(clause):
+    """Tables of a plain (non-locking) SELECT, or None if the statement may write."""
+    if isinstance(clause, (Select, CompoundSelect)):
+        if getattr(clause, "_for_update_arg", None) is not None:
+            return None
+        return {t.name.lower() for t in find_tables(clause, include_aliases=True) if isinstance(t, Table)}
+    if isinstance(clause, TextClause):
+        sql = clause.text.lstrip()
+        if sql[:6].lower() != "select" or _LOCKING_READ_RE.search(sql):
+            return None
+        return {t.lower() for t in READ_TABLES_RE.findall(sql)}
+    return None
+
+
+def _written_tables(clause):
+    """Tables a non-SELECT statement writes; "*" when they can't be told."""
+    table = getattr(clause, "table", None)
+    if isinstance(table, Table):
+        return {table.name.lower()}
+    if isinstance(clause, TextClause):
+        match = WRITE_TABLE_RE.match(clause.text)
+        if match:
+            return {match.group(1).lower()}
+    return {"*"}
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to the replica engine (DATABASE_REPLICA_URL).
+
+    Only statements issued inside replica_reads() are routed: plain SELECTs that touch
+    no table this session has written go to the replica, everything else (writes,
+    flushes, SELECT ... FOR UPDATE) runs on the primary. Written tables are remembered
+    for the life of the session, so an execution, which shares one session (see
+    internal_libs/session_lib.py), always reads its own writes. Writes committed by
+    other sessions become visible on the replica after its replication lag.
+    Without a replica every statement runs on the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if replica_engine is not None and clause is not None:
+            tables = _read_tables(clause)
+            if tables is None:
+                self.info.setdefault("written_tables", set()).update(_written_tables(clause))
+            elif self.info.get("replica_reads") and not self._flushing:
+                written = self.info.get("written_tables", set())
+                if "*" not in written and not tables & written:
+                    return replica_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _remember_flushed_tables(session, flush_context):
+    if replica_engine is None:
+        return
+    written = session.info.setdefault("written_tables", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        written.update(t.name.lower() for t in inspect(obj).mapper.tables)
+
+
+@contextmanager
+def replica_reads(db):
+    """Lets the SELECTs `db` runs in this block go to the replica (see RoutingSession)."""
+    db.info["replica_reads"] = db.info.get("replica_reads", 0) + 1
+    try:
+        yield db
+    finally:
+        db.info["replica_reads"] -= 1
+
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+replica_engine = (
+    create_engine(DATABASE_REPLICA_URL, **_engine_options(DATABASE_REPLICA_URL))
+    if DATABASE_REPLICA_URL else None
+)
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 
 
 class Base(DeclarativeBase):
@@ -16,3 +219,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db(db: Session = Depends(get_db)):
+    """get_db for read-only endpoints: their SELECTs may be served by the replica."""
+    with replica_reads(db):
+        yield db
@@ -1,23 +1,110 @@
+"""
+Lock status of records (lock_data rows), resolved through an in-process cache.
+
+The ids locked for an entity type are loaded with one query and kept for
+LOCK_CACHE_TTL seconds, so list endpoints and check_is_locked answer from memory.
+/locks/toggle invalidates the cache of the toggled type; other API processes pick the
+change up when their entry expires. raise_if_locked guards writes and always asks the
+database.
+"""
+import threading
+import time
+import uuid
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
 from fastapi import HTTPException, status
+from sqlalchemy import and_, exists
 from sqlalchemy.orm import Session
-from sqlalchemy import exists, and_
+
+from .config import LOCK_CACHE_TTL
 from ..models.lock import LockData
-import uuid
+
+
+def _as_uuid(value: Any) -> uuid.UUID:
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+class LockCache:
+    def __init__(self, ttl: float = 10):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, FrozenSet[uuid.UUID]]] = {}
+        # Bumped by invalidate(), so a load that raced an invalidation is not stored
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def locked_ids(self, db: Session, entity_type: str) -> FrozenSet[uuid.UUID]:
+        """All locked ids of an entity type."""
+        with self._lock:
+            entry = self._entries.get(entity_type)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = (self._epoch, self._generations.get(entity_type, 0))
+        ids = frozenset(
+            _as_uuid(row.entity_id)
+            for row in db.query(LockData.entity_id).filter(LockData.entity_type == entity_type)
+        )
+        if self.ttl > 0:
+            with self._lock:
+                if generation == (self._epoch, self._generations.get(entity_type, 0)):
+                    self._entries[entity_type] = (time.monotonic() + self.ttl, ids)
+        return ids
+
+    def invalidate(self, entity_type: Optional[str] = None):
+        with self._lock:
+            if entity_type is None:
+                self._epoch += 1
+                self._entries.clear()
+            else:
+                self._generations[entity_type] = self._generations.get(entity_type, 0) + 1
+                self._entries.pop(entity_type, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entity_types": len(self._entries),
+                "locked": sum(len(ids) for _, ids in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+lock_cache = LockCache(ttl=LOCK_CACHE_TTL)
+
+
+def lock_status(db: Session, entity_type: str, entity_ids: Iterable[Any]) -> Dict[uuid.UUID, bool]:
+    """Lock status of several records of one type ({id: locked})."""
+    locked = lock_cache.locked_ids(db, entity_type)
+    return {_as_uuid(entity_id): _as_uuid(entity_id) in locked for entity_id in entity_ids}
+
+
+def with_lock_status(db: Session, entity_type: str, records: Iterable[Any]) -> List[Tuple[Any, bool]]:
+    """Pairs every record with its lock status, as (record, is_locked)."""
+    locked = lock_cache.locked_ids(db, entity_type)
+    return [(record, _as_uuid(record.id) in locked) for record in records]
+
 
 def check_is_locked(db: Session, entity_id: uuid.UUID, entity_type: str) -> bool:
     """
     Check if an entity is locked in the lock_data table.
     """
-    return db.query(exists().where(and_(
-        LockData.entity_id == entity_id,
-        LockData.entity_type == entity_type
-    ))).scalar()
+    return _as_uuid(entity_id) in lock_cache.locked_ids(db, entity_type)
+
 
 def raise_if_locked(db: Session, entity_id: uuid.UUID, entity_type: str):
     """
     Raise a 403 Forbidden error if the entity is locked.
+    Reads lock_data directly, so a lock taken by another process is never missed.
     """
-    if check_is_locked(db, entity_id, entity_type):
+    locked = db.query(exists().where(and_(
+        LockData.entity_id == _as_uuid(entity_id),
+        LockData.entity_type == entity_type
+    ))).scalar()
+    if locked:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"Record of type '{entity_type}' with ID {entity_id} is locked and cannot be modified or deleted."
@@ -0,0 +1,307 @@
+"""
+Versioned schema migrations.
+
+Applied versions are recorded in the schema_migrations table, so starting against an
+up-to-date database costs a single SELECT. run_migrations() is called from the
+application lifespan; for rolling deploys it can also be run once before the new
+processes start:
+
+    python -m app.core.migrations
+
+Each migration runs in its own transaction together with the insert of its version
+row. Migrations check columns/indexes before adding them, so databases upgraded by the
+former start-up ALTER TABLEs just record them as applied.
+
+To change the schema, append a migration to MIGRATIONS; never edit or renumber one that
+has shipped. New models need a migration that calls create_missing_tables.
+On PostgreSQL an advisory lock keeps processes that start at the same time from
+applying a migration twice.
+"""
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Tuple, Union
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from .database import Base, engine
+
+# Arbitrary key of the PostgreSQL advisory lock held while migrating
+MIGRATION_LOCK_ID = 7_204_410_044
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+def _is_postgres(conn) -> bool:
+    return conn.dialect.name == "postgresql"
+
+
+def _has_table(conn, table: str) -> bool:
+    return inspect(conn).has_table(table)
+
+
+def _column_info(conn, table: str) -> Dict[str, dict]:
+    return {c["name"]: c for c in inspect(conn).get_columns(table)}
+
+
+def _has_nulls(conn, table: str, column: str) -> bool:
+    return conn.execute(text(f"SELECT 1 FROM {table} WHERE {column} IS NULL LIMIT 1")).first() is not None
+
+
+def add_columns(conn, table: str, columns: Dict[str, Union[str, Tuple[str, str]]]):
+    """
+    Adds the columns `table` doesn't have yet. Values are the column DDL, or a
+    (PostgreSQL DDL, other dialects DDL) pair.
+    """
+    if not _has_table(conn, table):
+        return
+    existing = _column_info(conn, table)
+    for name, ddl in columns.items():
+        if name in existing:
+            continue
+        if isinstance(ddl, tuple):
+            ddl = ddl[0] if _is_postgres(conn) else ddl[1]
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+
+def set_not_null(conn, table: str, *columns: str):
+    """SET NOT NULL (PostgreSQL) for nullable columns that hold no NULLs."""
+    if not _is_postgres(conn) or not _has_table(conn, table):
+        return
+    existing = _column_info(conn, table)
+    for name in columns:
+        if name in existing and existing[name]["nullable"] and not _has_nulls(conn, table, name):
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {name} SET NOT NULL"))
+
+
+def alter_type(conn, table: str, column: str, type_name: str, using: str = ""):
+    """Changes a column type on PostgreSQL unless it already has it."""
+    if not _is_postgres(conn) or not _has_table(conn, table):
+        return
+    info = _column_info(conn, table).get(column)
+    if info is None or str(info["type"]).upper() == type_name.upper():
+        return
+    conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE {type_name} {using}".rstrip()))
+
+
+def create_missing_tables(conn):
+    Base.metadata.create_all(bind=conn)
+
+
+# --- migrations ---
+
+def _projects_owner_and_theme(conn):
+    add_columns(conn, "projects", {
+        "owner_id": ("UUID", "CHAR(36)"),
+        "theme_color": "VARCHAR(20)",
+        "category": "VARCHAR(50) DEFAULT 'general'",
+    })
+    alter_type(conn, "projects", "theme_color", "VARCHAR(20)")
+    set_not_null(conn, "projects", "owner_id")
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_projects_owner_id ON projects(owner_id)"))
+
+
+def _reports_category(conn):
+    add_columns(conn, "reports", {"category": "VARCHAR(255)"})
+
+
+def _credentials_auth(conn):
+    add_columns(conn, "credentials", {
+        "auth_type": "VARCHAR(50) DEFAULT 'header'",
+        "meta": ("JSONB", "JSON"),
+    })
+
+
+def _agent_hints_system_hints(conn):
+    add_columns(conn, "agent_hints", {"system_hints": "BOOLEAN DEFAULT FALSE"})
+
+
+def _object_parameters_types(conn):
+    add_columns(conn, "object_parameters", {
+        "parameter_type": "VARCHAR(50) DEFAULT 'text'",
+        "default_value": "TEXT",
+    })
+    alter_type(conn, "object_parameters", "source", "TEXT")
+
+
+def _node_types_async_and_icon(conn):
+    add_columns(conn, "node_types", {
+        "is_async": "BOOLEAN DEFAULT FALSE",
+        "icon": "VARCHAR(100) DEFAULT 'task'",
+    })
+    set_not_null(conn, "node_types", "input_schema", "output_schema", "parameters")
+
+
+def _prompts_raw_and_meta(conn):
+    alter_type(conn, "prompts", "content", "JSONB", "USING content::jsonb")
+    add_columns(conn, "prompts", {"raw": "TEXT", "meta": ("JSONB", "JSON")})
+
+
+def _workflow_executions_graph(conn):
+    add_columns(conn, "workflow_executions", {"graph": ("JSONB", "JSON")})
+
+
+def _api_registry_fields(conn):
+    add_columns(conn, "api_registry", {
+        "base_url": "VARCHAR(255)",
+        "credential_key": "VARCHAR(100)",
+        "functions": ("JSONB", "JSON"),
+        "description": "TEXT",
+        "project_id": ("UUID", "CHAR(36)"),
+    })
+
+
+def _ai_providers_base_url(conn):
+    add_columns(conn, "ai_providers", {"base_url": "VARCHAR(255)"})
+
+
+def _project_scoping(conn):
+    # "records" is the name of the metadata table before it was renamed
+    for names in (["metadata", "records"], ["agent_hints"], ["workflows"], ["schemas"], ["reports"], ["prompts"], ["response"]):
+        table = next((t for t in names if _has_table(conn, t)), None)
+        if table is None:
+            continue
+        add_columns(conn, table, {"project_id": ("UUID", "CHAR(36)")})
+        if _is_postgres(conn):
+            foreign_keys = inspect(conn).get_foreign_keys(table)
+            if not any(fk["constrained_columns"] == ["project_id"] for fk in foreign_keys):
+                conn.execute(text(
+                    f"ALTER TABLE {table} ADD CONSTRAINT fk_{table}_project_id "
+                    f"FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE SET NULL"
+                ))
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{table}_project_id ON {table}(project_id)"))
+
+
+def _date_bucket_floor(conn):
+    if not _is_postgres(conn):
+        return
+    conn.execute(text("""
+CREATE OR REPLACE FUNCTION date_bucket_floor(ts timestamptz, mode text)
+RETURNS timestamptz
+AS $$
+BEGIN
+    CASE mode
+        WHEN 'hour' THEN
+            RETURN date_trunc('hour', ts);
+
+        WHEN 'day' THEN
+            RETURN date_trunc('day', ts);
+
+        WHEN 'month' THEN
+            RETURN date_trunc('month', ts);
+
+        WHEN '15 days' THEN
+            RETURN date_trunc('month', ts)
+                   + ((EXTRACT(DAY FROM ts)::int - 1) / 15) * INTERVAL '15 days';
+
+        ELSE
+            RAISE EXCEPTION 'Unsupported mode: %', mode;
+    END CASE;
+END;
+$$ LANGUAGE plpgsql;
+"""))
+
+
+def _workflow_executions_started_index(conn):
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_workflow_executions_workflow_started "
+        "ON workflow_executions(workflow_id, started_at)"
+    ))
+
+
+def _metadata_closure(conn):
+    create_missing_tables(conn)
+    if not _has_table(conn, "metadata"):
+        return
+    # Backfill the closure of the existing hierarchy
+    conn.execute(text("DELETE FROM metadata_closure"))
+    conn.execute(text("""
+WITH RECURSIVE tree(ancestor_id, descendant_id, depth) AS (
+    SELECT id, id, 0 FROM metadata
+    UNION ALL
+    SELECT tree.ancestor_id, metadata.id, tree.depth + 1
+    FROM tree JOIN metadata ON metadata.parent_id = tree.descendant_id
+)
+INSERT INTO metadata_closure (ancestor_id, descendant_id, depth)
+SELECT ancestor_id, descendant_id, depth FROM tree
+"""))
+
+
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "create_tables", create_missing_tables),
+    (2, "projects_owner_and_theme", _projects_owner_and_theme),
+    (3, "reports_category", _reports_category),
+    (4, "credentials_auth", _credentials_auth),
+    (5, "agent_hints_system_hints", _agent_hints_system_hints),
+    (6, "object_parameters_types", _object_parameters_types),
+    (7, "node_types_async_and_icon", _node_types_async_and_icon),
+    (8, "prompts_raw_and_meta", _prompts_raw_and_meta),
+    (9, "workflow_executions_graph", _workflow_executions_graph),
+    (10, "api_registry_fields", _api_registry_fields),
+    (11, "ai_providers_base_url", _ai_providers_base_url),
+    (12, "project_scoping", _project_scoping),
+    (13, "date_bucket_floor", _date_bucket_floor),
+    (14, "workflow_executions_started_index", _workflow_executions_started_index),
+    (15, "metadata_closure", _metadata_closure),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# --- runner ---
+
+def current_version(bind=None) -> int:
+    """Highest applied migration, 0 for a database that was never migrated."""
+    try:
+        with (bind or engine).connect() as conn:
+            return conn.execute(select(schema_migrations.c.version).order_by(schema_migrations.c.version.desc()).limit(1)).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        # schema_migrations doesn't exist yet
+        return 0
+
+
+def run_migrations(bind=None) -> List[int]:
+    """Applies the pending migrations in order and returns their versions."""
+    bind = bind or engine
+    if current_version(bind) >= LATEST_VERSION:
+        return []
+
+    with bind.connect() as lock_conn:
+        if _is_postgres(lock_conn):
+            lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            _metadata.create_all(bind=bind)
+            with bind.connect() as conn:
+                applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+            done = []
+            for version, name, migrate in MIGRATIONS:
+                if version in applied:
+                    continue
+                started = time.monotonic()
+                with bind.begin() as conn:
+                    migrate(conn)
+                    conn.execute(schema_migrations.insert().values(
+                        version=version, name=name, applied_at=datetime.now(timezone.utc)
+                    ))
+                print(f"Applied migration {version} {name} in {time.monotonic() - started:.2f}s")
+                done.append(version)
+            return done
+        finally:
+            if _is_postgres(lock_conn):
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+                lock_conn.commit()
+
+
+if __name__ == "__main__":
+    from .. import models  # noqa: F401 — registers every table with Base
+    from ..models.intermediate_result import IntermediateResult  # noqa: F401
+    from ..models.response import Response  # noqa: F401
+
+    applied = run_migrations()
+    print(f"Database at version {current_version()} ({len(applied)} migration(s) applied)")
@@ -0,0 +1,169 @@
+"""
+Keyset pagination and field projection for list endpoints.
+
+All query parameters are optional; without them a list endpoint returns every row
+with every field, as before.
+
+- ``limit`` / ``cursor``: at most ``limit`` rows per page. When more rows follow,
+  the ``X-Next-Cursor`` response header holds the cursor of the next page. Pages are
+  seeked by the endpoint's sort key (``WHERE (sort key) > (last row)``), so every
+  page costs the same regardless of its position.
+- ``fields=id,name``: only these fields are loaded (``load_only``) and returned, so
+  heavy columns like ``code``, ``graph``, ``data`` or ``content`` are never read.
+- ``include_total=true``: the number of matching rows in ``X-Total-Count``.
+"""
+import base64
+import json
+import uuid
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from fastapi import HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import inspect, tuple_
+from sqlalchemy.orm import load_only, selectinload
+
+from .config import LIST_MAX_LIMIT
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+class PageParams:
+    """limit/cursor/include_total query parameters (use with Depends())."""
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=LIST_MAX_LIMIT, description="Page size; omit for all rows"),
+        cursor: Optional[str] = Query(None, description=f"Value of {NEXT_CURSOR_HEADER} from the previous page"),
+        include_total: bool = Query(False, description=f"Return the row count in {TOTAL_COUNT_HEADER}"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.include_total = include_total
+
+
+class ListParams(PageParams):
+    """Query parameters shared by the paginated list endpoints (use with Depends())."""
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=LIST_MAX_LIMIT, description="Page size; omit for all rows"),
+        cursor: Optional[str] = Query(None, description=f"Value of {NEXT_CURSOR_HEADER} from the previous page"),
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+        include_total: bool = Query(False, description=f"Return the row count in {TOTAL_COUNT_HEADER}"),
+    ):
+        super().__init__(limit=limit, cursor=cursor, include_total=include_total)
+        self.fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+
+def _python_value(expression, value):
+    if value is None:
+        return None
+    try:
+        python_type = expression.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is uuid.UUID:
+        return uuid.UUID(value)
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_key: Sequence[Any]) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(sort_key):
+            raise ValueError("cursor does not match the sort key")
+        return [_python_value(expr, value) for expr, value in zip(sort_key, values)]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+
+def project(query, entity, params: ListParams, model, relationships: Iterable[str] = (), extras: Iterable[str] = ("is_locked",)):
+    """
+    Restricts the loaded columns of `entity` to params.fields. Allowed are the fields of
+    the response `model` that are columns of `entity`, the given relationships and
+    `extras` (fields computed by the endpoint, e.g. is_locked).
+    """
+    if not params.fields:
+        return query
+    mapper = inspect(entity)
+    columns = {attr.key for attr in mapper.column_attrs}
+    allowed = (set(model.model_fields) & (columns | set(relationships))) | set(extras)
+    unknown = [f for f in params.fields if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields {unknown}; allowed: {sorted(allowed)}")
+
+    load = [getattr(entity, f) for f in params.fields if f in columns]
+    options = [load_only(*load)] if load else [load_only(*[getattr(entity, k.key) for k in mapper.primary_key])]
+    options += [selectinload(getattr(entity, f)) for f in params.fields if f in relationships]
+    return query.options(*options)
+
+
+def paginate(query, params: PageParams, response: Response, sort_key: Sequence[Any], descending: bool = False) -> list:
+    """
+    Orders `query` by `sort_key` (which must end with a unique column), ascending or
+    descending, and applies cursor/limit/include_total. Returns the rows of the page
+    and sets the headers.
+    """
+    if params.include_total:
+        response.headers[TOTAL_COUNT_HEADER] = str(query.order_by(None).count())
+
+    query = query.order_by(*[key.desc() for key in sort_key] if descending else sort_key)
+    if params.cursor:
+        last = tuple_(*decode_cursor(params.cursor, sort_key))
+        query = query.filter(tuple_(*sort_key) < last if descending else tuple_(*sort_key) > last)
+    if params.limit is None:
+        return query.all()
+
+    # The sort key is selected alongside the row, so projected-away columns are never touched
+    rows = query.add_columns(*sort_key).limit(params.limit + 1).all()
+    width = len(sort_key)
+    if len(rows) > params.limit:
+        rows = rows[:params.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(tuple(rows[-1])[-width:])
+    return [row[0] if len(row) == width + 1 else tuple(row)[:-width] for row in rows]
+
+
+@lru_cache(maxsize=None)
+def _field_adapter(model, name: str) -> TypeAdapter:
+    return TypeAdapter(model.model_fields[name].annotation)
+
+
+def render(rows: list, params: ListParams, response: Response, model, to_dict: Optional[Callable] = None):
+    """
+    Serializes (entity, is_locked) rows. With fields= only those fields are returned,
+    as a JSONResponse that bypasses the endpoint's response_model.
+    """
+    if not params.fields:
+        items = []
+        for obj, is_locked in rows:
+            item = to_dict(obj) if to_dict else model.model_validate(obj).model_dump()
+            item["is_locked"] = is_locked
+            items.append(item)
+        return items
+
+    items = []
+    for obj, is_locked in rows:
+        item: Dict[str, Any] = {}
+        for name in params.fields:
+            if name == "is_locked":
+                item[name] = is_locked
+                continue
+            adapter = _field_adapter(model, name)
+            item[name] = adapter.dump_python(adapter.validate_python(getattr(obj, name), from_attributes=True), mode="json")
+        items.append(item)
+    headers = {k: v for k, v in response.headers.items() if k.lower() in (NEXT_CURSOR_HEADER.lower(), TOTAL_COUNT_HEADER.lower())}
+    return JSONResponse(content=jsonable_encoder(items), headers=headers)
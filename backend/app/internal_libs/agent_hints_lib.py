@@ -1,6 +1,6 @@
 import json
 from typing import Any, List, Optional, Dict, Union
-from ..core.database import SessionLocal
+from .session_lib import lib_session
 from ..models.agent_hint import AgentHint
 from .logger_lib import system_log
 
@@ -12,7 +12,7 @@ def get_agent_hint_by_key(key: str) -> str:
     """
     system_log(f"[AGENT_HINTS_LIB] Retrieving hint for key: {key}", level="system")
     
-    db = SessionLocal()
+    db = lib_session(read_only=True)
     try:
         hint_obj = db.query(AgentHint).filter(AgentHint.key == key).first()
         
@@ -36,7 +36,7 @@ def get_agent_hint_and_id_by_key(key: str) -> Dict[str, Union[Optional[int], str
     """
     system_log(f"[AGENT_HINTS_LIB] Retrieving hint for key: {key}", level="system")
     
-    db = SessionLocal()
+    db = lib_session(read_only=True)
     try:
         hint_obj = db.query(AgentHint).filter(AgentHint.key == key).first()
         
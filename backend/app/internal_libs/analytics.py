@@ -2,7 +2,7 @@ import re
 import uuid
 from typing import Any
 from sqlalchemy.orm import Session
-from ..core.database import SessionLocal
+from .session_lib import lib_session
 from ..models.client_metadata import ClientMetadata
 from ..models.data_type import DataType
 
@@ -28,7 +28,7 @@ def process_analytics_request(client_id: str, task_text: str) -> str:
         return request
     
     # 2. Setup database session
-    db: Session = SessionLocal()
+    db: Session = lib_session()
     
     try:
         # Convert clientid to UUID if it's a string
@@ -3,7 +3,7 @@ import urllib.request
 import urllib.error
 import urllib.parse
 from sqlalchemy.orm import Session
-from ..core.database import SessionLocal
+from .session_lib import lib_session
 from ..models.api_registry import ApiRegistry as ApiRegistryModel
 from .logger_lib import system_log
 
@@ -14,7 +14,7 @@ def call_api_function(api_name: str, function_name: str, params: dict = None) ->
     Core engine to call a function from the registered external APIs.
     """
     system_log(f"[API_REGISTRY] Calling {api_name}/{function_name} with params={params}", level="system")
-    db = SessionLocal()
+    db = lib_session()
     try:
         # 1. Resolve API entry
         api_entry = db.query(ApiRegistryModel).filter(ApiRegistryModel.name == api_name).first()
@@ -116,7 +116,7 @@ def get_agent_tool_definitions(tool_identifiers: list[dict]) -> list[dict]:
     if not tool_identifiers or not isinstance(tool_identifiers, list):
         return []
         
-    db = SessionLocal()
+    db = lib_session()
     definitions = []
     try:
         for item in tool_identifiers:
@@ -186,7 +186,7 @@ def get_function_parameters(api_name: str, function_name: str) -> list:
     Merges schema parameters with default values from 'default_params'.
     """
     print(f"[API_REGISTRY] Fetching parameters for '{api_name}' -> '{function_name}'")
-    db = SessionLocal()
+    db = lib_session()
     try:
         api_entry = db.query(ApiRegistryModel).filter(ApiRegistryModel.name == api_name).first()
         if not api_entry:
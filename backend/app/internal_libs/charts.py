@@ -1,11 +1,23 @@
+import base64
 import io
-from typing import List, Dict, Any, Union, Optional
+import functools
+import inspect
+import threading
+from typing import Callable, List, Dict, Any, Union, Optional, Tuple
+
+from ..core.config import CHART_MAX_POINTS
+from ..services.chart_cache import chart_cache, chart_key
+from ..services.chart_renderer import chart_renderer
 
 # Try to import heavy dependencies
 try:
-    import matplotlib.pyplot as plt
     import matplotlib as mpl
     mpl.use('Agg') # Use non-interactive backend
+    import matplotlib.style
+    from matplotlib.artist import setp
+    from matplotlib.figure import Figure
+    from matplotlib.patches import Circle
+    from matplotlib.ticker import MaxNLocator
     import pandas as pd
     import numpy as np
     CHART_LIBS_INSTALLED = True
@@ -25,30 +37,116 @@ CORP_COLORS = [
     '#64748b', # Slate 500
 ]
 
+# Business theme on top of matplotlib's 'bmh' style
+_CORPORATE_RC = {
+    'axes.facecolor': 'white',
+    'figure.facecolor': 'white',
+    'axes.edgecolor': '#e2e8f0', # Slate 200
+    'axes.grid': True,
+    'grid.alpha': 0.3,
+    'grid.color': '#cbd5e1', # Slate 300
+    'axes.labelcolor': '#1e293b', # Slate 800
+    'xtick.color': '#64748b', # Slate 500
+    'ytick.color': '#64748b',
+    'axes.spines.top': False,
+    'axes.spines.right': False,
+    'axes.titleweight': 'bold',
+}
+
+# rcParams are process-global; in-process rendering (no worker pool) is
+# serialized across threads.
+_RC_LOCK = threading.RLock()
+
+# Undecorated chart functions by name; workers look them up in _render_chart
+_CHARTS: Dict[str, Callable[..., str]] = {}
+
+@functools.lru_cache(maxsize=32)
+def _corporate_rc(fontsize: int = 10, font_family: str = 'sans-serif') -> Dict[str, Any]:
+    """Returns the rcParams of the corporate style; built once per (fontsize, font_family)."""
+    rc = dict(mpl.style.library['bmh'])
+    rc.update(_CORPORATE_RC)
+    rc.update({
+        'font.family': font_family,
+        'font.size': fontsize,
+        'axes.titlesize': fontsize + 2,
+        'axes.labelsize': fontsize,
+        'xtick.labelsize': max(6, fontsize - 1),
+        'ytick.labelsize': max(6, fontsize - 1),
+        'axes.prop_cycle': mpl.cycler(color=CORP_COLORS),
+    })
+    return rc
+
 def apply_corporate_style(fontsize: int = 10, font_family: str = 'sans-serif'):
-    """Applies a clean, modern business style to Matplotlib."""
+    """Applies a clean, modern business style to Matplotlib globally (chart functions use a scoped rc_context instead)."""
     if not CHART_LIBS_INSTALLED:
         return
-    plt.style.use('bmh') # Base style
-    mpl.rcParams['axes.facecolor'] = 'white'
-    mpl.rcParams['figure.facecolor'] = 'white'
-    mpl.rcParams['axes.edgecolor'] = '#e2e8f0' # Slate 200
-    mpl.rcParams['axes.grid'] = True
-    mpl.rcParams['grid.alpha'] = 0.3
-    mpl.rcParams['grid.color'] = '#cbd5e1' # Slate 300
-    mpl.rcParams['axes.labelcolor'] = '#1e293b' # Slate 800
-    mpl.rcParams['xtick.color'] = '#64748b' # Slate 500
-    mpl.rcParams['ytick.color'] = '#64748b'
-    mpl.rcParams['axes.spines.top'] = False
-    mpl.rcParams['axes.spines.right'] = False
-    mpl.rcParams['font.family'] = font_family
-    mpl.rcParams['font.size'] = fontsize
-    mpl.rcParams['axes.titlesize'] = fontsize + 2
-    mpl.rcParams['axes.labelsize'] = fontsize
-    mpl.rcParams['xtick.labelsize'] = max(6, fontsize - 1)
-    mpl.rcParams['ytick.labelsize'] = max(6, fontsize - 1)
-    mpl.rcParams['axes.titleweight'] = 'bold'
-    mpl.rcParams['axes.prop_cycle'] = mpl.cycler(color=CORP_COLORS)
+    mpl.rcParams.update(_corporate_rc(fontsize, font_family))
+
+def _subplots(figsize, **subplot_kw):
+    """Creates a standalone Figure (object-oriented API, no pyplot state) with one Axes."""
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots(subplot_kw=subplot_kw or None)
+    return fig, ax
+
+def _render_chart(name: str, params: Dict[str, Any]) -> str:
+    """Draws a chart under the corporate style. Runs in a chart worker process (or in-process as fallback)."""
+    rc = _corporate_rc(params.get('fontsize', 10), params.get('font_family', 'sans-serif'))
+    with _RC_LOCK, mpl.rc_context(rc):
+        return _CHARTS[name](**params)
+
+def _prepare(name: str, args: tuple, kwargs: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Binds a call to its chart signature and returns (params, cache key)."""
+    bound = inspect.signature(_CHARTS[name]).bind(*args, **kwargs)
+    bound.apply_defaults()
+    params = dict(bound.arguments)
+    if 'data' in params:
+        # DataFrames hash and pickle far faster than lists of dicts
+        params['data'] = _to_df(params['data'])
+    return params, chart_key(name, (), params)
+
+def _submit(name: str, params: Dict[str, Any], key: Optional[str]):
+    future = chart_renderer.submit(name, params)
+    if key is not None:
+        def store(f):
+            if not f.cancelled() and f.exception() is None:
+                chart_cache.set(key, f.result())
+        future.add_done_callback(store)
+    return future
+
+def _chart(fn):
+    """
+    Registers a chart function. Calls are served from the SVG cache when possible and
+    otherwise rendered by the chart worker pool (see services/chart_renderer.py).
+    """
+    _CHARTS[fn.__name__] = fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not CHART_LIBS_INSTALLED:
+            return fn(*args, **kwargs)
+        params, key = _prepare(fn.__name__, args, kwargs)
+        if key is not None:
+            svg = chart_cache.get(key)
+            if svg is not None:
+                return svg
+        return _submit(fn.__name__, params, key).result()
+    return wrapper
+
+def render_many(calls: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+    """
+    Renders several charts in parallel and returns their SVGs in the same order, e.g.
+    charts.render_many([("bar", {"data": rows, "x": "month", "y": "sales"}), ("pie", {...})])
+    """
+    if not CHART_LIBS_INSTALLED:
+        return [_get_error_svg("Libraries 'matplotlib' or 'pandas' are not installed.") for _ in calls]
+    pending = []
+    for name, kwargs in calls:
+        if name not in _CHARTS:
+            raise ValueError(f"Unknown chart '{name}'. Available: {', '.join(sorted(_CHARTS))}")
+        params, key = _prepare(name, (), kwargs)
+        svg = chart_cache.get(key) if key is not None else None
+        pending.append(svg if svg is not None else _submit(name, params, key))
+    return [p if isinstance(p, str) else p.result() for p in pending]
 
 def fig_to_svg(fig) -> str:
     """Converts a Matplotlib figure to a sanitized SVG string."""
@@ -56,7 +154,6 @@ def fig_to_svg(fig) -> str:
         return ""
     buf = io.StringIO()
     fig.savefig(buf, format='svg', bbox_inches='tight')
-    plt.close(fig)
     return buf.getvalue()
 
 def _to_df(data: Any) -> Any:
@@ -84,21 +181,129 @@ def _get_error_svg(msg: str) -> str:
         </text>
     </svg>"""
 
+RASTER_FORMATS = ('png', 'webp')
+
+def fig_to_image(fig, fmt: str = 'png', dpi: int = 150) -> str:
+    """Renders a figure to PNG/WebP and returns an <img> tag with the image embedded as base64."""
+    if not CHART_LIBS_INSTALLED:
+        return ""
+    if fmt not in RASTER_FORMATS:
+        raise ValueError(f"Unsupported raster format '{fmt}'. Use one of: {', '.join(RASTER_FORMATS)}")
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, dpi=dpi, bbox_inches='tight')
+    encoded = base64.b64encode(buf.getvalue()).decode('ascii')
+    return f'<img src="data:image/{fmt};base64,{encoded}" style="max-width: 100%;" />'
+
+def _render(fig, raster: Optional[str] = None) -> str:
+    return fig_to_image(fig, raster) if raster else fig_to_svg(fig)
+
+# --- Downsampling of large series ---
+# Index selection only; callers plot df.iloc[indices] so labels stay aligned with values.
+
+def _resolve_max_points(max_points: Optional[int]) -> int:
+    return CHART_MAX_POINTS if max_points is None else max_points
+
+def _lttb_indices(y, n_out: int):
+    """Largest-Triangle-Three-Buckets over positions 0..n-1; keeps the first and last point."""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float)
+    # Inner points 1..n-2 are split into n_out-2 buckets of at least one point each
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    csum = np.concatenate(([0.0], np.cumsum(y)))
+    starts, ends = edges[1:-1], edges[2:]
+    next_x = np.append((starts + ends - 1) / 2.0, x[-1])
+    next_y = np.append((csum[ends] - csum[starts]) / (ends - starts), y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        areas = np.abs((x[a] - next_x[i]) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y[i] - y[a]))
+        a = start + int(areas.argmax())
+        selected[i + 1] = a
+    return selected
+
+def _minmax_indices(y, n_buckets: int):
+    """Keeps the minimum and maximum of each equal-width bucket (fully vectorised)."""
+    n = len(y)
+    if n_buckets <= 0 or 2 * n_buckets >= n:
+        return np.arange(n)
+    size = int(np.ceil(n / n_buckets))
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    grid = padded.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    lo = offsets + np.argmin(np.where(np.isnan(grid), np.inf, grid), axis=1)
+    hi = offsets + np.argmax(np.where(np.isnan(grid), -np.inf, grid), axis=1)
+    idx = np.unique(np.concatenate(([0, n - 1], lo, hi)))
+    return idx[idx < n]
+
+def _grid_indices(x, y, max_points: int):
+    """Scatter thinning: keeps one point per cell of a sqrt(max_points)² grid."""
+    side = max(1, int(np.sqrt(max_points)))
+
+    def cell(v):
+        span = v.max() - v.min()
+        return np.zeros(len(v), dtype=np.int64) if span == 0 else ((v - v.min()) / span * (side - 1)).round().astype(np.int64)
+
+    _, first = np.unique(cell(x) * side + cell(y), return_index=True)
+    return np.sort(first)
+
+def _numeric(series):
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype=float)
+
+def _downsample_series(df, cols: List[str], max_points: Optional[int]):
+    """Line/area downsampling: LTTB for one series, min-max buckets shared across several."""
+    max_points = _resolve_max_points(max_points)
+    if not max_points or len(df) <= max_points:
+        return df
+    values = [_numeric(df[c]) for c in cols]
+    if len(values) == 1:
+        y = values[0]
+        if np.isnan(y).any():
+            # LTTB needs finite values; min-max tolerates gaps
+            idx = _minmax_indices(y, max_points // 2)
+        else:
+            idx = _lttb_indices(y, max_points)
+    else:
+        budget = max(1, max_points // (2 * len(values)))
+        idx = np.unique(np.concatenate([_minmax_indices(v, budget) for v in values]))
+    return df.iloc[idx]
+
+def _downsample_points(df, x, y, max_points: Optional[int]):
+    max_points = _resolve_max_points(max_points)
+    if not max_points or len(df) <= max_points:
+        return df
+    xs, ys = _numeric(df[x]), _numeric(df[y])
+    finite = np.isfinite(xs) & np.isfinite(ys)
+    if not finite.any():
+        return df.iloc[np.linspace(0, len(df) - 1, max_points).astype(np.int64)]
+    positions = np.flatnonzero(finite)
+    return df.iloc[positions[_grid_indices(xs[finite], ys[finite], max_points)]]
+
+def _limit_ticks(ax, n_points: int, max_ticks: int = 12):
+    """Category axes get one tick per point; thin them out for long series."""
+    if n_points > max_ticks:
+        ax.xaxis.set_major_locator(MaxNLocator(nbins=max_ticks))
+
 # --- High-Level Charting Functions ---
 
+@_chart
 def bar(data, x, y, title=None, color=None, stacked=False, theme="business", figsize=(8, 4), fontsize=10, bar_width=0.8, font_family='sans-serif', xlabel=None, ylabel=None) -> str:
     """Generates a professional vertical bar chart. y can be a single column or a list."""
     if not CHART_LIBS_INSTALLED:
         return _get_error_svg("Libraries 'matplotlib' or 'pandas' are not installed.")
         
-    apply_corporate_style(fontsize=fontsize, font_family=font_family)
     df = _to_df(data)
     y_cols = [y] if isinstance(y, str) else y
     
     # Use provided color(s) or fallback to standard palette
     palette = [color] if isinstance(color, str) else (color if color else CORP_COLORS)
     
-    fig, ax = plt.subplots(figsize=figsize)
+    fig, ax = _subplots(figsize)
     
     if stacked and len(y_cols) > 1:
         bottom = None
@@ -125,12 +330,12 @@ def bar(data, x, y, title=None, color=None, stacked=False, theme="business", fig
     
     return fig_to_svg(fig)
 
+@_chart
 def barh(data, x, y, title=None, color=None, stacked=False, theme="business", figsize=None, fontsize=10, bar_height=0.8, font_family='sans-serif', xlabel=None, ylabel=None) -> str:
     """Generates a professional horizontal bar chart. x is labels, y is values."""
     if not CHART_LIBS_INSTALLED:
         return _get_error_svg("Libraries 'matplotlib' or 'pandas' are not installed.")
         
-    apply_corporate_style(fontsize=fontsize, font_family=font_family)
     df = _to_df(data)
     y_cols = [y] if isinstance(y, str) else y
     
@@ -141,7 +346,7 @@ def barh(data, x, y, title=None, color=None, stacked=False, theme="business", fi
     # Use provided color(s) or fallback to standard palette
     palette = [color] if isinstance(color, str) else (color if color else CORP_COLORS)
         
-    fig, ax = plt.subplots(figsize=figsize)
+    fig, ax = _subplots(figsize)
     
     if stacked and len(y_cols) > 1:
         left = None
@@ -166,16 +371,18 @@ def barh(data, x, y, title=None, color=None, stacked=False, theme="business", fi
     
     return fig_to_svg(fig)
 
-def area(data, x, y, title=None, stacked=False, theme="business", figsize=(8, 4), fontsize=10, font_family='sans-serif', xlabel=None, ylabel=None) -> str:
-    """Generates a professional area chart."""
+@_chart
+def area(data, x, y, title=None, stacked=False, theme="business", figsize=(8, 4), fontsize=10, font_family='sans-serif', xlabel=None, ylabel=None, max_points=None, raster=None) -> str:
+    """Generates a professional area chart. Long series are downsampled to max_points; raster='png'/'webp' embeds an image instead of SVG."""
     if not CHART_LIBS_INSTALLED:
         return _get_error_svg("Libraries 'matplotlib' or 'pandas' are not installed.")
         
-    apply_corporate_style(fontsize=fontsize, font_family=font_family)
     df = _to_df(data)
     y_cols = [y] if isinstance(y, str) else y
+    n_total = len(df)
+    df = _downsample_series(df, y_cols, max_points)
     
-    fig, ax = plt.subplots(figsize=figsize)
+    fig, ax = _subplots(figsize)
     
     if stacked and len(y_cols) > 1:
         ax.stackplot(df[x].astype(str), [df[c] for c in y_cols], labels=y_cols, alpha=0.8)
@@ -189,17 +396,18 @@ def area(data, x, y, title=None, stacked=False, theme="business", figsize=(8, 4)
     if title: ax.set_title(title, pad=20)
     ax.set_xlabel(xlabel if xlabel else str(x))
     ax.set_ylabel(ylabel if ylabel else "Value")
-    return fig_to_svg(fig)
+    if len(df) < n_total: _limit_ticks(ax, len(df))
+    return _render(fig, raster)
 
+@_chart
 def histogram(data, col, bins=20, title=None, theme="business", figsize=(8, 4), fontsize=10, font_family='sans-serif', xlabel=None, ylabel=None) -> str:
     """Generates a distribution histogram."""
     if not CHART_LIBS_INSTALLED:
         return _get_error_svg("Libraries 'matplotlib' or 'pandas' are not installed.")
         
-    apply_corporate_style(fontsize=fontsize, font_family=font_family)
     df = _to_df(data)
     
-    fig, ax = plt.subplots(figsize=figsize)
+    fig, ax = _subplots(figsize)
     ax.hist(df[col].dropna(), bins=bins, color=CORP_COLORS[0], edgecolor='white', alpha=0.8)
     
     if title: ax.set_title(title, pad=20)
@@ -207,20 +415,22 @@ def histogram(data, col, bins=20, title=None, theme="business", figsize=(8, 4),
     ax.set_ylabel(ylabel if ylabel else "Frequency")
     return fig_to_svg(fig)
 
-def line(data, x, y, title=None, markers=True, theme="business", figsize=(8, 4), fontsize=10, font_family='sans-serif', color=None, xlabel=None, ylabel=None) -> str:
-    """Generates a professional line chart."""
+@_chart
+def line(data, x, y, title=None, markers=True, theme="business", figsize=(8, 4), fontsize=10, font_family='sans-serif', color=None, xlabel=None, ylabel=None, max_points=None, raster=None) -> str:
+    """Generates a professional line chart. Long series are downsampled (LTTB) to max_points; raster='png'/'webp' embeds an image instead of SVG."""
     if not CHART_LIBS_INSTALLED:
         return _get_error_svg("Libraries 'matplotlib' or 'pandas' are not installed.")
 
-    apply_corporate_style(fontsize=fontsize, font_family=font_family)
     df = _to_df(data)
+    n_total = len(df)
+    df = _downsample_series(df, [y], max_points)
     
-    fig, ax = plt.subplots(figsize=figsize)
+    fig, ax = _subplots(figsize)
     
     # Use provided color(s) or fallback to standard palette
     colors = [color] if isinstance(color, str) else (color if color else CORP_COLORS)
     
-    ax.plot(df[x].astype(str), df[y], marker='o' if markers else None, 
+    ax.plot(df[x].astype(str), df[y], marker='o' if markers and len(df) == n_total else None, 
             linewidth=2, color=colors[0])
     
     if title:
@@ -228,18 +438,19 @@ def line(data, x, y, title=None, markers=True, theme="business", figsize=(8, 4),
     
     ax.set_xlabel(xlabel if xlabel else str(x))
     ax.set_ylabel(ylabel if ylabel else str(y))
+    if len(df) < n_total: _limit_ticks(ax, len(df))
     
-    return fig_to_svg(fig)
+    return _render(fig, raster)
 
+@_chart
 def pie(data, labels, values, title=None, theme="business", figsize=(6, 6), fontsize=10, font_family='sans-serif', color=None) -> str:
     """Generates a professional pie chart."""
     if not CHART_LIBS_INSTALLED:
         return _get_error_svg("Libraries 'matplotlib' or 'pandas' are not installed.")
 
-    apply_corporate_style(fontsize=fontsize, font_family=font_family)
     df = _to_df(data)
     
-    fig, ax = plt.subplots(figsize=figsize)
+    fig, ax = _subplots(figsize)
     
     # Use provided color(s) or fallback to standard palette
     pie_colors = [color] if isinstance(color, str) else (color if color else CORP_COLORS)
@@ -255,21 +466,21 @@ def pie(data, labels, values, title=None, theme="business", figsize=(6, 6), font
     )
     
     # Make a donut
-    centre_circle = plt.Circle((0,0), 0.70, fc='white')
-    fig.gca().add_artist(centre_circle)
+    centre_circle = Circle((0,0), 0.70, fc='white')
+    ax.add_artist(centre_circle)
     
     if title:
         ax.set_title(title, pad=20)
     
-    plt.tight_layout()
+    fig.tight_layout()
     return fig_to_svg(fig)
 
+@_chart
 def radar(data, labels, values, title=None, theme="business", figsize=(6, 6), fontsize=10, font_family='sans-serif', xlabel=None, ylabel=None) -> str:
     """Generates a professional radar (spider) chart."""
     if not CHART_LIBS_INSTALLED:
         return _get_error_svg("Libraries 'matplotlib' or 'pandas' are not installed.")
         
-    apply_corporate_style(fontsize=fontsize, font_family=font_family)
     df = _to_df(data)
     
     categories = df[labels].astype(str).tolist()
@@ -279,7 +490,7 @@ def radar(data, labels, values, title=None, theme="business", figsize=(6, 6), fo
     # Close the loop safely
     angles.append(angles[0])
     
-    fig, ax = plt.subplots(figsize=figsize, subplot_kw=dict(polar=True))
+    fig, ax = _subplots(figsize, polar=True)
     
     val_cols = [values] if isinstance(values, str) else values
     
@@ -291,24 +502,24 @@ def radar(data, labels, values, title=None, theme="business", figsize=(6, 6), fo
         
     ax.set_theta_offset(np.pi / 2)
     ax.set_theta_direction(-1)
-    plt.xticks(angles[:-1], categories)
+    ax.set_xticks(angles[:-1], categories)
     
     if title: ax.set_title(title, pad=30)
     if len(val_cols) > 1: ax.legend(loc='upper right', bbox_to_anchor=(0.1, 0.1))
     
     return fig_to_svg(fig)
 
+@_chart
 def heatmap(data, x, y, values, title=None, theme="business", figsize=(8, 6), fontsize=10, font_family='sans-serif', xlabel=None, ylabel=None) -> str:
     """Generates a correlation or density heatmap."""
     if not CHART_LIBS_INSTALLED:
         return _get_error_svg("Libraries 'matplotlib' or 'pandas' are not installed.")
         
-    apply_corporate_style(fontsize=fontsize, font_family=font_family)
     df = _to_df(data)
     
     pivot = df.pivot(index=y, columns=x, values=values)
     
-    fig, ax = plt.subplots(figsize=figsize)
+    fig, ax = _subplots(figsize)
     im = ax.imshow(pivot, cmap='Blues')
     
     ax.set_xticks(np.arange(len(pivot.columns)))
@@ -316,7 +527,7 @@ def heatmap(data, x, y, values, title=None, theme="business", figsize=(8, 6), fo
     ax.set_xticklabels(pivot.columns)
     ax.set_yticklabels(pivot.index)
     
-    plt.setp(ax.get_xticklabels(), rotation=45, ha="right", rotation_mode="anchor")
+    setp(ax.get_xticklabels(), rotation=45, ha="right", rotation_mode="anchor")
     
     for i in range(len(pivot.index)):
         for j in range(len(pivot.columns)):
@@ -326,18 +537,18 @@ def heatmap(data, x, y, values, title=None, theme="business", figsize=(8, 6), fo
     if xlabel: ax.set_xlabel(xlabel)
     if ylabel: ax.set_ylabel(ylabel)
     fig.colorbar(im, ax=ax)
-    plt.tight_layout()
+    fig.tight_layout()
     return fig_to_svg(fig)
 
+@_chart
 def boxplot(data, y, x=None, title=None, figsize=(8, 4), fontsize=10, font_family='sans-serif', xlabel=None, ylabel=None) -> str:
     """Generates a statistical boxplot."""
     if not CHART_LIBS_INSTALLED:
         return _get_error_svg("Libraries 'matplotlib' or 'pandas' are not installed.")
         
-    apply_corporate_style(fontsize=fontsize, font_family=font_family)
     df = _to_df(data)
     
-    fig, ax = plt.subplots(figsize=figsize)
+    fig, ax = _subplots(figsize)
     
     if x:
         groups = df[x].unique()
@@ -353,14 +564,14 @@ def boxplot(data, y, x=None, title=None, figsize=(8, 4), fontsize=10, font_famil
     ax.set_ylabel(ylabel if ylabel else (str(y) if isinstance(y, str) else "Value"))
     return fig_to_svg(fig)
 
-def scatter(data, x, y, size=None, title=None, figsize=(8, 4), fontsize=10, font_family='sans-serif', xlabel=None, ylabel=None) -> str:
-    """Generates a professional scatter/bubble plot."""
+@_chart
+def scatter(data, x, y, size=None, title=None, figsize=(8, 4), fontsize=10, font_family='sans-serif', xlabel=None, ylabel=None, max_points=None, raster=None) -> str:
+    """Generates a professional scatter/bubble plot. Dense clouds are thinned to max_points; raster='png'/'webp' embeds an image instead of SVG."""
     if not CHART_LIBS_INSTALLED:
         return _get_error_svg("Libraries 'matplotlib' or 'pandas' are not installed.")
-    apply_corporate_style(fontsize=fontsize, font_family=font_family)
-    df = _to_df(data)
+    df = _downsample_points(_to_df(data), x, y, max_points)
     
-    fig, ax = plt.subplots(figsize=figsize)
+    fig, ax = _subplots(figsize)
     
     if size and size in df.columns:
         # Scale relative size, ensure we don't divide by zero
@@ -374,13 +585,13 @@ def scatter(data, x, y, size=None, title=None, figsize=(8, 4), fontsize=10, font
     if title: ax.set_title(title, pad=20)
     ax.set_xlabel(xlabel if xlabel else str(x))
     ax.set_ylabel(ylabel if ylabel else str(y))
-    return fig_to_svg(fig)
+    return _render(fig, raster)
 
+@_chart
 def waterfall(data, labels, values, title=None, figsize=(8, 5), fontsize=10, font_family='sans-serif') -> str:
     """Generates a waterfall chart."""
     if not CHART_LIBS_INSTALLED:
         return _get_error_svg("Libraries 'matplotlib' or 'pandas' are not installed.")
-    apply_corporate_style(fontsize=fontsize, font_family=font_family)
     df = _to_df(data)
     
     net = df[values].values
@@ -388,7 +599,7 @@ def waterfall(data, labels, values, title=None, figsize=(8, 5), fontsize=10, fon
     base = np.zeros(len(net))
     base[1:] = running_total[:-1]
     
-    fig, ax = plt.subplots(figsize=figsize)
+    fig, ax = _subplots(figsize)
     colors = ['#10b981' if x >= 0 else '#f43f5e' for x in net]
     ax.bar(df[labels].astype(str), net, bottom=base, color=colors)
     
@@ -398,17 +609,17 @@ def waterfall(data, labels, values, title=None, figsize=(8, 5), fontsize=10, fon
     if title: ax.set_title(title, pad=20)
     return fig_to_svg(fig)
 
+@_chart
 def gauge(value, title=None, min_val=0, max_val=100, figsize=(6, 3), fontsize=10, font_family='sans-serif') -> str:
     """Generates a semi-circular gauge using a pie chart trick."""
     if not CHART_LIBS_INSTALLED:
         return _get_error_svg("Libraries 'matplotlib' or 'pandas' are not installed.")
-    apply_corporate_style(fontsize=fontsize, font_family=font_family)
     
     # We use a pie chart where the bottom half (180 degrees) is white/hidden
     # Top half represents the range [min_val, max_val]
     val_norm = max(0, min(1, (value - min_val) / (max_val - min_val)))
     
-    fig, ax = plt.subplots(figsize=figsize)
+    fig, ax = _subplots(figsize)
     
     # Pie slices: [Current Value, Remaining to Max, Bottom half (hidden)]
     sizes = [val_norm * 180, (1 - val_norm) * 180, 180]
@@ -417,7 +628,7 @@ def gauge(value, title=None, min_val=0, max_val=100, figsize=(6, 3), fontsize=10
     ax.pie(sizes, colors=colors, startangle=180, counterclock=True)
     
     # Donut hole
-    centre_circle = plt.Circle((0,0), 0.75, fc='white')
+    centre_circle = Circle((0,0), 0.75, fc='white')
     ax.add_artist(centre_circle)
     
     ax.axis('equal')
@@ -425,14 +636,14 @@ def gauge(value, title=None, min_val=0, max_val=100, figsize=(6, 3), fontsize=10
     
     return fig_to_svg(fig)
 
+@_chart
 def funnel(data, labels, values, title=None, figsize=(8, 6), fontsize=10, font_family='sans-serif') -> str:
     """Generates a funnel chart."""
     if not CHART_LIBS_INSTALLED:
         return _get_error_svg("Libraries 'matplotlib' or 'pandas' are not installed.")
-    apply_corporate_style(fontsize=fontsize, font_family=font_family)
     df = _to_df(data).sort_values(values, ascending=False)
     
-    fig, ax = plt.subplots(figsize=figsize)
+    fig, ax = _subplots(figsize)
     y = np.arange(len(df))
     widths = df[values].values
     offset = (widths.max() - widths) / 2
@@ -448,29 +659,29 @@ def funnel(data, labels, values, title=None, figsize=(8, 6), fontsize=10, font_f
     if title: ax.set_title(title, pad=20)
     return fig_to_svg(fig)
 
+@_chart
 def gantt(data, task, start, end, title=None, figsize=(10, 5), fontsize=10, font_family='sans-serif') -> str:
     """Generates a Gantt chart."""
     if not CHART_LIBS_INSTALLED:
         return _get_error_svg("Libraries 'matplotlib' or 'pandas' are not installed.")
-    apply_corporate_style(fontsize=fontsize, font_family=font_family)
     df = _to_df(data)
     df[start] = pd.to_datetime(df[start])
     df[end] = pd.to_datetime(df[end])
     df['dur'] = (df[end] - df[start]).dt.days
     
-    fig, ax = plt.subplots(figsize=figsize)
+    fig, ax = _subplots(figsize)
     ax.barh(df[task].astype(str), df['dur'], left=df[start], color=CORP_COLORS[0])
     ax.invert_yaxis()
     if title: ax.set_title(title, pad=20)
     return fig_to_svg(fig)
 
+@_chart
 def violin(data, y, x=None, title=None, figsize=(8, 4), fontsize=10, font_family='sans-serif', xlabel=None, ylabel=None) -> str:
     """Generates a violin plot."""
     if not CHART_LIBS_INSTALLED:
         return _get_error_svg("Libraries 'matplotlib' or 'pandas' are not installed.")
-    apply_corporate_style(fontsize=fontsize, font_family=font_family)
     df = _to_df(data)
-    fig, ax = plt.subplots(figsize=figsize)
+    fig, ax = _subplots(figsize)
     
     if x:
         groups = df[x].unique()
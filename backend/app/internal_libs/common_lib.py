@@ -2,7 +2,7 @@ import uuid
 import re
 import json
 from typing import Dict, Any, Optional, Tuple
-from ..core.database import SessionLocal
+from .session_lib import lib_session
 from ..models.workflow import WorkflowExecution
 from ..models.user import User, RoleEnum
 from .logger_lib import system_log
@@ -24,7 +24,7 @@ def get_active_client() -> Dict[str, Any]:
     if not execution_id:
         return {"id": None, "name": "Unknown", "error": "No active execution context found"}
 
-    db = SessionLocal()
+    db = lib_session()
     try:
         exec_uuid = uuid.UUID(execution_id) if isinstance(execution_id, str) else execution_id
         execution = db.query(WorkflowExecution).filter(WorkflowExecution.id == exec_uuid).first()
@@ -97,7 +97,7 @@ def resolve_ai_config(model_name: str) -> Dict[str, Any]:
         - api_key: str
         - base_url: Optional[str]
     """
-    db = SessionLocal()
+    db = lib_session()
     try:
         from ..models.ai_provider import AiProvider
         from .credentials import get_credential_by_key
@@ -9,3 +9,6 @@ object_params_context = contextvars.ContextVar("object_params_context", default=
 # Context variables for Project Mode
 project_id_context = contextvars.ContextVar("project_id_context", default=None)
 project_owner_context = contextvars.ContextVar("project_owner_context", default=None)
+
+# Unit-of-work DB session of the current execution (see session_lib)
+db_session_context = contextvars.ContextVar("db_session_context", default=None)
@@ -1,5 +1,5 @@
 from typing import Optional
-from ..core.database import SessionLocal
+from .session_lib import lib_session
 from ..models.credential import Credential
 from ..models.ai_provider import AiProvider
 
@@ -10,7 +10,7 @@ def get_credential_by_model(model_name: str) -> Optional[str]:
     1. Resolves via AI Model Registry (AiProvider)
     2. Always ensures the credential is not expired.
     """
-    db = SessionLocal()
+    db = lib_session()
     try:
         # Resolve via model name in AiProvider
         providers = db.query(AiProvider).all()
@@ -32,7 +32,7 @@ def get_credential_by_key(key: str) -> Optional[str]:
     """
     Legacy/Generic lookup by credential key.
     """
-    db = SessionLocal()
+    db = lib_session()
     try:
         credential = db.query(Credential).filter(
             Credential.key == key,
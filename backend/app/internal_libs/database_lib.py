@@ -1,140 +1,166 @@
+import json
 import uuid
-from typing import Any, List, Dict, Optional
+from typing import Any, List, Dict, Iterator, Optional
+import pandas as pd
 from sqlalchemy import text
-from ..core.database import SessionLocal
+from ..core.database import SessionLocal, replica_reads
+from .session_lib import inherit_written_tables, lib_session
 from ..models.workflow import WorkflowExecution
 from ..models.report import Report
 from ..models.user import RoleEnum, User
 from .logger_lib import system_log
 from .context_lib import execution_context, object_params_context
 
-def unsafe_request(sql_query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+try:
+    import pyarrow as pa
+    ARROW_INSTALLED = True
+except Exception:
+    ARROW_INSTALLED = False
+
+# Rows fetched per round trip by query_df (server-side cursor batch size)
+QUERY_DF_FETCH_ROWS = 10000
+
+def _resolve_owner(db, execution_id, func_name: str) -> User:
     """
-    Executes a raw SQL query.
+    Resolves the user whose permissions apply to the current execution and checks the role.
 
     Access control:
     - Current: admin, manager, client, service.
     """
-
-    execution_id = execution_context.get()
-
     if not execution_id:
         system_log("[DATABASE_LIB] No active execution context found", level="error")
         raise PermissionError("No active execution context found")
 
-    db = SessionLocal()
+    # Resolve execution or report
+    exec_uuid = uuid.UUID(execution_id) if isinstance(execution_id, str) else execution_id
 
-    try:
-        # Resolve execution or report
-        exec_uuid = uuid.UUID(execution_id) if isinstance(execution_id, str) else execution_id
-
-        # 1. Try WorkflowExecution
-        execution = (
-            db.query(WorkflowExecution)
-            .filter(WorkflowExecution.id == exec_uuid)
-            .first()
-        )
+    # 1. Try WorkflowExecution
+    execution = (
+        db.query(WorkflowExecution)
+        .filter(WorkflowExecution.id == exec_uuid)
+        .first()
+    )
 
-        owner = None
-
-        if execution and execution.workflow:
-            # Resolve owner from workflow
-            owner = execution.workflow.owner
-
-            if not owner and execution.workflow.owner_id == "common":
-                creator = (
-                    db.query(User)
-                    .filter(User.id == execution.workflow.created_by)
-                    .first()
-                )
-                if creator:
-                    owner = creator
-
-        # 2. Try Report
-        if not owner:
-            report = db.query(Report).filter(Report.id == exec_uuid).first()
-            if report:
-                owner = report.creator
-                system_log(
-                    f"[DATABASE_LIB] Resolved owner from Report {report.id} "
-                    f"({owner.username if owner else 'None'})",
-                    level="system"
-                )
-
-        # 3. Try User directly (Configuration Mode)
-        if not owner:
-            user = db.query(User).filter(User.id == exec_uuid).first()
-            if user:
-                owner = user
-                system_log(
-                    f"[DATABASE_LIB] Resolved owner directly from User {user.id} (Configuration Mode)",
-                    level="system"
-                )
-
-        if not owner:
-            system_log(
-                f"[DATABASE_LIB] Could not resolve owner for {execution_id} (not a Workflow or Report)",
-                level="error"
-            )
-            raise PermissionError("Could not resolve execution owner")
+    owner = None
+
+    if execution and execution.workflow:
+        # Resolve owner from workflow
+        owner = execution.workflow.owner
 
-        # Check role
-        allowed_roles = {
-            RoleEnum.admin,
-            RoleEnum.manager,
-            RoleEnum.client,
-            RoleEnum.service,
-        }
+        if not owner and execution.workflow.owner_id == "common":
+            creator = (
+                db.query(User)
+                .filter(User.id == execution.workflow.created_by)
+                .first()
+            )
+            if creator:
+                owner = creator
 
-        if owner.role not in allowed_roles:
+    # 2. Try Report
+    if not owner:
+        report = db.query(Report).filter(Report.id == exec_uuid).first()
+        if report:
+            owner = report.creator
             system_log(
-                f"[DATABASE_LIB] Access denied for role: {owner.role}",
-                level="warning"
+                f"[DATABASE_LIB] Resolved owner from Report {report.id} "
+                f"({owner.username if owner else 'None'})",
+                level="system"
             )
-            raise PermissionError(
-                f"Role '{owner.role}' is not allowed to use unsafe_request"
+
+    # 3. Try User directly (Configuration Mode)
+    if not owner:
+        user = db.query(User).filter(User.id == exec_uuid).first()
+        if user:
+            owner = user
+            system_log(
+                f"[DATABASE_LIB] Resolved owner directly from User {user.id} (Configuration Mode)",
+                level="system"
             )
 
+    if not owner:
+        system_log(
+            f"[DATABASE_LIB] Could not resolve owner for {execution_id} (not a Workflow or Report)",
+            level="error"
+        )
+        raise PermissionError("Could not resolve execution owner")
+
+    # Check role
+    allowed_roles = {
+        RoleEnum.admin,
+        RoleEnum.manager,
+        RoleEnum.client,
+        RoleEnum.service,
+    }
+
+    if owner.role not in allowed_roles:
         system_log(
-            f"[DATABASE_LIB] Executing unsafe_request for "
-            f"{owner.username} ({owner.role})",
-            level="system"
+            f"[DATABASE_LIB] Access denied for role: {owner.role}",
+            level="warning"
+        )
+        raise PermissionError(
+            f"Role '{owner.role}' is not allowed to use {func_name}"
         )
 
-        import json
-        if isinstance(params, str):
-            try:
-                params = json.loads(params)
-            except Exception:
-                pass
-                
-        # Resolve parameters
-        if params and not isinstance(params, (dict, str)):
-            if hasattr(params, "to_dict"):
-                params = params.to_dict()
-            elif hasattr(params, "__dict__"):
-                params = vars(params)
-                
-        final_params = (params if isinstance(params, dict) else {}).copy()
-        
-        # 1. Try to fill missing params from object_params_context
-        ctx_params = object_params_context.get()
-        if ctx_params:
-            for k, v in ctx_params.items():
-                if k not in final_params or final_params[k] is None or (isinstance(final_params[k], str) and not final_params[k].strip()):
-                    final_params[k] = v
-        
-        # 2. Inject system context if still missing
-        if owner:
-            if "user_id" not in final_params or final_params["user_id"] is None or (isinstance(final_params["user_id"], str) and not final_params["user_id"].strip()):
-                final_params["user_id"] = str(owner.id)
-            if "username" not in final_params or final_params["username"] is None or (isinstance(final_params["username"], str) and not final_params["username"].strip()):
-                final_params["username"] = owner.username
-            if "role" not in final_params or final_params["role"] is None or (isinstance(final_params["role"], str) and not final_params["role"].strip()):
-                final_params["role"] = str(owner.role)
-
-        # Execute SQL
-        result = db.execute(text(sql_query), final_params)
+    system_log(
+        f"[DATABASE_LIB] Executing {func_name} for "
+        f"{owner.username} ({owner.role})",
+        level="system"
+    )
+    return owner
+
+def _resolve_params(params: Any, owner: User) -> Dict[str, Any]:
+    """Fills query parameters from the object parameters of the run and the owner's identity."""
+    if isinstance(params, str):
+        try:
+            params = json.loads(params)
+        except Exception:
+            pass
+            
+    # Resolve parameters
+    if params and not isinstance(params, (dict, str)):
+        if hasattr(params, "to_dict"):
+            params = params.to_dict()
+        elif hasattr(params, "__dict__"):
+            params = vars(params)
+            
+    final_params = (params if isinstance(params, dict) else {}).copy()
+    
+    # 1. Try to fill missing params from object_params_context
+    ctx_params = object_params_context.get()
+    if ctx_params:
+        for k, v in ctx_params.items():
+            if k not in final_params or final_params[k] is None or (isinstance(final_params[k], str) and not final_params[k].strip()):
+                final_params[k] = v
+    
+    # 2. Inject system context if still missing
+    if owner:
+        if "user_id" not in final_params or final_params["user_id"] is None or (isinstance(final_params["user_id"], str) and not final_params["user_id"].strip()):
+            final_params["user_id"] = str(owner.id)
+        if "username" not in final_params or final_params["username"] is None or (isinstance(final_params["username"], str) and not final_params["username"].strip()):
+            final_params["username"] = owner.username
+        if "role" not in final_params or final_params["role"] is None or (isinstance(final_params["role"], str) and not final_params["role"].strip()):
+            final_params["role"] = str(owner.role)
+    return final_params
+
+def unsafe_request(sql_query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Executes a raw SQL query.
+
+    Access control:
+    - Current: admin, manager, client, service.
+    """
+
+    execution_id = execution_context.get()
+
+    db = lib_session()
+
+    try:
+        owner = _resolve_owner(db, execution_id, "unsafe_request")
+        final_params = _resolve_params(params, owner)
+
+        # Execute SQL (SELECTs may be served by the read replica)
+        with replica_reads(db):
+            result = db.execute(text(sql_query), final_params)
 
         rows = None
 
@@ -166,3 +192,108 @@ def unsafe_request(sql_query: str, params: Optional[Dict[str, Any]] = None) -> L
 
     finally:
         db.close()
+
+def _arrow_column(values: List[Any]):
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed or unsupported Python objects (e.g. heterogeneous JSON) become text
+        return pa.array([
+            None if v is None else (json.dumps(v, default=str) if isinstance(v, (dict, list)) else str(v))
+            for v in values
+        ])
+
+def _rows_to_frame(rows: List[Any], columns: List[str], as_arrow: bool):
+    """Builds a typed chunk straight from DBAPI row tuples (no per-row dicts)."""
+    if as_arrow:
+        if not rows:
+            return pa.table({name: pa.array([], pa.null()) for name in columns})
+        return pa.Table.from_arrays([_arrow_column(list(col)) for col in zip(*rows)], names=columns)
+    return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+def _iter_chunks(db, result, chunksize: int, as_arrow: bool) -> Iterator[Any]:
+    """Yields the result in chunks and releases the session once exhausted or closed."""
+    try:
+        # Primed by query_df so that closing an unconsumed iterator still runs the cleanup below
+        yield None
+        if not result.returns_rows:
+            db.commit()
+            return
+
+        columns = [str(c) for c in result.keys()]
+        emitted = False
+        for rows in result.partitions(chunksize):
+            emitted = True
+            yield _rows_to_frame(rows, columns, as_arrow)
+        if not emitted:
+            yield _rows_to_frame([], columns, as_arrow)
+
+        db.commit()
+
+    except Exception as e:
+        db.rollback()
+        system_log(
+            f"[DATABASE_LIB] Error in query_df: {str(e)}",
+            level="error"
+        )
+        raise
+
+    finally:
+        db.close()
+
+def query_df(sql_query: str, params: Optional[Dict[str, Any]] = None, chunksize: Optional[int] = None, as_arrow: bool = False):
+    """
+    Executes a SQL query and returns the rows as a typed pandas DataFrame
+    (or a pyarrow Table with as_arrow=True), without building a dict per row.
+
+    chunksize: when given, returns an iterator of DataFrames/Tables of at most
+    chunksize rows, for result sets too large to hold at once.
+
+    Same access control and parameter resolution as unsafe_request. Inside an execution
+    the query runs on the execution's session and sees its uncommitted writes; chunked
+    iterators can outlive the execution (e.g. returned by GenerateReport), so they use a
+    session of their own.
+    """
+    execution_id = execution_context.get()
+    if as_arrow and not ARROW_INSTALLED:
+        raise RuntimeError("Library 'pyarrow' is not installed.")
+    if chunksize is not None and chunksize <= 0:
+        raise ValueError("chunksize must be a positive number")
+
+    db = inherit_written_tables(SessionLocal()) if chunksize else lib_session()
+
+    try:
+        owner = _resolve_owner(db, execution_id, "query_df")
+        final_params = _resolve_params(params, owner)
+
+        # stream_results: server-side cursor, rows arrive in batches instead of all at once
+        fetch_rows = chunksize or QUERY_DF_FETCH_ROWS
+        with replica_reads(db):
+            result = db.execute(
+                text(sql_query).execution_options(stream_results=True, max_row_buffer=fetch_rows),
+                final_params,
+            )
+
+    except Exception as e:
+        db.rollback()
+        db.close()
+        system_log(
+            f"[DATABASE_LIB] Error in query_df: {str(e)}",
+            level="error"
+        )
+        raise
+
+    chunks = _iter_chunks(db, result, fetch_rows, as_arrow)
+    next(chunks)
+    if chunksize:
+        return chunks
+
+    frames = list(chunks)
+    if not frames:
+        # Statement returned no rows (e.g. UPDATE)
+        return pa.table({}) if as_arrow else pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    if as_arrow:
+        return pa.concat_tables(frames, promote_options="permissive")
+    return pd.concat(frames, ignore_index=True)
@@ -1,12 +1,45 @@
 import json
 import uuid
-from typing import Any, List, Optional, Dict, Union
-from sqlalchemy.orm import joinedload, selectinload
-from ..core.database import SessionLocal
+from collections import defaultdict
+from typing import Any, List, Optional, Dict, Iterator, Union
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from .session_lib import lib_session
 from ..models.schema import MetadataRecord, Schema
+from ..services.metadata_tree import subtree_ids, subtree_ids_with_schema
 from .logger_lib import system_log
 
-def _serialize_record(record: MetadataRecord) -> Dict[str, Any]:
+# Records of a loaded hierarchy grouped by parent_id (None for records whose parent wasn't loaded)
+Children = Dict[Optional[uuid.UUID], List[MetadataRecord]]
+
+def _load_tree(db, ids) -> Children:
+    """
+    Loads the records selected by `ids` (usually a subtree_ids select) with their
+    schemas in one query and groups them by parent, in the order of the children
+    relationship.
+    """
+    records = (
+        db.query(MetadataRecord)
+        .options(joinedload(MetadataRecord.schema))
+        .filter(MetadataRecord.id.in_(ids))
+        .order_by(MetadataRecord.order, MetadataRecord.id)
+        .all()
+    )
+    loaded = {record.id for record in records}
+    children: Children = defaultdict(list)
+    for record in records:
+        children[record.parent_id if record.parent_id in loaded else None].append(record)
+    return children
+
+def _walk(children: Children) -> Iterator[MetadataRecord]:
+    """Loaded records in hierarchy order (each record before its children)."""
+    stack = list(reversed(children.get(None, [])))
+    while stack:
+        record = stack.pop()
+        yield record
+        stack.extend(reversed(children.get(record.id, [])))
+
+def _serialize_record(record: MetadataRecord, children: Children) -> Dict[str, Any]:
     """Helper to convert MetadataRecord and its children to a hierarchical dictionary."""
     raw_data = record.data if record.data is not None else {}
     
@@ -25,19 +58,33 @@ def _serialize_record(record: MetadataRecord) -> Dict[str, Any]:
     data["__id__"] = str(record.id)
     # data["__lock__"] = record.lock # Removed as it's handled via LockData table now
     
-    if record.children:
-        data["children"] = [_serialize_record(child) for child in record.children]
+    if children.get(record.id):
+        data["children"] = [_serialize_record(child, children) for child in children[record.id]]
     
     return data
 
-def _find_records_by_schema_recursive(record: MetadataRecord, schema_key: str, results: List[Dict[str, Any]]):
-    """Recursively finds all records matching a schema key within a hierarchy."""
-    if record.schema and record.schema.key == schema_key:
-        results.append(_serialize_record(record))
-    
-    if record.children:
-        for child in record.children:
-            _find_records_by_schema_recursive(child, schema_key, results)
+def _entity_filter(entity_type: Optional[str], entity_id: uuid.UUID) -> list:
+    conditions = [MetadataRecord.entity_id == entity_id]
+    if entity_type is not None:
+        conditions.append(MetadataRecord.entity_type == entity_type)
+    return conditions
+
+def _is_entity_record(record: MetadataRecord, entity_type: Optional[str], entity_id: uuid.UUID) -> bool:
+    return record.entity_id == entity_id and (entity_type is None or record.entity_type == entity_type)
+
+def _find_entity_records_by_schema(db, entity_type: Optional[str], entity_id: uuid.UUID, schema_key: str) -> List[Dict[str, Any]]:
+    """
+    Records with the schema `schema_key` anywhere in the hierarchies assigned to an
+    entity, each with its subtree. The schema filter runs in SQL, so only the matching
+    subtrees are loaded.
+    """
+    matches = subtree_ids_with_schema(select(MetadataRecord.id).where(*_entity_filter(entity_type, entity_id)), schema_key)
+    children = _load_tree(db, subtree_ids(matches))
+    return [
+        _serialize_record(record, children)
+        for record in _walk(children)
+        if record.schema and record.schema.key == schema_key
+    ]
 
 def get_metadata(entity_type: str, entity_id: str, key: str) -> Any:
     """
@@ -48,24 +95,14 @@ def get_metadata(entity_type: str, entity_id: str, key: str) -> Any:
     """
     system_log(f"[METADATA_LIB] Retrieving metadata for entity_type: {entity_type}, entity_id: {entity_id}, key: {key}", level="system")
     
-    db = SessionLocal()
+    db = lib_session(read_only=True)
     try:
         # Convert string ID to UUID if needed
         entity_uuid = uuid.UUID(entity_id) if isinstance(entity_id, str) else entity_id
         
-        # Query records directly, loading schema and children
-        records = (
-            db.query(MetadataRecord)
-            .options(
-                joinedload(MetadataRecord.schema),
-                selectinload(MetadataRecord.children)
-            )
-            .filter(
-                MetadataRecord.entity_type == entity_type,
-                MetadataRecord.entity_id == entity_uuid
-            )
-            .all()
-        )
+        # The entity's records and all their descendants, loaded in one query
+        children = _load_tree(db, subtree_ids(select(MetadataRecord.id).where(*_entity_filter(entity_type, entity_uuid))))
+        records = [r for r in _walk(children) if _is_entity_record(r, entity_type, entity_uuid)]
         
         values = []
         for record in records:
@@ -78,7 +115,7 @@ def get_metadata(entity_type: str, entity_id: str, key: str) -> Any:
                     found = True
                 
                 if found:
-                    serialized = _serialize_record(record)
+                    serialized = _serialize_record(record, children)
                     values.append(serialized)
         
         if not values:
@@ -105,25 +142,18 @@ def get_metadata_by_id(metadata_id: str) -> Any:
     """
     system_log(f"[METADATA_LIB] Retrieving metadata by id: {metadata_id}", level="system")
     
-    db = SessionLocal()
+    db = lib_session(read_only=True)
     try:
         m_uuid = uuid.UUID(metadata_id) if isinstance(metadata_id, str) else metadata_id
         
-        record = (
-            db.query(MetadataRecord)
-            .options(
-                joinedload(MetadataRecord.schema),
-                selectinload(MetadataRecord.children)
-            )
-            .filter(MetadataRecord.id == m_uuid)
-            .first()
-        )
+        children = _load_tree(db, subtree_ids([m_uuid]))
+        record = children[None][0] if children.get(None) else None
         
         if not record:
             system_log(f"[METADATA_LIB] Record not found: {metadata_id}", level="warning")
             return None
             
-        serialized = _serialize_record(record)
+        serialized = _serialize_record(record, children)
         return serialized
 
     except Exception as e:
@@ -140,28 +170,18 @@ def get_all_metadata(entity_type: str, entity_id: str) -> Any:
     """
     system_log(f"[METADATA_LIB] Retrieving all metadata for entity_type: {entity_type}, entity_id: {entity_id}", level="system")
     
-    db = SessionLocal()
+    db = lib_session(read_only=True)
     try:
         # Convert string ID to UUID if needed
         entity_uuid = uuid.UUID(entity_id) if isinstance(entity_id, str) else entity_id
         
-        # Query all records for this entity
-        records = (
-            db.query(MetadataRecord)
-            .options(
-                joinedload(MetadataRecord.schema),
-                selectinload(MetadataRecord.children)
-            )
-            .filter(
-                MetadataRecord.entity_type == entity_type,
-                MetadataRecord.entity_id == entity_uuid
-            )
-            .all()
-        )
+        # All records for this entity, with their descendants
+        children = _load_tree(db, subtree_ids(select(MetadataRecord.id).where(*_entity_filter(entity_type, entity_uuid))))
         
         results = []
-        for record in records:
-            results.append(_serialize_record(record))
+        for record in _walk(children):
+            if _is_entity_record(record, entity_type, entity_uuid):
+                results.append(_serialize_record(record, children))
         
         system_log(f"[METADATA_LIB] Retrieved {len(results)} base records for entity {entity_id}", level="system")
         return results
@@ -187,21 +207,13 @@ def get_metadata_by_schema(schema_key: str) -> Any:
     """
     system_log(f"[METADATA_LIB] Retrieving metadata by schema_key: {schema_key}", level="system")
     
-    db = SessionLocal()
+    db = lib_session(read_only=True)
     try:
-        # Query records joined with schema and filtered by schema key
-        records = (
-            db.query(MetadataRecord)
-            .join(Schema)
-            .options(
-                joinedload(MetadataRecord.schema),
-                selectinload(MetadataRecord.children)
-            )
-            .filter(Schema.key == schema_key)
-            .all()
-        )
+        # Records with the schema key, with their descendants
+        matches = select(MetadataRecord.id).join(Schema, MetadataRecord.schema_id == Schema.id).where(Schema.key == schema_key)
+        children = _load_tree(db, subtree_ids(matches))
         
-        results = [_serialize_record(r) for r in records]
+        results = [_serialize_record(r, children) for r in _walk(children) if r.schema and r.schema.key == schema_key]
         
         system_log(f"[METADATA_LIB] Retrieved {len(results)} records for schema '{schema_key}'", level="system")
         return results
@@ -220,28 +232,12 @@ def get_client_metadata_by_schema(client_id: str, schema_key: str) -> Any:
     """
     system_log(f"[METADATA_LIB] Hierarchical retrieval for client {client_id} by schema_key: {schema_key}", level="system")
     
-    db = SessionLocal()
+    db = lib_session(read_only=True)
     try:
         # Convert string ID to UUID if needed
         client_uuid = uuid.UUID(client_id) if isinstance(client_id, str) else client_id
         
-        # Query ALL records for this client
-        records = (
-            db.query(MetadataRecord)
-            .options(
-                joinedload(MetadataRecord.schema),
-                selectinload(MetadataRecord.children)
-            )
-            .filter(
-                MetadataRecord.entity_type == "users",
-                MetadataRecord.entity_id == client_uuid
-            )
-            .all()
-        )
-        
-        matches = []
-        for record in records:
-            _find_records_by_schema_recursive(record, schema_key, matches)
+        matches = _find_entity_records_by_schema(db, "users", client_uuid, schema_key)
         
         system_log(f"[METADATA_LIB] Found {len(matches)} matching records in hierarchy for client {client_id} and schema '{schema_key}'", level="system")
         return matches
@@ -260,7 +256,7 @@ def get_owner_metadata_by_schema(owner_id: str, schema_key: str) -> Any:
     """
     system_log(f"[METADATA_LIB] Hierarchical retrieval for owner {owner_id} by schema_key: {schema_key}", level="system")
     
-    db = SessionLocal()
+    db = lib_session(read_only=True)
     try:
         # Convert string ID to UUID if needed
         owner_uuid = uuid.UUID(owner_id) if isinstance(owner_id, str) else owner_id
@@ -270,19 +266,7 @@ def get_owner_metadata_by_schema(owner_id: str, schema_key: str) -> Any:
         # we now treat entity_id as the primary link.
         # If owner_id logic is still needed, it should have been migrated to entity_id 
         # or entity_type should be handled.
-        records = (
-            db.query(MetadataRecord)
-            .options(
-                joinedload(MetadataRecord.schema),
-                selectinload(MetadataRecord.children)
-            )
-            .filter(MetadataRecord.entity_id == owner_uuid)
-            .all()
-        )
-        
-        matches = []
-        for record in records:
-            _find_records_by_schema_recursive(record, schema_key, matches)
+        matches = _find_entity_records_by_schema(db, None, owner_uuid, schema_key)
         
         system_log(f"[METADATA_LIB] Found {len(matches)} matching records in hierarchy for owner {owner_id} and schema '{schema_key}'", level="system")
         return matches
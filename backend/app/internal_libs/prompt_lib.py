@@ -1,10 +1,14 @@
+import json
 import uuid
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Union
-from ..core.database import SessionLocal
+from sqlalchemy import insert
+from ..core.config import BULK_INSERT_CHUNK_SIZE
+from .session_lib import lib_session
 from ..models.prompt import Prompt
 from .logger_lib import system_log
 from .projects_lib import get_project_id
+from ..services.report_cache import invalidate_dependency
 
 def _make_serializable(data: Any) -> Any:
     """Recursively converts objects to JSON-serializable types."""
@@ -30,6 +34,45 @@ def _make_serializable(data: Any) -> Any:
         except:
             return str(data)
 
+def _prompt_values(
+    entity_id: str,
+    entity_type: str,
+    category: str,
+    content: Dict[str, Any],
+    datatype: str,
+    reference_id: Optional[str] = None,
+    meta: Optional[Dict[str, Any]] = None,
+    raw: Optional[str] = None
+) -> Dict[str, Any]:
+    """Column values of a new Prompt row (shared by add_prompt and add_prompts_bulk)."""
+    # Convert string ID to UUID
+    e_uuid = uuid.UUID(entity_id) if isinstance(entity_id, str) else entity_id
+
+    # Convert reference_id to UUID if provided
+    ref_uuid = None
+    if reference_id:
+        ref_uuid = uuid.UUID(reference_id) if isinstance(reference_id, str) else reference_id
+
+    # Handle raw field serialization
+    serializable_raw = raw
+    if raw is not None and not isinstance(raw, str):
+        serializable_raw = _make_serializable(raw)
+        if not isinstance(serializable_raw, str):
+            serializable_raw = json.dumps(serializable_raw, ensure_ascii=False)
+
+    # Ensure content and meta are JSON-serializable
+    return {
+        "project_id": get_project_id(),
+        "entity_id": e_uuid,
+        "entity_type": entity_type,
+        "category": category,
+        "content": _make_serializable(content),
+        "datatype": datatype,
+        "reference_id": ref_uuid,
+        "meta": _make_serializable(meta) if meta else None,
+        "raw": serializable_raw,
+    }
+
 def add_prompt(
     entity_id: str,
     entity_type: str,
@@ -58,42 +101,16 @@ def add_prompt(
     """
     system_log(f"[PROMPT_LIB] Adding prompt for entity_id: {entity_id}, type: {entity_type}, category: {category}, reference_id: {reference_id}", level="system")
     
-    db = SessionLocal()
+    db = lib_session()
     try:
-        # Convert string ID to UUID
-        e_uuid = uuid.UUID(entity_id) if isinstance(entity_id, str) else entity_id
-        
-        # Convert reference_id to UUID if provided
-        ref_uuid = None
-        if reference_id:
-            ref_uuid = uuid.UUID(reference_id) if isinstance(reference_id, str) else reference_id
-
-        # Ensure content and meta are JSON-serializable
-        serializable_content = _make_serializable(content)
-        serializable_meta = _make_serializable(meta) if meta else None
-        
-        # Handle raw field serialization
-        serializable_raw = raw
-        if raw is not None and not isinstance(raw, str):
-            serializable_raw = _make_serializable(raw)
-            if not isinstance(serializable_raw, str):
-                import json
-                serializable_raw = json.dumps(serializable_raw, ensure_ascii=False)
-
-        new_prompt = Prompt(
-            project_id=get_project_id(),
-            entity_id=e_uuid,
-            entity_type=entity_type,
-            category=category,
-            content=serializable_content,
-            datatype=datatype,
-            reference_id=ref_uuid,
-            meta=serializable_meta,
-            raw=serializable_raw
-        )
-        
+        new_prompt = Prompt(**_prompt_values(
+            entity_id, entity_type, category, content, datatype,
+            reference_id=reference_id, meta=meta, raw=raw
+        ))
+
         db.add(new_prompt)
         db.commit()
+        invalidate_dependency("prompts", db)
         db.refresh(new_prompt)
         
         system_log(f"[PROMPT_LIB] Successfully added prompt with ID: {new_prompt.id}", level="system")
@@ -106,6 +123,45 @@ def add_prompt(
     finally:
         db.close()
 
+def add_prompts_bulk(prompts: List[Dict[str, Any]], chunk_size: Optional[int] = None) -> Union[List[str], Dict[str, str]]:
+    """
+    Adds many prompts in a single transaction.
+
+    Args:
+        prompts: List of dictionaries with the arguments of add_prompt
+            (entity_id, entity_type, category, content, datatype, and optionally
+            reference_id, meta, raw).
+        chunk_size: Rows per INSERT round trip (default BULK_INSERT_CHUNK_SIZE).
+
+    Returns:
+        The IDs of the new prompts in the order of `prompts`, or an error dictionary;
+        on error nothing is added.
+    """
+    chunk_size = chunk_size or BULK_INSERT_CHUNK_SIZE
+    system_log(f"[PROMPT_LIB] Adding {len(prompts)} prompts in chunks of {chunk_size}", level="system")
+
+    db = lib_session()
+    try:
+        rows = [_prompt_values(**prompt) for prompt in prompts]
+        statement = insert(Prompt).returning(Prompt.id, sort_by_parameter_order=True)
+        ids = []
+        for start in range(0, len(rows), chunk_size):
+            ids.extend(str(new_id) for new_id in db.execute(statement, rows[start:start + chunk_size]).scalars())
+
+        db.commit()
+        if rows:
+            invalidate_dependency("prompts", db)
+
+        system_log(f"[PROMPT_LIB] Successfully added {len(ids)} prompts", level="system")
+        return ids
+
+    except Exception as e:
+        db.rollback()
+        system_log(f"[PROMPT_LIB] Error adding prompts: {str(e)}", level="error")
+        return {"error": str(e)}
+    finally:
+        db.close()
+
 def get_prompts_by_category_with_reference_id(category: str, reference_id: str) -> list:
     """
     Retrieves prompts by category and reference_id.
@@ -117,7 +173,7 @@ def get_prompts_by_category_with_reference_id(category: str, reference_id: str)
     Returns:
         A list of prompt dictionaries.
     """
-    db = SessionLocal()
+    db = lib_session(read_only=True)
     try:
         ref_uuid = uuid.UUID(reference_id) if isinstance(reference_id, str) else reference_id
         prompts = db.query(Prompt).filter(
@@ -159,7 +215,7 @@ def get_prompts_by_category_with_id(category: str, entity_id: str) -> list:
     Returns:
         A list of prompt dictionaries.
     """
-    db = SessionLocal()
+    db = lib_session(read_only=True)
     try:
         e_uuid = uuid.UUID(entity_id) if isinstance(entity_id, str) else entity_id
         prompts = db.query(Prompt).filter(
@@ -219,7 +275,7 @@ def delete_prompts_by_period_and_entity(
         level="system"
     )
 
-    db = SessionLocal()
+    db = lib_session()
     try:
         # Convert string ID to UUID
         e_uuid = uuid.UUID(entity_id) if isinstance(entity_id, str) else entity_id
@@ -242,6 +298,7 @@ def delete_prompts_by_period_and_entity(
         count = delete_query.count()
         delete_query.delete(synchronize_session=False)
         db.commit()
+        invalidate_dependency("prompts", db)
 
         system_log(f"[PROMPT_LIB] Successfully deleted {count} prompts", level="system")
         result = {
@@ -290,7 +347,7 @@ def delete_prompts_by_period_and_reference_id(
         level="system"
     )
 
-    db = SessionLocal()
+    db = lib_session()
     try:
         # Convert string ID to UUID
         r_uuid = uuid.UUID(reference_id) if isinstance(reference_id, str) else reference_id
@@ -313,6 +370,7 @@ def delete_prompts_by_period_and_reference_id(
         count = delete_query.count()
         delete_query.delete(synchronize_session=False)
         db.commit()
+        invalidate_dependency("prompts", db)
 
         system_log(f"[PROMPT_LIB] Successfully deleted {count} prompts", level="system")
         result = {
@@ -2,10 +2,13 @@ import uuid
 import json
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional, Union
-from ..core.database import SessionLocal
+from sqlalchemy import insert
+from ..core.config import BULK_INSERT_CHUNK_SIZE
+from .session_lib import lib_session
 from ..models.response import Response
 from .logger_lib import system_log
 from .projects_lib import get_project_id
+from ..services.report_cache import invalidate_dependency
 
 def clear_recent_records_by_entity_and_category(
     reference_id: Union[str, uuid.UUID],
@@ -39,7 +42,7 @@ def clear_recent_records_by_entity_and_category(
         level="system"
     )
 
-    db = SessionLocal()
+    db = lib_session()
     try:
         # Convert string IDs to UUID if necessary
         e_uuid = uuid.UUID(entity_id) if isinstance(entity_id, str) else entity_id
@@ -62,6 +65,7 @@ def clear_recent_records_by_entity_and_category(
         delete_query.delete(synchronize_session=False)
         
         db.commit()
+        invalidate_dependency("response", db)
         
         system_log(
             f"[RESPONSE_LIB] Successfully cleared {count} records in the {n_days}-day update window "
@@ -87,6 +91,39 @@ def clear_recent_records_by_entity_and_category(
     finally:
         db.close()
 
+def _response_values(
+    reference_id: Union[str, uuid.UUID],
+    entity_id: Union[str, uuid.UUID],
+    entity_type: str,
+    category: str,
+    context: Dict[str, Any],
+    context_type: str,
+    reference_type: Optional[str] = None,
+    meta: Optional[Dict[str, Any]] = None,
+    raw: Optional[str] = None
+) -> Dict[str, Any]:
+    """Column values of a new Response row (shared by add_response and add_responses_bulk)."""
+    # Resolve UUIDs
+    e_uuid = uuid.UUID(entity_id) if isinstance(entity_id, str) else entity_id
+    ref_uuid = uuid.UUID(reference_id) if isinstance(reference_id, str) else reference_id
+
+    # Ensure raw is a string (TEXT column)
+    if raw is not None and not isinstance(raw, str):
+        raw = str(raw)
+
+    return {
+        "project_id": get_project_id(),
+        "entity_id": e_uuid,
+        "entity_type": entity_type,
+        "category": category,
+        "context": context,
+        "context_type": context_type,
+        "reference_id": ref_uuid,
+        "reference_type": reference_type,
+        "meta": meta,
+        "raw": raw,
+    }
+
 def add_response(
     reference_id: Union[str, uuid.UUID],
     entity_id: Union[str, uuid.UUID],
@@ -125,34 +162,16 @@ def add_response(
         level="system"
     )
 
-    db = SessionLocal()
+    db = lib_session()
     try:
-        # Resolve UUIDs
-        e_uuid = uuid.UUID(entity_id) if isinstance(entity_id, str) else entity_id
-        
-        ref_uuid = None
-        if reference_id:
-            ref_uuid = uuid.UUID(reference_id) if isinstance(reference_id, str) else reference_id
-
-        # Ensure raw is a string (TEXT column)
-        if raw is not None and not isinstance(raw, str):
-            raw = str(raw)
-
-        new_record = Response(
-            project_id=get_project_id(),
-            entity_id=e_uuid,
-            entity_type=entity_type,
-            category=category,
-            context=context,
-            context_type=context_type,
-            reference_id=ref_uuid,
-            reference_type=reference_type,
-            meta=meta,
-            raw=raw
-        )
+        new_record = Response(**_response_values(
+            reference_id, entity_id, entity_type, category, context, context_type,
+            reference_type=reference_type, meta=meta, raw=raw
+        ))
 
         db.add(new_record)
         db.commit()
+        invalidate_dependency("response", db)
         db.refresh(new_record)
 
         system_log(
@@ -175,6 +194,66 @@ def add_response(
     finally:
         db.close()
 
+def add_responses_bulk(
+    records: List[Dict[str, Any]],
+    chunk_size: Optional[int] = None
+) -> Union[List[Optional[str]], Dict[str, Any]]:
+    """
+    Adds many records to the 'response' table in a single transaction.
+
+    Args:
+        records: List of dictionaries with the arguments of add_response
+            (reference_id, entity_id, entity_type, category, context, context_type,
+            and optionally reference_type, meta, raw).
+        chunk_size: Rows per INSERT round trip (default BULK_INSERT_CHUNK_SIZE).
+
+    Returns:
+        The IDs of the new records in the order of `records` (None for records skipped
+        because reference_id is missing), or an error dictionary; on error nothing is added.
+    """
+    chunk_size = chunk_size or BULK_INSERT_CHUNK_SIZE
+    system_log(f"[RESPONSE_LIB] Adding {len(records)} records in chunks of {chunk_size}", level="system")
+
+    db = lib_session()
+    try:
+        positions = []
+        rows = []
+        for index, record in enumerate(records):
+            if not record.get("reference_id"):
+                continue
+            positions.append(index)
+            rows.append(_response_values(**record))
+        skipped = len(records) - len(rows)
+        if skipped:
+            system_log(f"[RESPONSE_LIB] Skipping {skipped} records without reference_id", level="warning")
+
+        ids: List[Optional[str]] = [None] * len(records)
+        statement = insert(Response).returning(Response.id, sort_by_parameter_order=True)
+        for start in range(0, len(rows), chunk_size):
+            new_ids = db.execute(statement, rows[start:start + chunk_size]).scalars().all()
+            for index, new_id in zip(positions[start:start + chunk_size], new_ids):
+                ids[index] = str(new_id)
+
+        db.commit()
+        if rows:
+            invalidate_dependency("response", db)
+
+        system_log(f"[RESPONSE_LIB] Successfully added {len(rows)} records", level="system")
+        return ids
+
+    except Exception as e:
+        db.rollback()
+        system_log(
+            f"[RESPONSE_LIB] Error adding records: {str(e)}",
+            level="error"
+        )
+        return {
+            "status": "error",
+            "message": str(e)
+        }
+    finally:
+        db.close()
+
 def update_response_meta(
     record_id: Union[str, uuid.UUID],
     meta: Dict[str, Any]
@@ -194,7 +273,7 @@ def update_response_meta(
         level="system"
     )
 
-    db = SessionLocal()
+    db = lib_session()
     try:
         # Resolve UUID
         r_uuid = uuid.UUID(record_id) if isinstance(record_id, str) else record_id
@@ -218,6 +297,7 @@ def update_response_meta(
         record.meta = meta
         
         db.commit()
+        invalidate_dependency("response", db)
 
         system_log(
             f"[RESPONSE_LIB] Successfully updated meta for record: {record_id}",
@@ -262,7 +342,7 @@ def update_response_meta_by_key(
         level="system"
     )
 
-    db = SessionLocal()
+    db = lib_session()
     try:
         # Resolve UUID
         r_uuid = uuid.UUID(record_id) if isinstance(record_id, str) else record_id
@@ -300,6 +380,7 @@ def update_response_meta_by_key(
         record.meta = current_meta
         
         db.commit()
+        invalidate_dependency("response", db)
 
         system_log(
             f"[RESPONSE_LIB] Successfully updated meta key '{key}' for record: {record_id}",
@@ -354,7 +435,7 @@ def get_responses_by_period_and_category(
         level="system"
     )
 
-    db = SessionLocal()
+    db = lib_session(read_only=True)
     try:
         # Parse dates if they are strings
         if isinstance(start_date, str):
@@ -1,6 +1,6 @@
 import json
 from typing import Any, List, Optional, Dict
-from ..core.database import SessionLocal
+from .session_lib import lib_session
 from ..models.schema import Schema
 from .logger_lib import system_log
 
@@ -12,7 +12,7 @@ def get_schema_by_key(key: str) -> str:
     """
     system_log(f"[SCHEMA_LIB] Retrieving schema for key: {key}", level="system")
     
-    db = SessionLocal()
+    db = lib_session(read_only=True)
     try:
         schema = db.query(Schema).filter(Schema.key == key).first()
         
@@ -37,7 +37,7 @@ def get_all_schemas() -> str:
     """
     system_log("[SCHEMA_LIB] Retrieving all schemas", level="system")
     
-    db = SessionLocal()
+    db = lib_session(read_only=True)
     try:
         schemas = db.query(Schema).all()
         
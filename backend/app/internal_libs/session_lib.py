@@ -0,0 +1,111 @@
+"""
+Execution-scoped database session for internal libs.
+
+WorkflowExecutor (for the whole execution) and ReportExecutor (per run) bind one
+session in db_session_context. Lib functions open their session with lib_session()
+instead of SessionLocal(): inside an execution they get a view of the bound session
+whose work runs in a SAVEPOINT, so a failing call only rolls back its own changes and
+no extra connection is checked out. Outside an execution they get a private
+SessionLocal() as before.
+
+The view keeps the usual lib pattern working unchanged:
+
+    db = lib_session()
+    try:
+        ...
+        db.commit()      # releases the savepoint (made durable when the execution commits)
+    except Exception:
+        db.rollback()    # rolls back to the savepoint
+        raise
+    finally:
+        db.close()       # ends the savepoint, the shared session stays open
+
+Read-only lib calls use lib_session(read_only=True): their SELECTs may be served by the
+read replica, except for tables the execution has written (see RoutingSession).
+"""
+from contextlib import contextmanager
+
+from ..core.database import SessionLocal, replica_reads
+from .context_lib import db_session_context
+
+
+class SavepointSession:
+    """One lib call's view of the bound session."""
+
+    def __init__(self, session, read_only: bool = False):
+        self._session = session
+        self._savepoint = session.begin_nested()
+        self._replica_reads = None
+        if read_only:
+            self._replica_reads = replica_reads(session)
+            self._replica_reads.__enter__()
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def commit(self):
+        if self._savepoint.is_active:
+            self._savepoint.commit()
+        self._savepoint = self._session.begin_nested()
+
+    def rollback(self):
+        if self._savepoint.is_active:
+            self._savepoint.rollback()
+        self._savepoint = self._session.begin_nested()
+
+    def close(self):
+        if self._replica_reads is not None:
+            self._replica_reads, reads = None, self._replica_reads
+            reads.__exit__(None, None, None)
+        if not self._savepoint.is_active:
+            return
+        try:
+            self._savepoint.commit()
+        except Exception:
+            # e.g. a failed statement left the savepoint unusable
+            if self._savepoint.is_active:
+                self._savepoint.rollback()
+
+
+def lib_session(read_only: bool = False):
+    """Session for an internal lib call; see the module docstring."""
+    shared = db_session_context.get()
+    if shared is None:
+        db = SessionLocal()
+        if read_only:
+            db.info["replica_reads"] = 1
+        return db
+    return SavepointSession(shared, read_only=read_only)
+
+
+def inherit_written_tables(db):
+    """Gives a separate session the read-your-writes state of the bound session."""
+    shared = db_session_context.get()
+    if shared is not None:
+        db.info.setdefault("written_tables", set()).update(shared.info.get("written_tables", ()))
+    return db
+
+
+@contextmanager
+def bind_session(db):
+    """Makes `db` the session lib calls in this context share."""
+    token = db_session_context.set(db)
+    try:
+        yield db
+    finally:
+        db_session_context.reset(token)
+
+
+@contextmanager
+def unit_of_work():
+    """Binds a new session for the block and commits what lib calls left pending."""
+    db = SessionLocal()
+    try:
+        with bind_session(db):
+            yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -1,6 +1,6 @@
 from typing import Dict, Any, Optional
 import uuid
-from ..core.database import SessionLocal
+from .session_lib import lib_session
 from ..models.workflow import Workflow, WorkflowExecution
 from sqlalchemy.orm.attributes import flag_modified
 
@@ -11,7 +11,7 @@ def get_workflow_data(execution_id: str) -> Optional[Dict[str, Any]]:
     """
     Get the workflow data structure.
     """
-    db = SessionLocal()
+    db = lib_session()
     try:
         execution = _get_execution(db, execution_id)
         if execution and execution.workflow:
@@ -27,7 +27,7 @@ def get_runtime_data(execution_id: str) -> Optional[Dict[str, Any]]:
     """
     Get the runtime data structure from execution.
     """
-    db = SessionLocal()
+    db = lib_session()
     try:
         execution = _get_execution(db, execution_id)
         if execution:
@@ -43,7 +43,7 @@ def update_runtime_data(execution_id: str, new_data: Dict[str, Any]) -> bool:
     """
     Update the runtime data structure on execution.
     """
-    db = SessionLocal()
+    db = lib_session()
     try:
         execution = _get_execution(db, execution_id)
         if execution:
@@ -32,6 +32,15 @@ def cleanup_old_files():
     except Exception as e:
         system_log(f"Error during temp storage cleanup: {str(e)}", level="error")
 
+def get_path(filename: str) -> str:
+    """
+    Returns the absolute path for a file in the temporary storage.
+    Used by writers that stream directly to disk (e.g. PDF rendering) instead of passing data to save().
+    """
+    ensure_temp_dir()
+    # Guard against directory traversal
+    return os.path.join(TEMP_DIR, os.path.basename(filename))
+
 def save(data: Union[str, bytes], file_type: str = "txt", filename: str = None) -> Dict[str, Any]:
     """
     Saves data to a temporary file and returns its path and success status.
@@ -41,7 +41,7 @@ def database_query(query: str) -> str:
     try:
         import re
         from sqlalchemy import text
-        from ..core.database import SessionLocal
+        from .session_lib import lib_session
         
         if not query:
             res = "Error: Database query is empty."
@@ -96,7 +96,7 @@ def database_query(query: str) -> str:
                 system_log(f"[TOOL] Error: database_query -> {res}", level="error")
                 return res
         
-        db = SessionLocal()
+        db = lib_session()
         try:
             result = db.execute(text(query_str))
             
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime, JSON, Integer, UUID, ForeignKey, Index, UniqueConstraint
+from sqlalchemy import Column, String, Boolean, DateTime, JSON, Integer, UUID, ForeignKey, Index, UniqueConstraint, event, inspect, literal, or_, select, true
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import uuid
@@ -48,6 +48,65 @@ class MetadataRecord(Base):
     children = relationship("MetadataRecord", back_populates="parent", cascade="all, delete-orphan", order_by="MetadataRecord.order")
 
 
+class MetadataClosure(Base):
+    """
+    Ancestor/descendant pairs of the metadata hierarchy, including every record paired
+    with itself at depth 0. Maintained by the MetadataRecord events below, in the
+    transaction of the change.
+    """
+    __tablename__ = "metadata_closure"
+
+    ancestor_id = Column(UUID(as_uuid=True), ForeignKey('metadata.id', ondelete='CASCADE'), primary_key=True)
+    descendant_id = Column(UUID(as_uuid=True), ForeignKey('metadata.id', ondelete='CASCADE'), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("idx_metadata_closure_descendant", "descendant_id", "depth"),
+    )
+
+
+@event.listens_for(MetadataRecord, "after_insert")
+def add_to_closure(mapper, connection, target):
+    closure = MetadataClosure.__table__
+    connection.execute(closure.insert().values(ancestor_id=target.id, descendant_id=target.id, depth=0))
+    if target.parent_id is not None:
+        connection.execute(closure.insert().from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(closure.c.ancestor_id, literal(target.id, closure.c.descendant_id.type), closure.c.depth + 1)
+            .where(closure.c.descendant_id == target.parent_id)
+        ))
+
+
+@event.listens_for(MetadataRecord, "after_update")
+def move_in_closure(mapper, connection, target):
+    if not inspect(target).attrs.parent_id.history.has_changes():
+        return
+    closure = MetadataClosure.__table__
+    subtree = select(closure.c.descendant_id).where(closure.c.ancestor_id == target.id)
+    if target.parent_id is not None and connection.execute(
+        select(closure.c.depth).where(closure.c.ancestor_id == target.id, closure.c.descendant_id == target.parent_id)
+    ).first() is not None:
+        raise ValueError(f"Metadata record {target.id} can't be moved under itself or its descendants")
+
+    # Detach the subtree from its former ancestors, then link it below the new parent
+    connection.execute(closure.delete().where(closure.c.descendant_id.in_(subtree), closure.c.ancestor_id.not_in(subtree)))
+    if target.parent_id is not None:
+        above, below = closure.alias("above"), closure.alias("below")
+        connection.execute(closure.insert().from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(above.c.ancestor_id, below.c.descendant_id, above.c.depth + below.c.depth + 1)
+            .select_from(above.join(below, true()))
+            .where(above.c.descendant_id == target.parent_id, below.c.ancestor_id == target.id)
+        ))
+
+
+@event.listens_for(MetadataRecord, "after_delete")
+def remove_from_closure(mapper, connection, target):
+    # PostgreSQL already cascades; SQLite doesn't enforce foreign keys
+    closure = MetadataClosure.__table__
+    connection.execute(closure.delete().where(or_(closure.c.ancestor_id == target.id, closure.c.descendant_id == target.id)))
+
+
 
 
 class ExternalSchemaCache(Base):
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON, Enum, UUID, cast, and_
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON, Enum, UUID, Index, cast, and_
 from sqlalchemy.orm import relationship, remote, foreign
 from sqlalchemy.sql import func
 from ..core.database import Base
@@ -73,6 +73,11 @@ class WorkflowExecution(Base):
     workflow = relationship("Workflow", back_populates="executions")
     node_results = relationship("NodeExecution", back_populates="execution", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Executions of a workflow by start time (execution history, client results)
+        Index("idx_workflow_executions_workflow_started", "workflow_id", "started_at"),
+    )
+
 
 class NodeExecution(Base):
     __tablename__ = "node_executions"
@@ -1,18 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 from pydantic import BaseModel
 import uuid
-from ..core.database import get_db
+from ..core.database import get_db, get_read_db, pool_stats, replica_engine
 from ..core.security import require_role, hash_password
 import ast
 from ..models.user import User, RoleEnum
 from ..models.node import NodeType
 from ..models.credential import Credential
-from ..models import LockData
-from sqlalchemy import exists, and_
 from sqlalchemy.exc import IntegrityError
-from ..core.locks import raise_if_locked, check_is_locked
+from ..core.locks import raise_if_locked, check_is_locked, lock_cache, with_lock_status
+from ..core.pagination import ListParams, paginate, project, render
+from ..services.report_cache import report_cache
+from ..services.chart_cache import chart_cache
+from ..services.parameter_options import parameter_options
+from ..services.report_refresh import report_refresh
+from ..services.report_markdown import markdown_cache
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 admin_only = Depends(require_role("admin"))
@@ -36,20 +40,14 @@ class UserOut(UserSummary):
 
 
 @router.get("/users", response_model=List[UserOut])
-def list_users(db: Session = Depends(get_db), _=admin_only):
-    is_locked_subquery = db.query(LockData.id).filter(
-        LockData.entity_id == User.id,
-        LockData.entity_type == "users"
-    ).exists()
-    
-    results = db.query(User, is_locked_subquery.label("is_locked")).options(selectinload(User.assigned_managers)).all()
-    
-    response = []
-    for user, is_locked in results:
-        user_dict = UserOut.model_validate(user).model_dump()
-        user_dict["is_locked"] = is_locked
-        response.append(user_dict)
-    return response
+def list_users(response: Response, params: ListParams = Depends(), db: Session = Depends(get_read_db), _=admin_only):
+    query = db.query(User)
+    if params.fields:
+        query = project(query, User, params, UserOut, relationships=("assigned_managers",))
+    else:
+        query = query.options(selectinload(User.assigned_managers))
+    results = paginate(query, params, response, (User.username, User.id))
+    return render(with_lock_status(db, "users", results), params, response, UserOut)
 
 
 def extract_node_parameters(code: str) -> list:
@@ -351,33 +349,22 @@ class CredentialOut(BaseModel):
 
 
 @router.get("/users", response_model=List[UserOut])
-def list_users(db: Session = Depends(get_db), _=admin_only):
-    is_locked_subquery = db.query(LockData.id).filter(
-        LockData.entity_id == User.id,
-        LockData.entity_type == "users"
-    ).exists()
-    
-    results = db.query(User, is_locked_subquery.label("is_locked")).options(selectinload(User.assigned_managers)).all()
-    
-    response = []
-    for user, is_locked in results:
-        user_dict = UserOut.model_validate(user).model_dump()
-        user_dict["is_locked"] = is_locked
-        response.append(user_dict)
-    return response
+def list_users(response: Response, params: ListParams = Depends(), db: Session = Depends(get_read_db), _=admin_only):
+    query = db.query(User)
+    if params.fields:
+        query = project(query, User, params, UserOut, relationships=("assigned_managers",))
+    else:
+        query = query.options(selectinload(User.assigned_managers))
+    results = paginate(query, params, response, (User.username, User.id))
+    return render(with_lock_status(db, "users", results), params, response, UserOut)
 
 
 @router.get("/managers", response_model=List[UserOut])
-def list_managers(db: Session = Depends(get_db), _=admin_only):
-    is_locked_subquery = db.query(LockData.id).filter(
-        LockData.entity_id == User.id,
-        LockData.entity_type == "users"
-    ).exists()
-    
-    results = db.query(User, is_locked_subquery.label("is_locked")).filter(User.role == RoleEnum.manager).all()
+def list_managers(db: Session = Depends(get_read_db), _=admin_only):
+    results = db.query(User).filter(User.role == RoleEnum.manager).all()
     
     response = []
-    for user, is_locked in results:
+    for user, is_locked in with_lock_status(db, "users", results):
         user_dict = UserOut.model_validate(user).model_dump()
         user_dict["is_locked"] = is_locked
         response.append(user_dict)
@@ -420,20 +407,10 @@ def unassign_client(manager_id: uuid.UUID, client_id: uuid.UUID, db: Session = D
 
 
 @router.get("/node-types", response_model=List[NodeTypeOut])
-def list_node_types(db: Session = Depends(get_db), _=admin_only):
-    is_locked_subquery = db.query(LockData.id).filter(
-        LockData.entity_id == NodeType.id,
-        LockData.entity_type == "node_types"
-    ).exists()
-    
-    results = db.query(NodeType, is_locked_subquery.label("is_locked")).all()
-    
-    response = []
-    for node, is_locked in results:
-        node_dict = NodeTypeOut.model_validate(node).model_dump()
-        node_dict["is_locked"] = is_locked
-        response.append(node_dict)
-    return response
+def list_node_types(response: Response, params: ListParams = Depends(), db: Session = Depends(get_read_db), _=admin_only):
+    query = project(db.query(NodeType), NodeType, params, NodeTypeOut)
+    results = paginate(query, params, response, (NodeType.name, NodeType.id))
+    return render(with_lock_status(db, "node_types", results), params, response, NodeTypeOut)
 
 
 @router.get("/node-types/{node_id}", response_model=NodeTypeOut)
@@ -523,16 +500,11 @@ def delete_node_type(node_id: uuid.UUID, db: Session = Depends(get_db), _=admin_
 
 
 @router.get("/credentials", response_model=List[CredentialOut])
-def list_credentials(db: Session = Depends(get_db), _=admin_only):
-    # Use an outer join to check for locks, which is more portable than exists() in SELECT
-    results = db.query(Credential, LockData.id.isnot(None).label("is_locked")) \
-        .outerjoin(LockData, and_(
-            LockData.entity_id == Credential.id,
-            LockData.entity_type == "credentials"
-        )).all()
+def list_credentials(db: Session = Depends(get_read_db), _=admin_only):
+    results = db.query(Credential).all()
     
     response = []
-    for cred, is_locked in results:
+    for cred, is_locked in with_lock_status(db, "credentials", results):
         cred_dict = CredentialOut.model_validate(cred).model_dump()
         cred_dict["is_locked"] = is_locked
         response.append(cred_dict)
@@ -577,3 +549,18 @@ def delete_credential(credential_id: uuid.UUID, db: Session = Depends(get_db), _
     db.delete(credential)
     db.commit()
     return {"status": "deleted"}
+
+
+@router.get("/metrics")
+def get_metrics(_=admin_only):
+    """Runtime counters of the connection pool, in-process caches and background workers."""
+    return {
+        "db_pool": pool_stats(),
+        "db_replica_pool": pool_stats(replica_engine) if replica_engine is not None else None,
+        "report_cache": report_cache.stats(),
+        "chart_cache": chart_cache.stats(),
+        "markdown_cache": markdown_cache.stats(),
+        "parameter_options": parameter_options.stats(),
+        "lock_cache": lock_cache.stats(),
+        "report_refresh": report_refresh.stats(),
+    }
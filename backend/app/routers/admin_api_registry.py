@@ -1,14 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session, attributes
-from sqlalchemy import and_
 from typing import List, Optional
 from uuid import UUID
 
 from ..core.database import get_db
 from ..models.api_registry import ApiRegistry as ApiRegistryModel
-from ..models.lock import LockData
 from ..schemas.api_registry import ApiRegistry, ApiRegistryCreate, ApiRegistryUpdate
-from ..core.locks import raise_if_locked
+from ..core.locks import raise_if_locked, check_is_locked, with_lock_status
 
 router = APIRouter()
 
@@ -18,11 +16,7 @@ def list_api_registry(
     db: Session = Depends(get_db)
 ):
     try:
-        query = db.query(ApiRegistryModel, LockData.id.isnot(None).label("is_locked")) \
-            .outerjoin(LockData, and_(
-                LockData.entity_id == ApiRegistryModel.id,
-                LockData.entity_type == "api_registry"
-            ))
+        query = db.query(ApiRegistryModel)
             
         if project_id:
             query = query.filter(ApiRegistryModel.project_id == project_id)
@@ -32,7 +26,7 @@ def list_api_registry(
         results = query.all()
         
         response = []
-        for api, is_locked in results:
+        for api, is_locked in with_lock_status(db, "api_registry", results):
             api_dict = ApiRegistry.model_validate(api).model_dump()
             api_dict["is_locked"] = is_locked
             response.append(api_dict)
@@ -95,20 +89,13 @@ def get_api_registry(api_id: str, db: Session = Depends(get_db)):
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid API ID format")
             
-        result = db.query(ApiRegistryModel, LockData.id.isnot(None).label("is_locked")) \
-            .outerjoin(LockData, and_(
-                LockData.entity_id == ApiRegistryModel.id,
-                LockData.entity_type == "api_registry"
-            )) \
-            .filter(ApiRegistryModel.id == api_uuid) \
-            .first()
+        api = db.query(ApiRegistryModel).filter(ApiRegistryModel.id == api_uuid).first()
             
-        if not result:
+        if not api:
             raise HTTPException(status_code=404, detail="API not found")
         
-        api, is_locked = result
         api_dict = ApiRegistry.model_validate(api).model_dump()
-        api_dict["is_locked"] = is_locked
+        api_dict["is_locked"] = check_is_locked(db, api_uuid, "api_registry")
         return api_dict
     except Exception as e:
         if isinstance(e, HTTPException):
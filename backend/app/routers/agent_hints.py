@@ -7,9 +7,7 @@ from ..models.agent_hint import AgentHint
 from ..models.user import User
 from ..schemas.agent_hint import AgentHint as AgentHintSchema, AgentHintCreate, AgentHintUpdate
 from ..routers.auth import get_current_user
-from sqlalchemy import exists, and_
-from ..models import LockData
-from ..core.locks import raise_if_locked, check_is_locked
+from ..core.locks import raise_if_locked, check_is_locked, with_lock_status
 from ..internal_libs.projects_lib import get_project_id, is_project_mode
 
 router = APIRouter(prefix="/agent-hints", tags=["Agent Hints"])
@@ -20,12 +18,7 @@ def list_agent_hints(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    is_locked_subquery = db.query(LockData.id).filter(
-        LockData.entity_id == AgentHint.id,
-        LockData.entity_type == "agent_hints"
-    ).exists()
-    
-    results = db.query(AgentHint, is_locked_subquery.label("is_locked"))
+    results = db.query(AgentHint)
     
     project_id = get_project_id()
     if is_project_mode():
@@ -37,7 +30,7 @@ def list_agent_hints(
         results = results.filter(AgentHint.category == category)
     
     response = []
-    for hint, is_locked in results.all():
+    for hint, is_locked in with_lock_status(db, "agent_hints", results.all()):
         hint_dict = AgentHintSchema.model_validate(hint).model_dump()
         hint_dict["is_locked"] = is_locked
         response.append(hint_dict)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.orm import Session
 from typing import List
 from pydantic import BaseModel
@@ -6,9 +6,10 @@ from datetime import datetime
 from typing import Optional
 import uuid
 from ..core.database import get_db
+from ..core.pagination import PageParams, paginate
 from ..core.security import require_role, get_current_user
 from ..models.user import User
-from ..models.workflow import Workflow, WorkflowExecution
+from ..models.workflow import Workflow, WorkflowExecution, WorkflowStatus
 
 router = APIRouter(prefix="/client", tags=["client"])
 client_only = Depends(require_role("client"))
@@ -26,17 +27,37 @@ class ResultOut(BaseModel):
 
 
 @router.get("/results", response_model=List[ResultOut])
-def get_results(current_user: User = Depends(get_current_user), db: Session = Depends(get_db), _=client_only):
-    workflows = db.query(Workflow).filter(Workflow.owner_id == current_user.id).all()
-    results = []
-    for wf in workflows:
-        executions = db.query(WorkflowExecution).filter(WorkflowExecution.workflow_id == wf.id).all()
-        for ex in executions:
-            results.append(ResultOut(
-                id=ex.id,
-                workflow_name=wf.name,
-                status=ex.status,
-                created_at=ex.started_at,
-                result_summary=ex.result_summary,
-            ))
-    return results
+def get_results(
+    response: Response,
+    status: Optional[WorkflowStatus] = Query(None),
+    started_from: Optional[datetime] = Query(None, description="Executions started at or after this time"),
+    started_to: Optional[datetime] = Query(None, description="Executions started before this time"),
+    workflow_id: Optional[uuid.UUID] = Query(None),
+    params: PageParams = Depends(),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    _=client_only,
+):
+    """Executions of the client's workflows, newest first; all of them unless limit is set."""
+    query = db.query(
+        WorkflowExecution.id,
+        Workflow.name,
+        WorkflowExecution.status,
+        WorkflowExecution.started_at,
+        WorkflowExecution.result_summary,
+    ).join(Workflow, WorkflowExecution.workflow_id == Workflow.id).filter(Workflow.owner_id == str(current_user.id))
+
+    if workflow_id:
+        query = query.filter(WorkflowExecution.workflow_id == workflow_id)
+    if status:
+        query = query.filter(WorkflowExecution.status == status)
+    if started_from:
+        query = query.filter(WorkflowExecution.started_at >= started_from)
+    if started_to:
+        query = query.filter(WorkflowExecution.started_at < started_to)
+
+    rows = paginate(query, params, response, (WorkflowExecution.started_at, WorkflowExecution.id), descending=True)
+    return [
+        ResultOut(id=ex_id, workflow_name=name, status=ex_status, created_at=started_at, result_summary=summary)
+        for ex_id, name, ex_status, started_at, summary in rows
+    ]
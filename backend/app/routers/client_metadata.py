@@ -7,9 +7,7 @@ from ..core.database import get_db
 from ..core.security import require_role, get_current_user
 from ..models.user import User
 from ..models.client_metadata import ClientMetadata
-from ..models import LockData
-from sqlalchemy import exists, and_
-from ..core.locks import raise_if_locked, check_is_locked
+from ..core.locks import raise_if_locked, check_is_locked, with_lock_status
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/client-metadata", tags=["client-metadata"])
@@ -39,21 +37,16 @@ class ClientMetadataOut(ClientMetadataBase):
 
 @router.get("/", response_model=List[ClientMetadataOut])
 def list_client_metadata(db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
-    is_locked_subquery = db.query(exists().where(and_(
-        LockData.entity_id == ClientMetadata.id,
-        LockData.entity_type == "client_metadata"
-    ))).scalar_subquery()
-
     if current_user.role == "admin":
-        results = db.query(ClientMetadata, is_locked_subquery.label("is_locked")).all()
+        results = db.query(ClientMetadata).all()
     else:
         client_ids = [str(u.id) for u in current_user.assigned_clients]
-        results = db.query(ClientMetadata, is_locked_subquery.label("is_locked")).filter(
+        results = db.query(ClientMetadata).filter(
             (ClientMetadata.owner_id.in_(client_ids)) | (ClientMetadata.created_by == current_user.id)
         ).all()
         
     response = []
-    for cm, is_locked in results:
+    for cm, is_locked in with_lock_status(db, "client_metadata", results):
         cm_dict = ClientMetadataOut.model_validate(cm).model_dump()
         cm_dict["is_locked"] = is_locked
         response.append(cm_dict)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import FileResponse
 import os
+import mimetypes
 from ..internal_libs import temp_files_lib
 from ..core.security import get_current_user
 from ..models.user import User
@@ -23,5 +24,5 @@ def download_temp_file(filename: str):
     return FileResponse(
         path=file_path,
         filename=safe_filename,
-        media_type='application/octet-stream'
+        media_type=mimetypes.guess_type(safe_filename)[0] or 'application/octet-stream'
     )
@@ -5,6 +5,7 @@ from typing import List
 
 from ..core.database import get_db
 from ..core.security import get_current_user
+from ..core.locks import check_is_locked, lock_cache
 from ..models import User, RoleEnum, LockData
 from ..schemas.lock import LockToggle, LockData as LockDataSchema
 
@@ -35,12 +36,14 @@ def toggle_lock(
             )
             db.add(new_lock)
             db.commit()
+            lock_cache.invalidate(payload.entity_type)
             return True
         return True
     else:
         if existing_lock:
             db.delete(existing_lock)
             db.commit()
+            lock_cache.invalidate(payload.entity_type)
             return False
         return False
 
@@ -51,8 +54,4 @@ def get_lock_status(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    lock = db.query(LockData).filter(
-        LockData.entity_id == entity_id,
-        LockData.entity_type == entity_type
-    ).first()
-    return lock is not None
+    return check_is_locked(db, entity_id, entity_type)
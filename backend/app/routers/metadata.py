@@ -1,19 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import func
-from sqlalchemy.orm import Session, joinedload, selectinload
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 from typing import List, Optional, Any, Dict
 from uuid import UUID
 
 from ..core.database import get_db
 from ..core.security import get_current_user
-from ..models import User, RoleEnum, LockData
+from ..models import User, RoleEnum
 from ..models.schema import MetadataRecord, Schema
-from sqlalchemy import exists, and_
-from ..core.locks import raise_if_locked, check_is_locked
+from ..core.locks import raise_if_locked, check_is_locked, with_lock_status
+from ..core.pagination import ListParams, paginate, project, render
 from ..schemas.schema_registry import (
     MetadataCreate, MetadataUpdate, MetadataResponse
 )
 from ..services.validator import validate_json_data
+from ..services.metadata_tree import root_id, subtree_ids, subtree_ids_with_schema
 from ..internal_libs.logger_lib import system_log
 from ..internal_libs.projects_lib import get_project_id, is_project_mode
 
@@ -24,13 +26,8 @@ def check_admin(user: User):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not an admin")
 
 @router.get("/", response_model=List[MetadataResponse])
-def get_metadata_records(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    is_locked_subquery = db.query(LockData.id).filter(
-        LockData.entity_id == MetadataRecord.id,
-        LockData.entity_type == "metadata"
-    ).exists()
-    
-    query = db.query(MetadataRecord, is_locked_subquery.label("is_locked")).join(Schema, MetadataRecord.schema_id == Schema.id)
+def get_metadata_records(response: Response, params: ListParams = Depends(), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    query = db.query(MetadataRecord).join(Schema, MetadataRecord.schema_id == Schema.id)
     
     # Project filtering
     active_project_id = get_project_id()
@@ -43,14 +40,10 @@ def get_metadata_records(db: Session = Depends(get_db), current_user: User = Dep
     else:
         query = query.filter(MetadataRecord.project_id == None)
 
-    results = query.all()
-    
-    response = []
-    for record, is_locked in results:
-        record_dict = {c.name: getattr(record, c.name) for c in record.__table__.columns}
-        record_dict["is_locked"] = is_locked
-        response.append(record_dict)
-    return response
+    query = project(query, MetadataRecord, params, MetadataResponse)
+    results = paginate(query, params, response, (MetadataRecord.order, MetadataRecord.id))
+    return render(with_lock_status(db, "metadata", results), params, response, MetadataResponse,
+                  to_dict=lambda record: {c.name: getattr(record, c.name) for c in record.__table__.columns})
 
 @router.post("/", response_model=MetadataResponse)
 def create_metadata_record(
@@ -123,10 +116,7 @@ def update_metadata_record(
     db.commit()
     db.refresh(record)
     
-    is_locked = db.query(exists().where(and_(
-        LockData.entity_id == record_id,
-        LockData.entity_type == "metadata"
-    ))).scalar()
+    is_locked = check_is_locked(db, record_id, "metadata")
     
     record_dict = {c.name: getattr(record, c.name) for c in record.__table__.columns}
     record_dict["is_locked"] = is_locked
@@ -150,20 +140,19 @@ def delete_metadata_record(
     db.commit()
 
 
-def get_recursive_record(db: Session, record_id: UUID, depth=0) -> MetadataRecord:
-    """Helper to load a record with its schema and ALL descendants recursively."""
-    record = db.query(MetadataRecord).options(
-        joinedload(MetadataRecord.schema),
-        selectinload(MetadataRecord.children)
-    ).filter(MetadataRecord.id == record_id).first()
-    
-    if record and record.children:
-        # Sort children by order (though selectinload above should handle it if using newer SQLA, 
-        # but let's be explicit if needed or just rely on the query)
-        record.children.sort(key=lambda x: x.order)
-        for child in record.children:
-            get_recursive_record(db, child.id, depth + 1)
-    return record
+def get_recursive_record(db: Session, record_id: UUID) -> MetadataRecord:
+    """Helper to load a record with its schema and ALL descendants (one query)."""
+    records = db.query(MetadataRecord).options(
+        joinedload(MetadataRecord.schema)
+    ).filter(MetadataRecord.id.in_(subtree_ids([record_id]))).order_by(MetadataRecord.order, MetadataRecord.id).all()
+
+    children = {r.id: [] for r in records}
+    for r in records:
+        if r.id != record_id and r.parent_id in children:
+            children[r.parent_id].append(r)
+    for r in records:
+        set_committed_value(r, "children", children[r.id])
+    return next((r for r in records if r.id == record_id), None)
 
 @router.get("/entity/{entity_type}/{entity_id}", response_model=List[MetadataResponse])
 def get_entity_metadata(
@@ -194,26 +183,15 @@ def get_entity_metadata(
 
     records = query.order_by(MetadataRecord.order).all()
     
-    # Check locks once for all records
-    record_ids = [r.id for r in records]
-    locked_ids = {
-        row.entity_id for row in db.query(LockData.entity_id).filter(
-            LockData.entity_id.in_(record_ids),
-            LockData.entity_type == "metadata"
-        ).all()
-    }
-    
     results = []
-    for record in records:
+    for record, is_locked in with_lock_status(db, "metadata", records):
         record_dict = {c.name: getattr(record, c.name) for c in record.__table__.columns}
-        record_dict["is_locked"] = record.id in locked_ids
+        record_dict["is_locked"] = is_locked
         results.append(record_dict)
         
     return results
 
 
-from sqlalchemy import text
-
 @router.get("/references/{record_id}", response_model=List[MetadataResponse])
 def get_references(
     record_id: UUID,
@@ -222,35 +200,30 @@ def get_references(
     current_user: User = Depends(get_current_user)
 ):
     """
-    1) Find target schema_id by schema_key.
-    2) Find root parent for the current record.
-    3) Identify the entity (entity_type, entity_id) this root belongs to.
-    4) Find all OTHER roots assigned to the SAME entity.
-    5) Return all records in all those trees that match the target schema.
+    1) Find root parent for the current record.
+    2) Identify the entity (entity_type, entity_id) this root belongs to.
+    3) Find all roots assigned to the SAME entity (just this root if it has none).
+    4) Return all records in all those trees that match the target schema.
     """
-    query_sql = text("""
-SELECT id FROM metadata 
-WHERE (entity_type, entity_id) = (SELECT entity_type, entity_id FROM metadata WHERE id = :record_id)
-  AND schema_id = (SELECT id FROM schemas WHERE key = :schema_key);
-    """)
-
-    matching_rows = db.execute(query_sql, {
-        "record_id": str(record_id),
-        "schema_key": schema_key
-    }).all()
-    
-    if not matching_rows:
+    root = db.query(MetadataRecord).filter(MetadataRecord.id == root_id(db, record_id)).first()
+    if not root:
         return []
-    
-    ids = [r[0] for r in matching_rows]
-    records = db.query(MetadataRecord).filter(MetadataRecord.id.in_(ids)).all()
+
+    if root.entity_id is not None:
+        roots = select(MetadataRecord.id).where(
+            MetadataRecord.parent_id == None,
+            MetadataRecord.entity_type == root.entity_type,
+            MetadataRecord.entity_id == root.entity_id
+        )
+    else:
+        roots = [root.id]
+
+    records = db.query(MetadataRecord).filter(
+        MetadataRecord.id.in_(subtree_ids_with_schema(roots, schema_key))
+    ).order_by(MetadataRecord.order, MetadataRecord.id).all()
     
     response = []
-    for record in records:
-        is_locked = db.query(exists().where(and_(
-            LockData.entity_id == record.id,
-            LockData.entity_type == "metadata"
-        ))).scalar()
+    for record, is_locked in with_lock_status(db, "metadata", records):
         record_dict = {c.name: getattr(record, c.name) for c in record.__table__.columns}
         record_dict["is_locked"] = is_locked
         response.append(record_dict)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
@@ -7,28 +7,25 @@ from ..models.prompt import Prompt
 from ..models.user import User
 from ..schemas.prompt import Prompt as PromptSchema, PromptCreate, PromptUpdate
 from ..routers.auth import get_current_user
-from sqlalchemy import exists, and_
-from ..models import LockData
-from ..core.locks import raise_if_locked, check_is_locked
+from sqlalchemy import func
+from ..core.locks import raise_if_locked, check_is_locked, with_lock_status
+from ..core.pagination import ListParams, paginate, project, render
 
 router = APIRouter(prefix="/prompts", tags=["Prompts"])
 
 @router.get("/", response_model=List[PromptSchema])
 def list_prompts(
+    response: Response,
     entity_id: Optional[UUID] = Query(None),
     entity_type: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
     datatype: Optional[str] = Query(None),
     reference_id: Optional[UUID] = Query(None),
+    params: ListParams = Depends(),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    is_locked_subquery = db.query(exists().where(and_(
-        LockData.entity_id == Prompt.id,
-        LockData.entity_type == "prompts"
-    ))).scalar_subquery()
-    
-    results = db.query(Prompt, is_locked_subquery.label("is_locked"))
+    results = db.query(Prompt)
     
     # Filter by project context
     from ..internal_libs.projects_lib import get_project_id, is_project_mode
@@ -48,13 +45,10 @@ def list_prompts(
         results = results.filter(Prompt.datatype == datatype)
     if reference_id:
         results = results.filter(Prompt.reference_id == reference_id)
-    
-    response = []
-    for prompt, is_locked in results.all():
-        prompt_dict = PromptSchema.model_validate(prompt).model_dump()
-        prompt_dict["is_locked"] = is_locked
-        response.append(prompt_dict)
-    return response
+
+    results = project(results, Prompt, params, PromptSchema)
+    rows = paginate(results, params, response, (func.coalesce(Prompt.category, ""), Prompt.id))
+    return render(with_lock_status(db, "prompts", rows), params, response, PromptSchema)
 
 @router.get("/{prompt_id}", response_model=PromptSchema)
 def get_prompt(
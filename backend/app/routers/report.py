@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from typing import List, Optional, Any, Dict
@@ -7,23 +7,32 @@ import json
 import os
 import re
 import io
-import csv
-import markdown2
+import contextvars
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from ..core.database import get_db
+from ..core.database import get_db, SessionLocal
+from ..core.config import REPORT_GROUP_MAX_WORKERS
 from ..core.security import require_role, get_current_user
 from ..models.user import User
-from ..models.report import Report, ReportTypeEnum, ObjectParameter, ReportStyle, ReportRun
-from ..models import LockData
-from sqlalchemy import exists, and_
-from ..core.locks import raise_if_locked, check_is_locked
-from ..services.report_executor import ReportExecutor, generate_json_schema
+from ..models.report import Report, ReportTypeEnum, ObjectParameter, ReportStyle
+from sqlalchemy import func
+from ..core.locks import raise_if_locked, check_is_locked, with_lock_status
+from ..core.pagination import ListParams, paginate, project, render
+from ..services.report_executor import ReportExecutor, generate_json_schema, materialize_report_data
+from ..services import report_export
+from ..services.report_cache import report_cache, get_cache_settings, build_cache_key
+from ..services.pdf_jobs import pdf_jobs
+from ..services.report_markdown import compile_report_template, render_md_tags
+from ..services import report_snapshots
+from ..services.report_refresh import report_refresh, get_refresh_schedule, get_run_as_user, is_scheduled
+from ..services.parameter_options import parameter_options
 from ..internal_libs import projects_lib
 from pydantic import BaseModel
 from jinja2 import Environment, meta, Template
 from ..internal_libs.openai.openai_lib import openai_ask_single
 from fastapi.responses import Response, StreamingResponse
-from ..core.system_parameters import inject_system_params, get_system_parameters
+from ..core.system_parameters import inject_system_params
 
 
 router = APIRouter(prefix="/reports", tags=["reports"])
@@ -33,7 +42,7 @@ admin_access = Depends(require_role("admin"))
 manager_access = Depends(require_role("manager", "admin"))
 
 # --- Schemas ---
-from ..schemas.object_parameter import ObjectParameterBase, ObjectParameterCreate, ObjectParameterOut
+from ..schemas.object_parameter import ObjectParameterBase, ObjectParameterCreate, ObjectParameterOut, SourceTestRequest, SourceTestResponse, ParameterOptionsPage
 
 class ReportStyleBase(BaseModel):
     name: str
@@ -106,6 +115,23 @@ class ReportGenerateResponse(BaseModel):
     html: str
     console: Optional[str] = None
     validation_error: Optional[str] = None
+    cache_hit: bool = False
+
+class ReportSnapshotOut(BaseModel):
+    run_id: uuid.UUID
+    executed_at: Optional[datetime] = None
+    watermark: Optional[str] = None
+    parameters: Dict[str, Any] = {}
+    html: Optional[str] = None
+    data: Optional[Any] = None
+
+class PdfJobOut(BaseModel):
+    job_id: str
+    status: str
+    error: Optional[str] = None
+    deduplicated: bool = False
+    download_url: Optional[str] = None
+    filename: Optional[str] = None
 
 class ReportReorderRequest(BaseModel):
     ids: List[uuid.UUID]
@@ -142,28 +168,14 @@ class ReportSQLGenerateRequest(BaseModel):
 class ReportSQLGenerateResponse(BaseModel):
     query: str
 
-class SourceTestRequest(BaseModel):
-    source: str
-    value_field: Optional[str] = None
-    label_field: Optional[str] = None
-
-class SourceTestResponse(BaseModel):
-    options: List[Dict[str, Any]]
-    error: Optional[str] = None
-
 # --- Routes for Report Styles ---
 
 @router.get("/styles", response_model=List[ReportStyleOut])
 def list_report_styles(db: Session = Depends(get_db), _=admin_access):
-    is_locked_subquery = db.query(LockData.id).filter(
-        LockData.entity_id == ReportStyle.id,
-        LockData.entity_type == "report_styles"
-    ).exists()
-    
-    results = db.query(ReportStyle, is_locked_subquery.label("is_locked")).all()
+    results = db.query(ReportStyle).all()
     
     response = []
-    for style, is_locked in results:
+    for style, is_locked in with_lock_status(db, "report_styles", results):
         style_dict = ReportStyleOut.model_validate(style).model_dump()
         style_dict["is_locked"] = is_locked
         response.append(style_dict)
@@ -200,6 +212,8 @@ def update_report_style(style_id: uuid.UUID, data: ReportStyleUpdate, db: Sessio
         
     db.commit()
     db.refresh(style)
+    # Style CSS is part of every cached fragment that uses it (or the default style)
+    report_cache.clear()
     return style
 
 @router.delete("/styles/{style_id}")
@@ -212,20 +226,16 @@ def delete_report_style(style_id: uuid.UUID, db: Session = Depends(get_db), _=ad
     
     db.delete(style)
     db.commit()
+    report_cache.clear()
     return {"status": "deleted"}
 
 # --- Routes for Reports (Management) ---
 
 @router.get("/", response_model=List[ReportOut])
-def list_reports(db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
-    is_locked_subquery = db.query(LockData.id).filter(
-        LockData.entity_id == Report.id,
-        LockData.entity_type == "reports"
-    ).exists()
-    
+def list_reports(response: Response, params: ListParams = Depends(), db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
     current_project_id = projects_lib.get_project_id()
     
-    query = db.query(Report, is_locked_subquery.label("is_locked"))
+    query = db.query(Report)
     
     if current_project_id:
         query = query.filter(Report.project_id == current_project_id)
@@ -234,15 +244,9 @@ def list_reports(db: Session = Depends(get_db), current_user: User = Depends(get
         if current_user.role != "admin":
              query = query.filter(Report.type == ReportTypeEnum.global_type)
 
-    query = query.order_by(Report.order.asc(), Report.name.asc())
-    results = query.all()
-    
-    response = []
-    for report, is_locked in results:
-        report_dict = ReportOut.model_validate(report).model_dump()
-        report_dict["is_locked"] = is_locked
-        response.append(report_dict)
-    return response
+    query = project(query, Report, params, ReportOut, relationships=("parameters",))
+    results = paginate(query, params, response, (func.coalesce(Report.order, 0), Report.name, Report.id))
+    return render(with_lock_status(db, "reports", results), params, response, ReportOut)
 
 @router.post("/", response_model=ReportOut)
 def create_report(data: ReportCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=admin_access):
@@ -288,21 +292,22 @@ def get_grouped_report_parameters(data: ReportGroupParametersRequest, db: Sessio
     return [ObjectParameterOut.model_validate(p) for p in params_map.values()]
 
 @router.post("/grouped/generate", response_model=ReportGenerateResponse)
-def generate_grouped_report(data: ReportGroupGenerateRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
+def generate_grouped_report(data: ReportGroupGenerateRequest, refresh: bool = False, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
     user_context = {"id": str(current_user.id), "username": current_user.username, "role": str(current_user.role)}
-    res = _generate_grouped_report_html(data.report_ids, data.parameters, db, user_context=user_context)
+    res = _generate_grouped_report_html(data.report_ids, data.parameters, user_context=user_context, refresh=refresh)
     
     return {
         "html": res["html"],
         "console": res.get("console", ""),
-        "validation_error": res.get("validation_error")
+        "validation_error": res.get("validation_error"),
+        "cache_hit": res.get("cache_hit", False)
     }
 
 @router.post("/grouped/pdf")
-def generate_grouped_report_pdf(data: ReportGroupGenerateRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
+def generate_grouped_report_pdf(data: ReportGroupGenerateRequest, refresh: bool = False, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
     from weasyprint import HTML
     user_context = {"id": str(current_user.id), "username": current_user.username, "role": str(current_user.role)}
-    res = _generate_grouped_report_html(data.report_ids, data.parameters, db, user_context=user_context, for_pdf=True)
+    res = _generate_grouped_report_html(data.report_ids, data.parameters, user_context=user_context, for_pdf=True, refresh=refresh)
     
     pdf_bytes = io.BytesIO()
     HTML(string=res["html"]).write_pdf(pdf_bytes)
@@ -311,110 +316,84 @@ def generate_grouped_report_pdf(data: ReportGroupGenerateRequest, db: Session =
         content=pdf_bytes.getvalue(),
         media_type="application/pdf",
         headers={
-            "Content-Disposition": f"attachment; filename=grouped_report.pdf"
+            "Content-Disposition": f"attachment; filename=grouped_report.pdf",
+            "X-Report-Cache": "hit" if res.get("cache_hit") else "miss"
         }
     )
 
+@router.post("/grouped/pdf-jobs", response_model=PdfJobOut)
+def submit_grouped_report_pdf_job(data: ReportGroupGenerateRequest, refresh: bool = False, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
+    """Generates the grouped HTML now and renders the PDF in the background. Poll /reports/pdf-jobs/{job_id}."""
+    user_context = {"id": str(current_user.id), "username": current_user.username, "role": str(current_user.role)}
+    res = _generate_grouped_report_html(data.report_ids, data.parameters, user_context=user_context, for_pdf=True, refresh=refresh)
+    if res.get("validation_error"):
+        raise HTTPException(status_code=400, detail=res["validation_error"])
+    return pdf_jobs.submit(res["html"], owner_id=str(current_user.id))
+
 @router.post("/grouped/csv")
-def generate_grouped_report_csv(data: ReportGroupGenerateRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
-    """Concatenate CSV data from all reports in the group."""
-    combined_rows = []
+def generate_grouped_report_csv(data: ReportGroupGenerateRequest, refresh: bool = False, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
+    """Concatenate CSV data from all reports in the group, streamed in chunks."""
+    sources = []
     user_context = {"id": str(current_user.id), "username": current_user.username, "role": str(current_user.role)}
     
-    for rid in data.report_ids:
-        res = _get_report_fragment(rid, data.parameters, db, user_context=user_context)
-        rows = res["data"]
-        if isinstance(rows, list):
-            combined_rows.extend(rows)
-        elif isinstance(rows, dict):
-            combined_rows.append(rows)
-
-    if not combined_rows:
+    # All reports must finish before streaming starts so errors still surface as HTTP errors
+    with closing(_iter_report_fragments(data.report_ids, data.parameters, user_context=user_context, refresh=refresh, render=False)) as fragments:
+        for rid, future in fragments:
+            res = future.result()
+            sources.append(report_export.prepare_rows(res["data"], allow_single_dict=True, strict=False))
+
+    if all(source.is_empty for source in sources):
          return Response(content="", media_type="text/csv")
-         
-    columns = combined_rows[0].keys() if isinstance(combined_rows[0], dict) else []
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=columns)
-    writer.writeheader()
-    writer.writerows(combined_rows)
     
-    return Response(
-        content=output.getvalue(),
+    return StreamingResponse(
+        report_export.iter_csv(sources),
         media_type="text/csv",
         headers={
             "Content-Disposition": f"attachment; filename=grouped_report.csv"
         }
     )
 
+@router.post("/grouped/parquet")
+def generate_grouped_report_parquet(data: ReportGroupGenerateRequest, compression: str = "zstd", refresh: bool = False, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
+    """Concatenates the per-report tables into one Parquet file (schemas are unified)."""
+    return _grouped_columnar_response(data, "parquet", compression, refresh, db, current_user)
+
+@router.post("/grouped/arrow")
+def generate_grouped_report_arrow(data: ReportGroupGenerateRequest, compression: str = "zstd", refresh: bool = False, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
+    """Concatenates the per-report tables into one Arrow IPC stream (schemas are unified)."""
+    return _grouped_columnar_response(data, "arrow", compression, refresh, db, current_user)
+
 @router.post("/grouped/html-file")
-def generate_grouped_report_html_file(data: ReportGroupGenerateRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
+def generate_grouped_report_html_file(data: ReportGroupGenerateRequest, refresh: bool = False, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
     user_context = {"id": str(current_user.id), "username": current_user.username, "role": str(current_user.role)}
-    res = _generate_grouped_report_html(data.report_ids, data.parameters, db, user_context=user_context)
+    res = _generate_grouped_report_html(data.report_ids, data.parameters, user_context=user_context, refresh=refresh)
     
     return Response(
         content=res["html"],
         media_type="text/html",
         headers={
-            "Content-Disposition": f"attachment; filename=grouped_report.html"
+            "Content-Disposition": f"attachment; filename=grouped_report.html",
+            "X-Report-Cache": "hit" if res.get("cache_hit") else "miss"
         }
     )
 
 # --- Other Literal Paths ---
 
+@router.get("/pdf-jobs/{job_id}", response_model=PdfJobOut)
+def get_pdf_job(job_id: str, current_user: User = Depends(get_current_user), _=manager_access):
+    job = pdf_jobs.get(job_id)
+    if not job or (job["owner_id"] != str(current_user.id) and current_user.role != "admin"):
+        raise HTTPException(status_code=404, detail="PDF job not found")
+    return job
+
 @router.post("/test-source", response_model=SourceTestResponse)
 def test_parameter_source(data: SourceTestRequest, db: Session = Depends(get_db), _=manager_access):
     source = data.source.strip()
-    if not source:
-        return {"options": [], "error": None}
-    
+    # Previews of "@table" sources show the first 100 rows unless a page size is given
+    limit = data.limit if data.limit is not None else (100 if source.startswith("@") else None)
     try:
-        if source.startswith("@"):
-            parts = source[1:].split("->")
-            table_name = parts[0]
-            fields_str = parts[1] if len(parts) > 1 else "id,name"
-            fields = fields_str.split(",")
-            val_field = fields[0]
-            lbl_field = fields[1] if len(fields) > 1 else val_field
-            
-            if not re.match(r'^\w+$', table_name) or not re.match(r'^\w+$', val_field) or not re.match(r'^\w+$', lbl_field):
-                return {"options": [], "error": "Invalid table or field names"}
-
-            system_params = get_system_parameters()
-            result = db.execute(text(f"SELECT {val_field}, {lbl_field} FROM {table_name} LIMIT 100"), system_params)
-            options = [
-                {"value": str(row[0]), "label": str(row[1])} for row in [tuple(r) for r in result.fetchall()]
-            ]
-            return {"options": options, "error": None}
-            
-        elif source.lower().startswith("select"):
-            system_params = get_system_parameters()
-            result = db.execute(text(source), system_params)
-            columns = result.keys()
-            rows = [tuple(r) for r in result.fetchall()]
-            
-            param_options = []
-            for row in rows:
-                row_dict = dict(zip(columns, row))
-                
-                # Case-insensitive lookup for 'value' and 'label'
-                val_key = next((k for k in row_dict if k.lower() == 'value'), None)
-                lab_key = next((k for k in row_dict if k.lower() == 'label'), None)
-                
-                val = row_dict.get(val_key) if val_key else None
-                if val is None and len(row) > 0:
-                    val = row[0]
-                
-                if val is None:
-                    continue
-                
-                lbl = row_dict.get(lab_key) if lab_key else None
-                if lbl is None:
-                    lbl = val
-                
-                param_options.append({"value": str(val), "label": str(lbl)})
-            return {"options": param_options, "error": None}
-        else:
-            return {"options": [], "error": "Unknown source format"}
+        page = parameter_options.resolve(db, source, search=data.search, offset=data.offset, limit=limit)
+        return {**page, "error": None}
     except Exception as e:
         return {"options": [], "error": str(e)}
 
@@ -546,42 +525,12 @@ def _scope_css(css: str, scope_id: str) -> str:
             
     return "\n".join(parts)
 
-def _get_report_fragment(report_id: uuid.UUID, params: Dict[str, Any], db: Session, user_context: Dict[str, Any] = None) -> Dict[str, Any]:
-    """Generates the HTML fragment and CSS for a single report."""
-    report = db.query(Report).filter(Report.id == report_id).first()
-    if not report:
-        raise HTTPException(status_code=404, detail="Report not found")
-        
-    final_params = inject_system_params(params.copy())
-    for param_config in report.parameters:
-        p_name = param_config.parameter_name
-        if p_name not in final_params or final_params[p_name] is None or (isinstance(final_params[p_name], str) and not final_params[p_name].strip()):
-            if param_config.default_value is not None:
-                final_params[p_name] = param_config.default_value
-
-    executor = ReportExecutor(report.code)
-    exec_result = executor.execute(final_params, mode="is_run", user_context=user_context, execution_id=str(report.id))
-    
-    if not exec_result["success"]:
-        if "validation_reason" in exec_result and exec_result["validation_reason"]:
-             return {
-                "fragment": "",
-                "css": "",
-                "console": exec_result.get("console", ""),
-                "validation_error": exec_result["validation_reason"],
-                "data": None
-            }
-        raise HTTPException(status_code=400, detail=f"Error executing Python for '{report.name}': {exec_result.get('error', 'Unknown error')}\nConsole:\n{exec_result.get('console', '')}")
-
+def _render_fragment(report: Report, final_params: Dict[str, Any], data: Any, db: Session) -> tuple:
+    """Renders the report template over the data; returns (html, css, materialised data)."""
     try:
-        env = Environment()
-        def jinja_markdown_filter(text):
-            if not text: return ""
-            return markdown2.markdown(str(text), extras=["tables", "fenced-code-blocks", "task_list"]).strip()
-        env.filters['markdown'] = jinja_markdown_filter
-        
-        jinja_template = env.from_string(report.template)
-        data_val = exec_result["data"]
+        jinja_template = compile_report_template(report.template)
+        # Templates need random access to rows
+        data_val = materialize_report_data(data)
         render_context = {
             "data": data_val,
             "rows": data_val,
@@ -593,10 +542,9 @@ def _get_report_fragment(report_id: uuid.UUID, params: Dict[str, Any], db: Sessi
             
         rendered_html = jinja_template.render(**render_context)
         
+        # Only tags that came from data or didn't compile as blocks are left at this point
         if '<md>' in rendered_html:
-            def md_replacer(match):
-                return markdown2.markdown(match.group(1), extras=["tables", "fenced-code-blocks", "task_list"]).strip()
-            rendered_html = re.sub(r'<md>(.*?)</md>', md_replacer, rendered_html, flags=re.DOTALL)
+            rendered_html = render_md_tags(rendered_html)
             
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error rendering template for '{report.name}': {str(e)}")
@@ -608,23 +556,227 @@ def _get_report_fragment(report_id: uuid.UUID, params: Dict[str, Any], db: Sessi
     else:
         default_style = db.query(ReportStyle).filter(ReportStyle.is_default == True).first()
         if default_style: css_content = default_style.css
-             
-    return {
+    return rendered_html, css_content, data_val
+
+def _scheduled_fragment(report: Report, schedule: Dict[str, Any], params: Dict[str, Any], final_params: Dict[str, Any], db: Session, max_age: int, render: bool) -> Optional[Dict[str, Any]]:
+    """
+    Result of a scheduled parameter set from the run_as user's latest ReportRun snapshot,
+    so processes other than the one that ran the schedule serve it too.
+    None if there is no fresh one.
+    """
+    run_as = get_run_as_user(db, report, schedule)
+    if run_as is None:
+        return None
+    snapshot = report_snapshots.latest_snapshot(db, report.id, params, user_context={"id": str(run_as.id)}, max_age=max_age)
+    if snapshot is None:
+        return None
+    result = {
+        "fragment": "",
+        "css": "",
+        "console": "",
+        "validation_error": None,
+        "data": snapshot["data"],
+        "pdf_scale": snapshot.get("pdf_scale") or 0.5,
+        "watermark": datetime.fromisoformat(snapshot["watermark"]) if snapshot["watermark"] else None,
+        "cache_hit": True
+    }
+    if render:
+        result["fragment"], result["css"], result["data"] = _render_fragment(report, final_params, snapshot["data"], db)
+    return result
+
+def _get_report_fragment(report_id: uuid.UUID, params: Dict[str, Any], db: Session, user_context: Dict[str, Any] = None, refresh: bool = False, render: bool = True, scheduled: bool = False) -> Dict[str, Any]:
+    """
+    Generates the HTML fragment and CSS for a single report.
+    Results are served from the report cache when Report.meta enables it, unless refresh is set.
+    Parameter sets listed in the refresh_schedule are also served from the scheduled run
+    (global cache entry, else its latest snapshot); scheduled=True marks that run.
+    With render=False only the data is produced and left as returned by GenerateReport
+    (possibly a generator or DataFrame), which file exports stream without materialising.
+    """
+    report = db.query(Report).filter(Report.id == report_id).first()
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+        
+    final_params = inject_system_params(params.copy())
+    for param_config in report.parameters:
+        p_name = param_config.parameter_name
+        if p_name not in final_params or final_params[p_name] is None or (isinstance(final_params[p_name], str) and not final_params[p_name].strip()):
+            if param_config.default_value is not None:
+                final_params[p_name] = param_config.default_value
+
+    cache_settings = get_cache_settings(report)
+    schedule = get_refresh_schedule(report)
+    shared = is_scheduled(schedule, params)
+    cache_key = None
+    if cache_settings["ttl"] > 0:
+        scope = "global" if scheduled else cache_settings["scope"]
+        cache_key = build_cache_key(report, final_params, user_context, scope=scope)
+        if not refresh:
+            cached = report_cache.get(cache_key)
+            if cached is None and shared:
+                shared_key = build_cache_key(report, final_params, None, scope="global")
+                cached = report_cache.get(shared_key)
+                if cached is None:
+                    cached = _scheduled_fragment(report, schedule, params, final_params, db, cache_settings["ttl"], render)
+                    if cached is not None and render:
+                        report_cache.set(shared_key, cached, cache_settings["ttl"], report.id, cache_settings["depends_on"])
+            if cached is not None:
+                cached["cache_hit"] = True
+                return cached
+
+    snapshot_settings = report_snapshots.get_snapshot_settings(report)
+    previous = None
+    extra = {}
+    if snapshot_settings["incremental"]:
+        previous = report_snapshots.latest_snapshot(db, report.id, params, user_context=user_context, scope=snapshot_settings["scope"])
+        extra["previous_snapshot"] = {
+            "data": previous["data"],
+            "watermark": previous["watermark"],
+            "run_id": previous["run_id"],
+        } if previous else None
+    watermark = report_snapshots.utcnow()
+
+    executor = ReportExecutor(report.code)
+    exec_result = executor.execute(final_params, mode="is_run", user_context=user_context, execution_id=str(report.id), **extra)
+    
+    if not exec_result["success"]:
+        if "validation_reason" in exec_result and exec_result["validation_reason"]:
+             return {
+                "fragment": "",
+                "css": "",
+                "console": exec_result.get("console", ""),
+                "validation_error": exec_result["validation_reason"],
+                "data": None,
+                "cache_hit": False
+            }
+        raise HTTPException(status_code=400, detail=f"Error executing Python for '{report.name}': {exec_result.get('error', 'Unknown error')}\nConsole:\n{exec_result.get('console', '')}")
+
+    if previous and snapshot_settings["incremental"] == "append":
+        exec_result["data"] = report_snapshots.merge_incremental(previous["data"], exec_result["data"])
+
+    if not render:
+        return {
+            "fragment": "",
+            "css": "",
+            "console": exec_result.get("console", ""),
+            "validation_error": None,
+            "data": exec_result["data"],
+            "pdf_scale": exec_result.get("pdf_scale", 0.5),
+            "watermark": watermark,
+            "cache_hit": False
+        }
+
+    rendered_html, css_content, data_val = _render_fragment(report, final_params, exec_result["data"], db)
+
+    fragment_result = {
         "fragment": rendered_html,
         "css": css_content,
         "console": exec_result.get("console", ""),
         "validation_error": None,
         "data": data_val,
-        "pdf_scale": exec_result.get("pdf_scale", 0.5)
+        "pdf_scale": exec_result.get("pdf_scale", 0.5),
+        "watermark": watermark,
+        "cache_hit": False
     }
+    if cache_key:
+        report_cache.set(cache_key, fragment_result, cache_settings["ttl"], report.id, cache_settings["depends_on"])
+    return fragment_result
+
+# Shared, bounded pool so grouped requests cannot exhaust DB connections
+_fragment_pool = ThreadPoolExecutor(max_workers=REPORT_GROUP_MAX_WORKERS, thread_name_prefix="report-fragment")
 
-def _generate_report_html(report_id: uuid.UUID, params: Dict[str, Any], db: Session, user_context: Dict[str, Any] = None, for_pdf: bool = False) -> Dict[str, Any]:
-    res = _get_report_fragment(report_id, params, db, user_context=user_context)
+def _run_fragment_task(report_id: uuid.UUID, params: Dict[str, Any], user_context: Dict[str, Any] = None, refresh: bool = False, render: bool = True) -> Dict[str, Any]:
+    """Runs _get_report_fragment with its own DB session (sessions are not thread-safe)."""
+    task_db = SessionLocal()
+    try:
+        return _get_report_fragment(report_id, params, task_db, user_context=user_context, refresh=refresh, render=render)
+    finally:
+        task_db.close()
+
+def _iter_report_fragments(report_ids: List[uuid.UUID], params: Dict[str, Any], user_context: Dict[str, Any] = None, refresh: bool = False, render: bool = True):
+    """
+    Submits all fragments to the pool and yields (report_id, future) in request order.
+    Fragments that have not started yet are cancelled once the caller stops iterating.
+    """
+    futures = []
+    for rid in report_ids:
+        # Each task gets its own copy of the request context (project id, etc.)
+        ctx = contextvars.copy_context()
+        futures.append((rid, _fragment_pool.submit(ctx.run, _run_fragment_task, rid, params, user_context, refresh, render)))
+    try:
+        for rid, future in futures:
+            yield rid, future
+    finally:
+        for _, future in futures:
+            future.cancel()
+
+_COLUMNAR_MEDIA_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+def _resolve_columnar_codec(file_format: str, compression: str) -> Optional[str]:
+    if not report_export.ARROW_INSTALLED:
+        raise HTTPException(status_code=501, detail="Library 'pyarrow' is not installed.")
+    try:
+        return report_export.resolve_compression(file_format, compression)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _columnar_response(schema, batches, file_format: str, codec: Optional[str], filename: str, cache_hit: bool = False) -> StreamingResponse:
+    writer = report_export.iter_parquet if file_format == "parquet" else report_export.iter_arrow_stream
+    return StreamingResponse(
+        writer(schema, batches, codec),
+        media_type=_COLUMNAR_MEDIA_TYPES[file_format],
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "X-Report-Cache": "hit" if cache_hit else "miss"
+        }
+    )
+
+def _report_columnar_response(report_id: uuid.UUID, data: ReportGenerateRequest, file_format: str, compression: str, refresh: bool, db: Session, current_user: User) -> StreamingResponse:
+    codec = _resolve_columnar_codec(file_format, compression)
+    user_context = {"id": str(current_user.id), "username": current_user.username, "role": str(current_user.role)}
+    res = _get_report_fragment(report_id, data.parameters, db, user_context=user_context, refresh=refresh, render=False)
+    if res["validation_error"]: raise HTTPException(status_code=400, detail=res["validation_error"])
+
+    try:
+        source = report_export.prepare_rows(res["data"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # The compiled schema fills in types for columns that are null throughout the first chunk
+    json_schema = db.query(Report.schema_json).filter(Report.id == report_id).scalar()
+    schema, batches = report_export.to_record_batches(source, json_schema)
+    return _columnar_response(schema, batches, file_format, codec, f"report_{report_id}.{file_format}", res.get("cache_hit", False))
+
+def _grouped_columnar_response(data: ReportGroupGenerateRequest, file_format: str, compression: str, refresh: bool, db: Session, current_user: User) -> StreamingResponse:
+    codec = _resolve_columnar_codec(file_format, compression)
+    user_context = {"id": str(current_user.id), "username": current_user.username, "role": str(current_user.role)}
+    json_schemas = dict(db.query(Report.id, Report.schema_json).filter(Report.id.in_(data.report_ids)).all())
+
+    sources = []
+    with closing(_iter_report_fragments(data.report_ids, data.parameters, user_context=user_context, refresh=refresh, render=False)) as fragments:
+        for rid, future in fragments:
+            res = future.result()
+            if res["validation_error"]:
+                raise HTTPException(status_code=400, detail=f"Report {rid} Validation: {res['validation_error']}")
+            sources.append((report_export.prepare_rows(res["data"], allow_single_dict=True, strict=False), json_schemas.get(rid)))
+
+    try:
+        schema, batches = report_export.concat_sources(sources)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Cannot combine report tables: {str(e)}")
+    return _columnar_response(schema, batches, file_format, codec, f"grouped_report.{file_format}")
+
+def _generate_report_html(report_id: uuid.UUID, params: Dict[str, Any], db: Session, user_context: Dict[str, Any] = None, for_pdf: bool = False, refresh: bool = False, scheduled: bool = False) -> Dict[str, Any]:
+    res = _get_report_fragment(report_id, params, db, user_context=user_context, refresh=refresh, scheduled=scheduled)
     if res["validation_error"]:
         return {
             "html": "",
             "console": res["console"],
-            "validation_error": res["validation_error"]
+            "validation_error": res["validation_error"],
+            "cache_hit": False
         }
     
     rendered_html = res["fragment"]
@@ -672,37 +824,44 @@ def _generate_report_html(report_id: uuid.UUID, params: Dict[str, Any], db: Sess
     return {
         "html": final_html,
         "console": res["console"],
-        "validation_error": None
+        "validation_error": None,
+        "data": res["data"],
+        "pdf_scale": pdf_scale,
+        "watermark": res.get("watermark"),
+        "cache_hit": res.get("cache_hit", False)
     }
 
-def _generate_grouped_report_html(report_ids: List[uuid.UUID], params: Dict[str, Any], db: Session, user_context: Dict[str, Any] = None, for_pdf: bool = False) -> Dict[str, Any]:
+def _generate_grouped_report_html(report_ids: List[uuid.UUID], params: Dict[str, Any], user_context: Dict[str, Any] = None, for_pdf: bool = False, refresh: bool = False) -> Dict[str, Any]:
     fragments = []
     css_blocks = []
     full_console = []
+    cache_hits = []
     
-    for rid in report_ids:
-        try:
-            res = _get_report_fragment(rid, params, db, user_context=user_context)
-            if res["validation_error"]:
-                return {
-                    "html": "",
-                    "console": "\n".join(full_console) + "\n" + res["console"],
-                    "validation_error": f"Report {rid} Validation: {res['validation_error']}"
-                }
+    with closing(_iter_report_fragments(report_ids, params, user_context=user_context, refresh=refresh)) as pending:
+        for rid, future in pending:
+            try:
+                res = future.result()
+                if res["validation_error"]:
+                    return {
+                        "html": "",
+                        "console": "\n".join(full_console) + "\n" + res["console"],
+                        "validation_error": f"Report {rid} Validation: {res['validation_error']}"
+                    }
             
-            scope_id = f"rb-{str(rid).replace('-', '')}"
-            scoped_fragment = f"<div class='report-block' id='{scope_id}'>\n{res['fragment']}\n</div>"
-            scoped_css = _scope_css(res["css"], scope_id)
+                scope_id = f"rb-{str(rid).replace('-', '')}"
+                scoped_fragment = f"<div class='report-block' id='{scope_id}'>\n{res['fragment']}\n</div>"
+                scoped_css = _scope_css(res["css"], scope_id)
             
-            fragments.append(scoped_fragment)
-            css_blocks.append(scoped_css)
-            full_console.append(f"--- Report {rid} ---\n{res['console']}")
+                fragments.append(scoped_fragment)
+                css_blocks.append(scoped_css)
+                full_console.append(f"--- Report {rid} ---\n{res['console']}")
+                cache_hits.append(res.get("cache_hit", False))
             
-        except HTTPException as e:
-             raise e
-        except Exception as e:
-            full_console.append(f"Error generating report {rid}: {str(e)}")
-            continue
+            except HTTPException as e:
+                 raise e
+            except Exception as e:
+                full_console.append(f"Error generating report {rid}: {str(e)}")
+                continue
 
     base_pdf_css = f"""
     @page {{ margin: 1.5cm; size: A4; }}
@@ -738,7 +897,8 @@ def _generate_grouped_report_html(report_ids: List[uuid.UUID], params: Dict[str,
     return {
         "html": final_html,
         "console": "\n".join(full_console),
-        "validation_error": None
+        "validation_error": None,
+        "cache_hit": bool(cache_hits) and all(cache_hits)
     }
 
 # --- Routes for Reports (PARAMETERIZED PATHS LAST) ---
@@ -774,11 +934,9 @@ def update_report(report_id: uuid.UUID, data: ReportUpdate, db: Session = Depend
             
     db.commit()
     db.refresh(report)
+    report_cache.invalidate_report(report_id)
     
-    is_locked = db.query(exists().where(and_(
-        LockData.entity_id == report_id,
-        LockData.entity_type == "reports"
-    ))).scalar()
+    is_locked = check_is_locked(db, report_id, "reports")
     
     report_dict = ReportOut.model_validate(report).model_dump()
     report_dict["is_locked"] = is_locked
@@ -792,6 +950,7 @@ def delete_report(report_id: uuid.UUID, db: Session = Depends(get_db), _=admin_a
     raise_if_locked(db, report_id, "reports")
     db.delete(report)
     db.commit()
+    report_cache.invalidate_report(report_id)
     return {"status": "deleted"}
 
 @router.post("/{report_id}/duplicate", response_model=ReportOut)
@@ -837,81 +996,123 @@ def duplicate_report(report_id: uuid.UUID, db: Session = Depends(get_db), curren
     return new_report_dict
 
 @router.post("/{report_id}/generate", response_model=ReportGenerateResponse)
-def generate_report(report_id: uuid.UUID, data: ReportGenerateRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
+def generate_report(report_id: uuid.UUID, data: ReportGenerateRequest, refresh: bool = False, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
     user_context = {"id": str(current_user.id), "username": current_user.username, "role": str(current_user.role)}
-    res = _generate_report_html(report_id, data.parameters, db, user_context=user_context)
-    
-    run = ReportRun(
-        report_id=report_id,
-        executed_by=current_user.id,
-        parameters_json=data.parameters,
-        result_snapshot=None
-    )
-    db.add(run)
-    db.commit()
+    res = _generate_report_html(report_id, data.parameters, db, user_context=user_context, refresh=refresh)
+    report_snapshots.record_run(db, report_id, data.parameters, current_user.id, result=res)
     return {
         "html": res["html"],
         "console": res.get("console", ""),
-        "validation_error": res.get("validation_error")
+        "validation_error": res.get("validation_error"),
+        "cache_hit": res.get("cache_hit", False)
     }
 
+@router.get("/{report_id}/snapshots/latest", response_model=ReportSnapshotOut)
+def get_latest_report_snapshot(report_id: uuid.UUID, parameters: Optional[str] = None, include_data: bool = False, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
+    """
+    Returns the newest stored snapshot without executing the report.
+    `parameters` (JSON object) restricts the lookup to runs with exactly these parameters.
+    """
+    report = db.query(Report).filter(Report.id == report_id).first()
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    try:
+        params = json.loads(parameters) if parameters else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="parameters must be a JSON object")
+    if params is not None and not isinstance(params, dict):
+        raise HTTPException(status_code=400, detail="parameters must be a JSON object")
+
+    user_context = {"id": str(current_user.id)}
+    settings = report_snapshots.get_snapshot_settings(report)
+    snapshot = report_snapshots.latest_snapshot(db, report.id, params, user_context=user_context, scope=settings["scope"])
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="No snapshot for this report")
+    if not include_data:
+        snapshot["data"] = None
+    return snapshot
+
+@router.post("/{report_id}/refresh")
+def refresh_report_now(report_id: uuid.UUID, db: Session = Depends(get_db), _=admin_access):
+    """Queues all parameter sets of the report's refresh_schedule for pre-computation now."""
+    report = db.query(Report).filter(Report.id == report_id).first()
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    if not report_refresh.stats()["running"]:
+        raise HTTPException(status_code=409, detail="Report refresh worker is disabled (REPORT_REFRESH_ENABLED)")
+    if get_refresh_schedule(report) is None:
+        raise HTTPException(status_code=400, detail="Report has no refresh_schedule in meta")
+    return {"queued": report_refresh.enqueue_report(report)}
+
 @router.post("/{report_id}/pdf")
-def generate_report_pdf(report_id: uuid.UUID, data: ReportGenerateRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
+def generate_report_pdf(report_id: uuid.UUID, data: ReportGenerateRequest, refresh: bool = False, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
     from weasyprint import HTML
-    res = _generate_report_html(report_id, data.parameters, db, for_pdf=True)
+    res = _generate_report_html(report_id, data.parameters, db, for_pdf=True, refresh=refresh)
     pdf_bytes = io.BytesIO()
     HTML(string=res["html"]).write_pdf(pdf_bytes)
     
-    run = ReportRun(
-        report_id=report_id,
-        executed_by=current_user.id,
-        parameters_json=data.parameters,
-        result_snapshot=None
-    )
-    db.add(run)
-    db.commit()
+    report_snapshots.record_run(db, report_id, data.parameters, current_user.id)
     return Response(
         content=pdf_bytes.getvalue(),
         media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=report_{report_id}.pdf"}
+        headers={
+            "Content-Disposition": f"attachment; filename=report_{report_id}.pdf",
+            "X-Report-Cache": "hit" if res.get("cache_hit") else "miss"
+        }
     )
 
+@router.post("/{report_id}/pdf-jobs", response_model=PdfJobOut)
+def submit_report_pdf_job(report_id: uuid.UUID, data: ReportGenerateRequest, refresh: bool = False, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
+    """Generates the report HTML now and renders the PDF in the background. Poll /reports/pdf-jobs/{job_id}."""
+    res = _generate_report_html(report_id, data.parameters, db, for_pdf=True, refresh=refresh)
+    if res.get("validation_error"):
+        raise HTTPException(status_code=400, detail=res["validation_error"])
+
+    report_snapshots.record_run(db, report_id, data.parameters, current_user.id)
+    return pdf_jobs.submit(res["html"], owner_id=str(current_user.id))
+
 @router.post("/{report_id}/csv")
-def generate_report_csv(report_id: uuid.UUID, data: ReportGenerateRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
+def generate_report_csv(report_id: uuid.UUID, data: ReportGenerateRequest, refresh: bool = False, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
     user_context = {"id": str(current_user.id), "username": current_user.username, "role": str(current_user.role)}
-    res = _get_report_fragment(report_id, data.parameters, db, user_context=user_context)
+    res = _get_report_fragment(report_id, data.parameters, db, user_context=user_context, refresh=refresh, render=False)
     if res["validation_error"]: raise HTTPException(status_code=400, detail=res["validation_error"])
-         
-    data_rows = res["data"]
-    if not isinstance(data_rows, list) or (len(data_rows) > 0 and not isinstance(data_rows[0], dict)):
-         raise HTTPException(status_code=400, detail="GenerateReport must return a list of dictionaries for CSV export")
-
-    columns = data_rows[0].keys() if data_rows else []
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=columns)
-    writer.writeheader()
-    writer.writerows(data_rows)
-    return Response(
-        content=output.getvalue(),
+
+    try:
+        source = report_export.prepare_rows(res["data"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return StreamingResponse(
+        report_export.iter_csv([source]),
         media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename=report_{report_id}.csv"}
+        headers={
+            "Content-Disposition": f"attachment; filename=report_{report_id}.csv",
+            "X-Report-Cache": "hit" if res.get("cache_hit") else "miss"
+        }
     )
 
+@router.post("/{report_id}/parquet")
+def generate_report_parquet(report_id: uuid.UUID, data: ReportGenerateRequest, compression: str = "zstd", refresh: bool = False, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
+    """Streams the report data as a Parquet file (one row group per batch)."""
+    return _report_columnar_response(report_id, data, "parquet", compression, refresh, db, current_user)
+
+@router.post("/{report_id}/arrow")
+def generate_report_arrow(report_id: uuid.UUID, data: ReportGenerateRequest, compression: str = "zstd", refresh: bool = False, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
+    """Streams the report data as an Arrow IPC stream."""
+    return _report_columnar_response(report_id, data, "arrow", compression, refresh, db, current_user)
+
 @router.post("/{report_id}/html-file")
-def generate_report_html_file(report_id: uuid.UUID, data: ReportGenerateRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
-    res = _generate_report_html(report_id, data.parameters, db)
-    run = ReportRun(
-        report_id=report_id,
-        executed_by=current_user.id,
-        parameters_json=data.parameters,
-        result_snapshot=None
-    )
-    db.add(run)
-    db.commit()
+def generate_report_html_file(report_id: uuid.UUID, data: ReportGenerateRequest, refresh: bool = False, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
+    user_context = {"id": str(current_user.id), "username": current_user.username, "role": str(current_user.role)}
+    res = _generate_report_html(report_id, data.parameters, db, user_context=user_context, refresh=refresh)
+    report_snapshots.record_run(db, report_id, data.parameters, current_user.id, result=res)
     return Response(
         content=res["html"],
         media_type="text/html",
-        headers={"Content-Disposition": f"attachment; filename=report_{report_id}.html"}
+        headers={
+            "Content-Disposition": f"attachment; filename=report_{report_id}.html",
+            "X-Report-Cache": "hit" if res.get("cache_hit") else "miss"
+        }
     )
 
 @router.post("/{report_id}/compile", response_model=ReportCompileResponse)
@@ -943,55 +1144,20 @@ def compile_report(report_id: uuid.UUID, db: Session = Depends(get_db), current_
         return {"success": False, "console": result["console"], "error": result.get("error"), "validation_reason": result.get("validation_reason")}
 
 @router.get("/{report_id}/options")
-def get_report_parameter_options(report_id: uuid.UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
+def get_report_parameter_options(report_id: uuid.UUID, limit: Optional[int] = Query(None, ge=1), db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
     report = db.query(Report).filter(Report.id == report_id).first()
     if not report: raise HTTPException(status_code=404, detail="Report not found")
-    options = {}
-    for param in report.parameters:
-        source = param.source.strip() if param.source else ""
-        if not source:
-             options[param.parameter_name] = []
-             continue
-        try:
-            if source.startswith("@"):
-                parts = source[1:].split("->")
-                table_name, fields_str = parts[0], parts[1] if len(parts) > 1 else "id,name"
-                fields = fields_str.split(",")
-                val_field, lbl_field = fields[0], fields[1] if len(fields) > 1 else fields[0]
-                if not re.match(r'^\w+$', table_name) or not re.match(r'^\w+$', val_field) or not re.match(r'^\w+$', lbl_field):
-                    options[param.parameter_name] = []
-                    continue
-                result = db.execute(text(f"SELECT {val_field}, {lbl_field} FROM {table_name} LIMIT 1000"), get_system_parameters())
-                options[param.parameter_name] = [{"value": str(row[0]), "label": str(row[1])} for row in result.fetchall()]
-            elif source.lower().startswith("select"):
-                system_params = get_system_parameters()
-                result = db.execute(text(source), system_params)
-                columns = result.keys()
-                rows = [tuple(r) for r in result.fetchall()]
-                
-                param_options = []
-                for row in rows:
-                    row_dict = dict(zip(columns, row))
-                    
-                    # Case-insensitive lookup for 'value' and 'label'
-                    val_key = next((k for k in row_dict if k.lower() == 'value'), None)
-                    lab_key = next((k for k in row_dict if k.lower() == 'label'), None)
-                    
-                    val = row_dict.get(val_key) if val_key else None
-                    if val is None and len(row) > 0:
-                        val = row[0]
-                    
-                    if val is None:
-                        continue
-                    
-                    lbl = row_dict.get(lab_key) if lab_key else None
-                    if lbl is None:
-                        lbl = val
-                    
-                    param_options.append({"value": str(val), "label": str(lbl)})
-                options[param.parameter_name] = param_options
-            else: options[param.parameter_name] = []
-        except Exception as e:
-            print(f"Error fetching options: {e}")
-            options[param.parameter_name] = []
-    return options
+    return parameter_options.resolve_many({param.parameter_name: param.source for param in report.parameters}, limit=limit)
+
+@router.get("/{report_id}/options/{parameter_name}", response_model=ParameterOptionsPage)
+def get_report_parameter_options_page(report_id: uuid.UUID, parameter_name: str, search: Optional[str] = None, offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=1000), db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=manager_access):
+    """Search and paginate the options of a single parameter (for large lists)."""
+    report = db.query(Report).filter(Report.id == report_id).first()
+    if not report: raise HTTPException(status_code=404, detail="Report not found")
+    param = next((p for p in report.parameters if p.parameter_name == parameter_name), None)
+    if not param: raise HTTPException(status_code=404, detail="Parameter not found")
+    try:
+        return parameter_options.resolve(db, param.source, search=search, offset=offset, limit=limit)
+    except Exception as e:
+        print(f"Error fetching options: {e}")
+        return {"options": [], "has_more": False}
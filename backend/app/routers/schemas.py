@@ -5,11 +5,10 @@ from uuid import UUID
 
 from ..core.database import get_db
 from ..core.security import get_current_user
-from ..models import User, RoleEnum, LockData, Schema, ExternalSchemaCache
+from ..models import User, RoleEnum, Schema, ExternalSchemaCache
 from ..schemas.schema_registry import SchemaCreate, SchemaUpdate, SchemaResponse, ExternalSchemaCacheResponse
-from sqlalchemy import exists, and_
 from ..services.cache_manager import fetch_and_cache_external_schema
-from ..core.locks import raise_if_locked, check_is_locked
+from ..core.locks import raise_if_locked, check_is_locked, with_lock_status
 from ..internal_libs import projects_lib
 
 router = APIRouter(prefix="/schemas", tags=["schemas"])
@@ -22,12 +21,7 @@ def check_admin(user: User):
 def get_schemas(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     current_project_id = projects_lib.get_project_id()
     
-    is_locked_subquery = db.query(LockData.id).filter(
-        LockData.entity_id == Schema.id,
-        LockData.entity_type == "schemas"
-    ).exists()
-    
-    query = db.query(Schema, is_locked_subquery.label("is_locked"))
+    query = db.query(Schema)
     if current_project_id:
         # In project mode: see project items + global items + systemic ones
         query = query.filter(
@@ -42,7 +36,7 @@ def get_schemas(db: Session = Depends(get_db), current_user: User = Depends(get_
     results = query.all()
     
     response = []
-    for schema, is_locked in results:
+    for schema, is_locked in with_lock_status(db, "schemas", results):
         schema_dict = {c.name: getattr(schema, c.name) for c in schema.__table__.columns}
         schema_dict["is_locked"] = is_locked
         response.append(schema_dict)
@@ -70,10 +64,7 @@ def create_schema(
 
 @router.get("/{schema_id}", response_model=SchemaResponse)
 def get_schema(schema_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    is_locked = db.query(exists().where(and_(
-        LockData.entity_id == schema_id,
-        LockData.entity_type == "schemas"
-    ))).scalar()
+    is_locked = check_is_locked(db, schema_id, "schemas")
     
     schema = db.query(Schema).filter(Schema.id == schema_id).first()
     if not schema:
@@ -126,10 +117,7 @@ def update_schema(
     db.commit()
     db.refresh(schema)
     
-    is_locked = db.query(exists().where(and_(
-        LockData.entity_id == schema_id,
-        LockData.entity_type == "schemas"
-    ))).scalar()
+    is_locked = check_is_locked(db, schema_id, "schemas")
     
     return {**{c.name: getattr(schema, c.name) for c in schema.__table__.columns}, "is_locked": is_locked}
 
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Response
 import inspect
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
@@ -14,9 +14,8 @@ from ..models.workflow import Workflow, WorkflowExecution, WorkflowStatus
 from ..models.node import NodeType
 from ..services.executor import execute_workflow
 from ..models.report import ObjectParameter
-from ..models import LockData
-from sqlalchemy import exists, and_
-from ..core.locks import raise_if_locked, check_is_locked
+from ..core.locks import raise_if_locked, check_is_locked, with_lock_status
+from ..core.pagination import ListParams, paginate, project, render
 from ..internal_libs import projects_lib
 
 router = APIRouter(prefix="/workflows", tags=["workflows"])
@@ -25,9 +24,9 @@ manager_access = Depends(require_role("manager", "admin"))
 admin_access = Depends(require_role("admin"))
 
 
-from ..schemas.object_parameter import ObjectParameterCreate, ObjectParameterOut
-from sqlalchemy import text
-from ..core.system_parameters import inject_system_params, get_system_parameters
+from ..schemas.object_parameter import ObjectParameterCreate, ObjectParameterOut, SourceTestRequest, SourceTestResponse, ParameterOptionsPage
+from ..services.parameter_options import parameter_options
+from ..core.system_parameters import inject_system_params
 import re
 
 
@@ -179,7 +178,7 @@ def get_assigned_users(current_user: User = Depends(get_current_user), db: Sessi
 
 
 @router.get("/users/{user_id}/workflows", response_model=List[WorkflowOut])
-def get_user_workflows(user_id: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db), _=workflow_access):
+def get_user_workflows(user_id: str, response: Response, params: ListParams = Depends(), current_user: User = Depends(get_current_user), db: Session = Depends(get_db), _=workflow_access):
     # Admins can see everything, other users can see their own
     if current_user.role != "admin":
         if user_id != str(current_user.id):
@@ -187,12 +186,7 @@ def get_user_workflows(user_id: str, current_user: User = Depends(get_current_us
     
     current_project_id = projects_lib.get_project_id()
 
-    is_locked_subquery = db.query(LockData.id).filter(
-        LockData.entity_id == Workflow.id,
-        LockData.entity_type == "workflows"
-    ).exists()
-
-    query = db.query(Workflow, is_locked_subquery.label("is_locked")).filter(Workflow.owner_id == user_id)
+    query = db.query(Workflow).filter(Workflow.owner_id == user_id)
 
     if current_project_id:
         # In project mode: see ONLY project items
@@ -201,14 +195,9 @@ def get_user_workflows(user_id: str, current_user: User = Depends(get_current_us
         # Outside project mode: see ONLY general items
         query = query.filter(Workflow.project_id == None)
 
-    results = query.all()
-    
-    response = []
-    for wf, is_locked in results:
-        wf_dict = WorkflowOut.model_validate(wf).model_dump()
-        wf_dict["is_locked"] = is_locked
-        response.append(wf_dict)
-    return response
+    query = project(query, Workflow, params, WorkflowOut, relationships=("parameters",))
+    results = paginate(query, params, response, (Workflow.name, Workflow.id))
+    return render(with_lock_status(db, "workflows", results), params, response, WorkflowOut)
 
 
 @router.post("/workflows", response_model=WorkflowDetail)
@@ -287,10 +276,7 @@ def get_workflow(workflow_id: uuid.UUID, current_user: User = Depends(get_curren
     if not wf:
         raise HTTPException(status_code=404, detail="Workflow not found")
     
-    is_locked = db.query(exists().where(and_(
-        LockData.entity_id == workflow_id,
-        LockData.entity_type == "workflows"
-    ))).scalar()
+    is_locked = check_is_locked(db, workflow_id, "workflows")
 
     # Enforce strict ownership: only creator/owner, admin, or if project matches current context
     current_project_id = projects_lib.get_project_id()
@@ -426,10 +412,7 @@ def duplicate_workflow(workflow_id: uuid.UUID, current_user: User = Depends(get_
         db.add(new_p)
     db.commit()
 
-    is_locked = db.query(exists().where(and_(
-        LockData.entity_id == new_wf.id,
-        LockData.entity_type == "workflows"
-    ))).scalar()
+    is_locked = check_is_locked(db, new_wf.id, "workflows")
     
     wf_dict = WorkflowDetail.model_validate(new_wf).model_dump()
     wf_dict["is_locked"] = is_locked
@@ -455,129 +438,40 @@ def delete_workflow(workflow_id: uuid.UUID, current_user: User = Depends(get_cur
 
 
 @router.get("/workflows/{workflow_id}/options")
-def get_workflow_parameter_options(workflow_id: uuid.UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=workflow_access):
+def get_workflow_parameter_options(workflow_id: uuid.UUID, limit: Optional[int] = Query(None, ge=1), db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=workflow_access):
     wf = db.query(Workflow).filter(Workflow.id == workflow_id).first()
     if not wf:
          raise HTTPException(status_code=404, detail="Workflow not found")
-         
-    options = {}
-    for param in wf.parameters:
-        source = param.source.strip() if param.source else ""
-        if not source:
-             options[param.parameter_name] = []
-             continue
 
-        try:
-            if source.startswith("@"):
-                # Support for @table-name->value,label
-                parts = source[1:].split("->")
-                table_name = parts[0]
-                fields_str = parts[1] if len(parts) > 1 else "id,name"
-                fields = fields_str.split(",")
-                val_field = fields[0]
-                lbl_field = fields[1] if len(fields) > 1 else val_field
-                
-                if not re.match(r'^\w+$', table_name) or not re.match(r'^\w+$', val_field) or not re.match(r'^\w+$', lbl_field):
-                    options[param.parameter_name] = []
-                    continue
-
-                system_params = get_system_parameters()
-                result = db.execute(text(f"SELECT {val_field}, {lbl_field} FROM {table_name} LIMIT 1000"), system_params)
-                options[param.parameter_name] = [
-                    {"value": str(row[0]), "label": str(row[1])} for row in [tuple(r) for r in result.fetchall()]
-                ]
-            elif source.lower().startswith("select"):
-                system_params = get_system_parameters()
-                result = db.execute(text(source), system_params)
-                columns = result.keys()
-                rows = [tuple(r) for r in result.fetchall()]
-                
-                param_options = []
-                for row in rows:
-                    row_dict = dict(zip(columns, row))
-                    
-                    # Case-insensitive lookup for 'value' and 'label'
-                    val_key = next((k for k in row_dict if k.lower() == 'value'), None)
-                    lab_key = next((k for k in row_dict if k.lower() == 'label'), None)
-                    
-                    val = row_dict.get(val_key) if val_key else None
-                    if val is None and len(row) > 0:
-                        val = row[0]
-                    
-                    if val is None:
-                        continue
-                    
-                    lbl = row_dict.get(lab_key) if lab_key else None
-                    if lbl is None:
-                        lbl = val
-                    
-                    param_options.append({"value": str(val), "label": str(lbl)})
-                options[param.parameter_name] = param_options
-            else:
-                options[param.parameter_name] = []
-        except Exception as e:
-            print(f"Failed to fetch options for {param.parameter_name}: {e}")
-            options[param.parameter_name] = []
-            
-    return options
+    return parameter_options.resolve_many({param.parameter_name: param.source for param in wf.parameters}, limit=limit)
+
+
+@router.get("/workflows/{workflow_id}/options/{parameter_name}", response_model=ParameterOptionsPage)
+def get_workflow_parameter_options_page(workflow_id: uuid.UUID, parameter_name: str, search: Optional[str] = None, offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=1000), db: Session = Depends(get_db), current_user: User = Depends(get_current_user), _=workflow_access):
+    """Search and paginate the options of a single parameter (for large lists)."""
+    wf = db.query(Workflow).filter(Workflow.id == workflow_id).first()
+    if not wf:
+         raise HTTPException(status_code=404, detail="Workflow not found")
+    param = next((p for p in wf.parameters if p.parameter_name == parameter_name), None)
+    if not param:
+        raise HTTPException(status_code=404, detail="Parameter not found")
+
+    try:
+        return parameter_options.resolve(db, param.source, search=search, offset=offset, limit=limit)
+    except Exception as e:
+        print(f"Failed to fetch options for {parameter_name}: {e}")
+        return {"options": [], "has_more": False}
 
 
-from ..schemas.object_parameter import SourceTestRequest, SourceTestResponse
 
 @router.post("/test-source", response_model=SourceTestResponse)
 def test_parameter_source(data: SourceTestRequest, db: Session = Depends(get_db), _=manager_access):
     source = data.source.strip()
-    if not source:
-        return {"options": [], "error": None}
-    
+    # Previews of "@table" sources show the first 100 rows unless a page size is given
+    limit = data.limit if data.limit is not None else (100 if source.startswith("@") else None)
     try:
-        if source.startswith("@"):
-            parts = source[1:].split("->")
-            table_name = parts[0]
-            fields_str = parts[1] if len(parts) > 1 else "id,name"
-            fields = fields_str.split(",")
-            val_field = fields[0]
-            lbl_field = fields[1] if len(fields) > 1 else val_field
-            
-            if not re.match(r'^\w+$', table_name) or not re.match(r'^\w+$', val_field) or not re.match(r'^\w+$', lbl_field):
-                return {"options": [], "error": "Invalid table or field names"}
-
-            system_params = get_system_parameters()
-            result = db.execute(text(f"SELECT {val_field}, {lbl_field} FROM {table_name} LIMIT 100"), system_params)
-            options = [
-                {"value": str(row[0]), "label": str(row[1])} for row in [tuple(r) for r in result.fetchall()]
-            ]
-            return {"options": options, "error": None}
-            
-        elif source.lower().startswith("select"):
-            system_params = get_system_parameters()
-            result = db.execute(text(source), system_params)
-            columns = result.keys()
-            rows = [tuple(r) for r in result.fetchall()]
-            
-            param_options = []
-            for row in rows:
-                row_dict = dict(zip(columns, row))
-                
-                # Case-insensitive lookup for 'value' and 'label'
-                val_key = next((k for k in row_dict if k.lower() == 'value'), None)
-                lab_key = next((k for k in row_dict if k.lower() == 'label'), None)
-                
-                val = row_dict.get(val_key) if val_key else None
-                if val is None and len(row) > 0:
-                    val = row[0]
-                
-                if val is None:
-                    continue
-                
-                lbl = row_dict.get(lab_key) if lab_key else None
-                if lbl is None:
-                    lbl = val
-                
-                param_options.append({"value": str(val), "label": str(lbl)})
-            return {"options": param_options, "error": None}
-        else:
-            return {"options": [], "error": "Unknown source format"}
+        page = parameter_options.resolve(db, source, search=data.search, offset=data.offset, limit=limit)
+        return {**page, "error": None}
     except Exception as e:
         return {"options": [], "error": str(e)}
 
@@ -868,20 +762,10 @@ def get_node_fill_data(
 
 
 @router.get("/node-types", response_model=List[NodeTypeOut])
-def list_node_types(db: Session = Depends(get_db), _=workflow_access):
-    is_locked_subquery = db.query(LockData.id).filter(
-        LockData.entity_id == NodeType.id,
-        LockData.entity_type == "node_types"
-    ).exists()
-    
-    results = db.query(NodeType, is_locked_subquery.label("is_locked")).all()
-    
-    response = []
-    for node, is_locked in results:
-        node_dict = NodeTypeOut.model_validate(node).model_dump()
-        node_dict["is_locked"] = is_locked
-        response.append(node_dict)
-    return response
+def list_node_types(response: Response, params: ListParams = Depends(), db: Session = Depends(get_db), _=workflow_access):
+    query = project(db.query(NodeType), NodeType, params, NodeTypeOut)
+    results = paginate(query, params, response, (NodeType.name, NodeType.id))
+    return render(with_lock_status(db, "node_types", results), params, response, NodeTypeOut)
 
 
 @router.get("/workflows/{workflow_id}/executions", response_model=List[ExecutionOut])
@@ -921,15 +805,10 @@ def get_execution_details(execution_id: uuid.UUID, current_user: User = Depends(
 
 
 @router.get("/common", response_model=List[WorkflowOut])
-def list_common_workflows(db: Session = Depends(get_db), _=workflow_access):
+def list_common_workflows(response: Response, params: ListParams = Depends(), db: Session = Depends(get_db), _=workflow_access):
     current_project_id = projects_lib.get_project_id()
     
-    is_locked_subquery = db.query(LockData.id).filter(
-        LockData.entity_id == Workflow.id,
-        LockData.entity_type == "workflows"
-    ).exists()
-    
-    query = db.query(Workflow, is_locked_subquery.label("is_locked")).filter(Workflow.owner_id == "common")
+    query = db.query(Workflow).filter(Workflow.owner_id == "common")
     
     if current_project_id:
         # In project mode: see project items ONLY
@@ -938,11 +817,6 @@ def list_common_workflows(db: Session = Depends(get_db), _=workflow_access):
         # Outside project mode: see general items ONLY
         query = query.filter(Workflow.project_id == None)
         
-    results = query.all()
-    
-    response = []
-    for wf, is_locked in results:
-        wf_dict = WorkflowOut.model_validate(wf).model_dump()
-        wf_dict["is_locked"] = is_locked
-        response.append(wf_dict)
-    return response
+    query = project(query, Workflow, params, WorkflowOut, relationships=("parameters",))
+    results = paginate(query, params, response, (Workflow.name, Workflow.id))
+    return render(with_lock_status(db, "workflows", results), params, response, WorkflowOut)
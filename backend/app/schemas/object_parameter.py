@@ -1,6 +1,6 @@
 import uuid
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class ObjectParameterBase(BaseModel):
     parameter_name: str
@@ -23,7 +23,15 @@ class SourceTestRequest(BaseModel):
     source: str
     value_field: Optional[str] = None
     label_field: Optional[str] = None
+    search: Optional[str] = None
+    offset: int = Field(0, ge=0)
+    limit: Optional[int] = Field(None, ge=1)
 
 class SourceTestResponse(BaseModel):
     options: List[Dict[str, Any]]
+    has_more: bool = False
     error: Optional[str] = None
+
+class ParameterOptionsPage(BaseModel):
+    options: List[Dict[str, Any]]
+    has_more: bool = False
@@ -0,0 +1,112 @@
+"""
+In-process cache for rendered charts.
+
+Reports usually re-render the same charts for the same data on every refresh.
+Entries are keyed by (chart function, hash of data and keyword arguments) and hold
+the finished SVG string; the cache is a size-bounded LRU (CHART_CACHE_MAX_ENTRIES
+entries, CHART_CACHE_MAX_BYTES of SVG in total).
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from ..core.config import CHART_CACHE_MAX_BYTES, CHART_CACHE_MAX_ENTRIES
+
+try:
+    import numpy as np
+    import pandas as pd
+except Exception:
+    np = None
+    pd = None
+
+
+def _update(h, value: Any):
+    if pd is not None and isinstance(value, pd.DataFrame):
+        h.update(f"DataFrame:{list(value.columns)!r}:{[str(t) for t in value.dtypes]!r}:".encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif pd is not None and isinstance(value, pd.Series):
+        h.update(f"Series:{value.name!r}:{value.dtype}:".encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif np is not None and isinstance(value, np.ndarray):
+        h.update(f"ndarray:{value.dtype}:{value.shape}:".encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple, dict)):
+        h.update(f"{type(value).__name__}:".encode())
+        h.update(json.dumps(value, sort_keys=True, default=repr, separators=(",", ":")).encode())
+    else:
+        h.update(f"{type(value).__name__}:{value!r}".encode())
+    h.update(b"|")
+
+
+def chart_key(name: str, args: tuple, kwargs: Dict[str, Any]) -> Optional[str]:
+    """
+    Returns a stable key for a chart call, or None when the arguments can't be hashed
+    reliably (e.g. DataFrames holding lists); such calls are rendered without caching.
+    """
+    h = hashlib.sha256(name.encode())
+    try:
+        for value in args:
+            _update(h, value)
+        for k in sorted(kwargs):
+            h.update(f"{k}=".encode())
+            _update(h, kwargs[k])
+    except (TypeError, ValueError):
+        return None
+    return h.hexdigest()
+
+
+class ChartCache:
+    """Thread-safe LRU of rendered chart SVGs bounded by entry count and total size."""
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            svg = self._entries.get(key)
+            if svg is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return svg
+
+    def set(self, key: str, svg: str):
+        if self.max_entries <= 0 or len(svg) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = svg
+            self._size += len(svg)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+chart_cache = ChartCache(max_entries=CHART_CACHE_MAX_ENTRIES, max_bytes=CHART_CACHE_MAX_BYTES)
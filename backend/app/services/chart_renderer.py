@@ -0,0 +1,90 @@
+"""
+Process-pool chart rendering.
+
+Matplotlib rendering is CPU-bound and holds the GIL, and rcParams are process-global,
+so charts requested from FastAPI's threadpool are rendered in separate worker
+processes instead. Each worker renders one chart at a time, which keeps rcParams
+private to the chart being drawn. charts.* functions submit work here and block on
+the result; charts.render_many submits several charts at once so they render in
+parallel. CHART_RENDER_WORKERS=0 renders in-process (serialized by a lock).
+"""
+import multiprocessing
+import pickle
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+from ..core.config import CHART_RENDER_WORKERS
+from ..internal_libs.logger_lib import system_log
+
+
+def _warm_worker():
+    """Process initializer: import matplotlib/pandas and draw once so font caches are loaded."""
+    try:
+        from ..internal_libs import charts
+        charts._render_chart("bar", {"data": [{"x": "a", "y": 1}], "x": "x", "y": "y"})
+    except Exception as e:
+        print(f"Chart worker warm-up failed: {e}", flush=True)
+
+
+def _render_payload(name: str, payload: bytes) -> str:
+    """Runs inside a worker process."""
+    from ..internal_libs import charts
+    return charts._render_chart(name, pickle.loads(payload))
+
+
+class ChartRenderer:
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: never fork the API process with its live threads and DB connections
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_worker,
+                )
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def submit(self, name: str, params: Dict[str, Any]) -> Future:
+        """Schedules charts.<name>(**params); the returned future resolves to the SVG string."""
+        payload = None
+        if self.max_workers > 0:
+            try:
+                payload = pickle.dumps(params, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                system_log(f"[CHARTS] {name}: arguments can't be sent to a worker ({e}); rendering in-process", level="system")
+
+        if payload is None:
+            return self._render_inline(name, params)
+
+        try:
+            return self._get_pool().submit(_render_payload, name, payload)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM on a huge dataset); start a fresh pool once
+            with self._lock:
+                self._pool = None
+            return self._get_pool().submit(_render_payload, name, payload)
+
+    def _render_inline(self, name: str, params: Dict[str, Any]) -> Future:
+        from ..internal_libs import charts
+        future = Future()
+        try:
+            future.set_result(charts._render_chart(name, params))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+chart_renderer = ChartRenderer(max_workers=CHART_RENDER_WORKERS)
@@ -38,7 +38,7 @@ from ..internal_libs import prompt_lib
 from ..internal_libs import response_lib
 from ..internal_libs import charts
 from ..internal_libs.logger_lib import executor_logger
-from ..internal_libs.context_lib import execution_context, project_id_context, project_owner_context
+from ..internal_libs.context_lib import execution_context, project_id_context, project_owner_context, db_session_context
 from ..models.project import Project
 from ..internal_libs.runtime_lib import (
     get_runtime_data as runtime_get_data,
@@ -197,7 +197,8 @@ SAFE_GLOBALS = {
         fill_template=common_lib.fill_template
     ),
     "inner_database": SimpleNamespace(
-        unsafe_request=database_lib.unsafe_request
+        unsafe_request=database_lib.unsafe_request,
+        query_df=database_lib.query_df
     ),
     "analytics": SimpleNamespace(
         process_request=analytics.process_analytics_request,
@@ -232,6 +233,7 @@ SAFE_GLOBALS = {
     ),
     "prompts": SimpleNamespace(
         add_prompt=prompt_lib.add_prompt,
+        add_prompts_bulk=prompt_lib.add_prompts_bulk,
         get_prompts_by_category_with_reference_id=prompt_lib.get_prompts_by_category_with_reference_id,
         get_prompts_by_category_with_id=prompt_lib.get_prompts_by_category_with_id,
         delete_prompts_by_period_and_entity=prompt_lib.delete_prompts_by_period_and_entity,
@@ -240,6 +242,7 @@ SAFE_GLOBALS = {
     "response_data": SimpleNamespace(
         clear_recent_records_by_entity_and_category=response_lib.clear_recent_records_by_entity_and_category,
         add_response=response_lib.add_response,
+        add_responses_bulk=response_lib.add_responses_bulk,
         update_response_meta=response_lib.update_response_meta,
         update_response_meta_by_key=response_lib.update_response_meta_by_key,
         get_responses_by_period_and_category=response_lib.get_responses_by_period_and_category
@@ -365,6 +368,10 @@ class WorkflowExecutor:
         self.execution_logs.append(entry)
         if self.execution:
             self.execution.logs = list(self.execution_logs)
+            # Committing inside a lib call's SAVEPOINT would make its partial writes durable;
+            # the logs are written by the first commit after the call instead
+            if self.db.in_nested_transaction():
+                return
             try:
                 self.db.commit()
             except:
@@ -387,6 +394,9 @@ class WorkflowExecutor:
             # Set the logger and execution context for this execution thread
             token = executor_logger.set(self.log)
             context_token = execution_context.set(str(self.execution_id))
+            # Lib calls of all nodes share the executor's session (see internal_libs/session_lib.py);
+            # a separate one would hold row locks the executor's own commits wait on
+            session_token = db_session_context.set(self.db)
             
             # Set project context if the workflow belongs to a project
             p_id_token = None
@@ -559,6 +569,8 @@ class WorkflowExecutor:
                 executor_logger.reset(token)
             if 'context_token' in locals():
                 execution_context.reset(context_token)
+            if 'session_token' in locals():
+                db_session_context.reset(session_token)
             if 'p_id_token' in locals() and p_id_token:
                 project_id_context.reset(p_id_token)
             if 'p_owner_token' in locals() and p_owner_token:
@@ -809,6 +821,7 @@ class WorkflowExecutor:
                 ),
                 "prompts": SimpleNamespace(
                     add_prompt=prompt_lib.add_prompt,
+                    add_prompts_bulk=prompt_lib.add_prompts_bulk,
                     get_prompts_by_category_with_reference_id=prompt_lib.get_prompts_by_category_with_reference_id,
                     get_prompts_by_category_with_id=prompt_lib.get_prompts_by_category_with_id,
                     delete_prompts_by_period_and_entity=prompt_lib.delete_prompts_by_period_and_entity,
@@ -817,6 +830,7 @@ class WorkflowExecutor:
                 "response_data": SimpleNamespace(
                     clear_recent_records_by_entity_and_category=response_lib.clear_recent_records_by_entity_and_category,
                     add_response=response_lib.add_response,
+                    add_responses_bulk=response_lib.add_responses_bulk,
                     update_response_meta=response_lib.update_response_meta,
                     update_response_meta_by_key=response_lib.update_response_meta_by_key,
                     get_responses_by_period_and_category=response_lib.get_responses_by_period_and_category
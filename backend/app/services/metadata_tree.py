@@ -0,0 +1,51 @@
+"""
+Queries on the metadata hierarchy.
+
+They read the metadata_closure table (models/schema.py), which holds a row for every
+ancestor/descendant pair, so subtrees, roots and subtree sizes are single indexed
+lookups instead of a walk over parent_id. Queries join metadata where rows deleted
+outside the ORM on SQLite (no foreign key cascade) could otherwise leave stale pairs.
+"""
+import uuid
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..models.schema import MetadataClosure, MetadataRecord, Schema
+
+
+def subtree_ids(record_ids):
+    """Select of the ids of `record_ids` (ids or a select of ids) and all their descendants."""
+    return select(MetadataClosure.descendant_id).where(MetadataClosure.ancestor_id.in_(record_ids))
+
+
+def subtree_ids_with_schema(record_ids, schema_key: str):
+    """Select of the ids of the records with schema `schema_key` in the subtrees of `record_ids`."""
+    return (
+        select(MetadataClosure.descendant_id)
+        .join(MetadataRecord, MetadataRecord.id == MetadataClosure.descendant_id)
+        .join(Schema, MetadataRecord.schema_id == Schema.id)
+        .where(MetadataClosure.ancestor_id.in_(record_ids), Schema.key == schema_key)
+    )
+
+
+def root_id(db: Session, record_id: uuid.UUID) -> Optional[uuid.UUID]:
+    """Id of the root of the record's hierarchy (the record itself for a root), None if it doesn't exist."""
+    return db.execute(
+        select(MetadataClosure.ancestor_id)
+        .join(MetadataRecord, MetadataRecord.id == MetadataClosure.ancestor_id)
+        .where(MetadataClosure.descendant_id == record_id)
+        .order_by(MetadataClosure.depth.desc())
+        .limit(1)
+    ).scalar()
+
+
+def subtree_size(db: Session, record_id: uuid.UUID) -> int:
+    """Number of descendants of the record (the record itself not counted)."""
+    return db.execute(
+        select(func.count())
+        .select_from(MetadataClosure)
+        .join(MetadataRecord, MetadataRecord.id == MetadataClosure.descendant_id)
+        .where(MetadataClosure.ancestor_id == record_id, MetadataClosure.depth > 0)
+    ).scalar()
@@ -0,0 +1,296 @@
+"""
+Option lists for workflow and report parameters.
+
+A parameter's `source` is either "@table->value,label" or a SELECT statement.
+Resolved options are cached per (source, system parameters) for a short TTL and
+dropped as soon as a transaction that wrote to one of the tables the source reads
+commits.
+
+- "@table" sources are paged and searched in SQL (LIMIT/OFFSET, LIKE), so large
+  tables never have to be loaded to find an option.
+- SELECT sources are executed once (up to PARAMETER_OPTIONS_MAX_ROWS rows, streamed
+  from the cursor) and searched/paged from the cached list.
+
+Form endpoints resolve all parameters of a workflow/report concurrently, each on
+its own DB session.
+"""
+import contextvars
+import hashlib
+import itertools
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from ..core.config import (
+    PARAMETER_OPTIONS_MAX_ENTRIES,
+    PARAMETER_OPTIONS_MAX_ROWS,
+    PARAMETER_OPTIONS_MAX_WORKERS,
+    PARAMETER_OPTIONS_TTL,
+)
+from ..core.database import READ_TABLES_RE, WRITE_TABLE_RE, SessionLocal, engine
+from ..core.system_parameters import get_system_parameters
+from ..internal_libs.logger_lib import system_log
+
+# Page size of "@table" sources when the caller doesn't ask for one (previous hard LIMIT)
+TABLE_SOURCE_LIMIT = 1000
+
+_IDENT_RE = re.compile(r'^\w+$')
+
+
+def parse_table_source(source: str) -> Tuple[str, str, str]:
+    """Parses "@table->value,label" into (table, value field, label field); raises ValueError."""
+    parts = source[1:].split("->")
+    table_name = parts[0]
+    fields = (parts[1] if len(parts) > 1 else "id,name").split(",")
+    val_field = fields[0]
+    lbl_field = fields[1] if len(fields) > 1 else val_field
+    if not all(_IDENT_RE.match(name) for name in (table_name, val_field, lbl_field)):
+        raise ValueError("Invalid table or field names")
+    return table_name, val_field, lbl_field
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _rows_to_options(result, max_rows: Optional[int] = None) -> Tuple[List[Dict[str, str]], bool]:
+    """
+    Converts SELECT rows to options without building intermediate tuples/dicts.
+    Uses the 'value'/'label' columns (case-insensitive), else the first column.
+    Returns (options, truncated).
+    """
+    columns = [str(c).lower() for c in result.keys()]
+    val_idx = columns.index("value") if "value" in columns else None
+    lbl_idx = columns.index("label") if "label" in columns else None
+
+    rows = result if max_rows is None else itertools.islice(result, max_rows + 1)
+    options = []
+    for row in rows:
+        val = row[val_idx] if val_idx is not None else None
+        if val is None and len(row) > 0:
+            val = row[0]
+        if val is None:
+            continue
+        lbl = row[lbl_idx] if lbl_idx is not None else None
+        if lbl is None:
+            lbl = val
+        options.append({"value": str(val), "label": str(lbl)})
+    result.close()
+
+    truncated = max_rows is not None and len(options) > max_rows
+    return options[:max_rows] if truncated else options, truncated
+
+
+class ParameterOptionsService:
+    def __init__(self, ttl: int = 30, max_entries: int = 512, max_rows: int = 10000, max_workers: int = 4):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="parameter-options")
+        self.hits = 0
+        self.misses = 0
+
+    # --- cache ---
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["expires_at"] <= time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["value"]
+
+    def _set(self, key: str, value: Dict[str, Any], tables: Set[str]):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = {"value": value, "tables": tables, "expires_at": time.monotonic() + self.ttl}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_table(self, table_name: str) -> int:
+        table_name = table_name.lower()
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if table_name in e["tables"]]
+            for k in stale:
+                del self._entries[k]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    @staticmethod
+    def _key(*parts: Any) -> str:
+        raw = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # --- resolution ---
+
+    def resolve(self, db, source: Optional[str], search: Optional[str] = None, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Returns {"options": [...], "has_more": bool} for one parameter source.
+        Raises ValueError for malformed sources and propagates database errors.
+        """
+        source = (source or "").strip()
+        if not source:
+            return {"options": [], "has_more": False}
+        search = (search or "").strip().lower() or None
+        offset = max(0, offset or 0)
+        system_params = get_system_parameters()
+
+        if source.startswith("@"):
+            return self._resolve_table(db, source, system_params, search, offset, TABLE_SOURCE_LIMIT if limit is None else limit)
+        if source.lower().startswith("select"):
+            return self._resolve_select(db, source, system_params, search, offset, limit)
+        raise ValueError("Unknown source format")
+
+    def _resolve_table(self, db, source, system_params, search, offset, limit) -> Dict[str, Any]:
+        table_name, val_field, lbl_field = parse_table_source(source)
+        key = self._key("table", source, system_params, search, offset, limit)
+        cached = self._get(key)
+        if cached is not None:
+            return cached
+
+        sql = f"SELECT {val_field}, {lbl_field} FROM {table_name}"
+        bind = dict(system_params)
+        if search:
+            sql += (
+                f" WHERE LOWER(CAST({lbl_field} AS VARCHAR)) LIKE :_options_search ESCAPE '\\'"
+                f" OR LOWER(CAST({val_field} AS VARCHAR)) LIKE :_options_search ESCAPE '\\'"
+            )
+            bind["_options_search"] = f"%{_escape_like(search)}%"
+        # Pages are only stable under a total order; one extra row tells whether another page exists
+        order = lbl_field if lbl_field == val_field else f"{lbl_field}, {val_field}"
+        sql += f" ORDER BY {order} LIMIT :_options_limit OFFSET :_options_offset"
+        bind["_options_limit"] = limit + 1
+        bind["_options_offset"] = offset
+
+        rows = db.execute(text(sql), bind).fetchall()
+        value = {
+            "options": [{"value": str(row[0]), "label": str(row[1])} for row in rows[:limit]],
+            "has_more": len(rows) > limit,
+        }
+        self._set(key, value, {table_name.lower()})
+        return value
+
+    def _resolve_select(self, db, source, system_params, search, offset, limit) -> Dict[str, Any]:
+        key = self._key("select", source, system_params)
+        cached = self._get(key)
+        if cached is None:
+            result = db.execute(text(source).execution_options(stream_results=True), system_params)
+            options, truncated = _rows_to_options(result, self.max_rows)
+            if truncated:
+                system_log(f"[PARAMETER_OPTIONS] Source truncated to {self.max_rows} rows: {source[:200]}", level="system")
+            cached = {"options": options}
+            self._set(key, cached, {t.lower() for t in READ_TABLES_RE.findall(source)})
+
+        options = cached["options"]
+        if search:
+            options = [o for o in options if search in o["label"].lower() or search in o["value"].lower()]
+        end = None if limit is None else offset + limit
+        return {
+            "options": options[offset:end],
+            "has_more": end is not None and len(options) > end,
+        }
+
+    def _resolve_in_session(self, source: str, limit: Optional[int]) -> List[Dict[str, str]]:
+        task_db = SessionLocal()
+        try:
+            return self.resolve(task_db, source, limit=limit)["options"]
+        finally:
+            task_db.close()
+
+    def resolve_many(self, sources: Dict[str, Optional[str]], limit: Optional[int] = None) -> Dict[str, List[Dict[str, str]]]:
+        """
+        Resolves the sources of several parameters concurrently ({name: source} -> {name: options}).
+        A failing source yields an empty list, like a missing one.
+        """
+        futures = {}
+        for name, source in sources.items():
+            if not (source or "").strip():
+                continue
+            # Each task gets its own copy of the request context (project id, etc.)
+            ctx = contextvars.copy_context()
+            futures[name] = self._pool.submit(ctx.run, self._resolve_in_session, source, limit)
+
+        options = {}
+        for name in sources:
+            future = futures.get(name)
+            if future is None:
+                options[name] = []
+                continue
+            try:
+                options[name] = future.result()
+            except Exception as e:
+                system_log(f"Failed to fetch options for {name}: {e}", level="error")
+                options[name] = []
+        return options
+
+
+parameter_options = ParameterOptionsService(
+    ttl=PARAMETER_OPTIONS_TTL,
+    max_entries=PARAMETER_OPTIONS_MAX_ENTRIES,
+    max_rows=PARAMETER_OPTIONS_MAX_ROWS,
+    max_workers=PARAMETER_OPTIONS_MAX_WORKERS,
+)
+
+
+# Tables written in the connection's open transaction, and the connections of a session
+_PENDING_TABLES = "parameter_options_pending_tables"
+_SESSION_CONNECTIONS = "parameter_options_connections"
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _record_write(conn, cursor, statement, parameters, context, executemany):
+    # Covers ORM flushes as well as raw SQL from inner_database/unsafe_request
+    if statement[:1] in "SsWw(":
+        return
+    match = WRITE_TABLE_RE.match(statement)
+    if match:
+        conn.info.setdefault(_PENDING_TABLES, set()).add(match.group(1))
+
+
+@event.listens_for(engine, "rollback")
+def _discard_writes(conn):
+    conn.info.pop(_PENDING_TABLES, None)
+
+
+@event.listens_for(Session, "after_begin")
+def _track_connection(session, transaction, connection):
+    session.info.setdefault(_SESSION_CONNECTIONS, set()).add(connection)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    # Invalidating before the commit would let a concurrent resolve re-cache the old
+    # rows. Connections still in a transaction only released a savepoint (nested
+    # transactions, lib sessions joined to an outer one) and wait for the outer commit.
+    for conn in session.info.get(_SESSION_CONNECTIONS, ()):
+        if conn.in_transaction():
+            continue
+        for table in conn.info.pop(_PENDING_TABLES, ()):
+            parameter_options.invalidate_table(table)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_connections(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_SESSION_CONNECTIONS, None)
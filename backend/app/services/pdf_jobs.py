@@ -0,0 +1,194 @@
+"""
+Background PDF rendering jobs.
+
+WeasyPrint rendering is CPU-bound and can take tens of seconds for large reports,
+so it runs in a pool of worker processes instead of the request thread. Finished
+PDFs are written into temp storage (see temp_files_lib) and served by /files/download.
+Identical HTML is rendered only once: the output file name is derived from the
+content hash, and concurrent submissions of the same HTML share a single job.
+"""
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+from ..core.config import PDF_RENDER_WORKERS
+from ..internal_libs import temp_files_lib
+from ..internal_libs.logger_lib import system_log
+
+
+def _warm_worker():
+    """Process initializer: import WeasyPrint and render once so font caches are loaded."""
+    try:
+        from weasyprint import HTML
+        HTML(string="<html><body><p>warm-up</p></body></html>").write_pdf()
+    except Exception as e:
+        print(f"PDF worker warm-up failed: {e}", flush=True)
+
+
+def _render_pdf(html: str, target_path: str) -> str:
+    """Runs inside a worker process. Writes straight to disk instead of an in-memory buffer."""
+    from weasyprint import HTML
+    tmp_path = f"{target_path}.{os.getpid()}.part"
+    try:
+        HTML(string=html).write_pdf(tmp_path)
+        os.replace(tmp_path, target_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return target_path
+
+
+class PdfJobManager:
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._jobs_by_hash: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: never fork the API process with its live threads and DB connections
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+            )
+        return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _submit_render(self, html: str, target_path: str):
+        with self._lock:
+            try:
+                return self._get_pool().submit(_render_pdf, html, target_path)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM on a huge document); replace the pool once
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+                return self._get_pool().submit(_render_pdf, html, target_path)
+
+    def submit(self, html: str, owner_id: str) -> Dict[str, Any]:
+        content_hash = hashlib.sha256(html.encode("utf-8")).hexdigest()
+        filename = f"pdf_{content_hash[:32]}.pdf"
+        target_path = temp_files_lib.get_path(filename)
+
+        with self._lock:
+            existing_id = self._jobs_by_hash.get(content_hash)
+            existing = self._jobs.get(existing_id) if existing_id else None
+            if existing and existing["owner_id"] == owner_id and existing["status"] in ("pending", "running"):
+                return self._public(existing)
+
+            job = {
+                "id": str(uuid.uuid4()),
+                "owner_id": owner_id,
+                "content_hash": content_hash,
+                "filename": filename,
+                "status": "pending",
+                "error": None,
+                "deduplicated": False,
+                "created_at": time.time(),
+                "finished_at": None,
+            }
+            self._jobs[job["id"]] = job
+
+            if os.path.exists(target_path):
+                # Same HTML was rendered before and the file is still in temp storage
+                job["status"] = "done"
+                job["deduplicated"] = True
+                job["finished_at"] = time.time()
+                # Refresh mtime so temp cleanup keeps it for another day
+                os.utime(target_path, None)
+                return self._public(job)
+
+            if existing and existing["status"] in ("pending", "running"):
+                # Another user is rendering the same HTML; piggyback on that render
+                job["status"] = existing["status"]
+                job["deduplicated"] = True
+                existing.setdefault("followers", []).append(job["id"])
+                return self._public(job)
+
+            self._jobs_by_hash[content_hash] = job["id"]
+
+        try:
+            future = self._submit_render(html, target_path)
+        except Exception as e:
+            # Fail the job (and anyone who attached to it) instead of leaving it pending
+            system_log(f"[PDF_JOBS] Job {job['id']} could not be submitted: {e}", level="error")
+            self._finish(job["id"], str(e))
+            return self._public(job)
+        with self._lock:
+            job["status"] = "running"
+        future.add_done_callback(lambda f, job_id=job["id"]: self._on_done(job_id, f))
+        system_log(f"[PDF_JOBS] Submitted job {job['id']} ({filename})", level="system")
+        return self._public(job)
+
+    def _on_done(self, job_id: str, future):
+        error = None
+        try:
+            future.result()
+        except Exception as e:
+            error = str(e)
+            system_log(f"[PDF_JOBS] Job {job_id} failed: {error}", level="error")
+
+        self._finish(job_id, error)
+
+    def _finish(self, job_id: str, error: Optional[str]):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return
+            related = [job] + [self._jobs[f] for f in job.pop("followers", []) if f in self._jobs]
+            for j in related:
+                j["status"] = "failed" if error else "done"
+                j["error"] = error
+                j["finished_at"] = time.time()
+            if self._jobs_by_hash.get(job["content_hash"]) == job_id:
+                del self._jobs_by_hash[job["content_hash"]]
+            self._prune()
+
+    def _prune(self, max_age: int = 24 * 3600):
+        """Forget finished jobs older than the temp storage retention window."""
+        cutoff = time.time() - max_age
+        stale = [k for k, j in self._jobs.items() if j["finished_at"] and j["finished_at"] < cutoff]
+        for k in stale:
+            del self._jobs[k]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return None
+            if job["status"] == "done" and not os.path.exists(temp_files_lib.get_path(job["filename"])):
+                job["status"] = "expired"
+            return self._public(job)
+
+    def _public(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        result = {
+            "job_id": job["id"],
+            "owner_id": job["owner_id"],
+            "status": job["status"],
+            "error": job["error"],
+            "deduplicated": job["deduplicated"],
+            "download_url": None,
+            "filename": None,
+        }
+        if job["status"] == "done":
+            download = temp_files_lib.download(job["filename"])
+            if download.get("success"):
+                result["download_url"] = download["url"]
+                result["filename"] = download["filename"]
+        return result
+
+
+pdf_jobs = PdfJobManager(max_workers=PDF_RENDER_WORKERS)
@@ -0,0 +1,171 @@
+"""
+In-process cache for generated report results.
+
+Entries are keyed by (report id, code/template version, normalized parameters,
+user scope) and hold the executed data together with the rendered HTML fragment.
+Caching is opt-in per report through ``Report.meta``:
+
+    {
+        "cache_ttl": 600,               # seconds, 0 disables caching
+        "cache_scope": "user",          # "user" (default) or "global"
+        "cache_depends_on": ["response"] # tables whose writes invalidate entries
+    }
+
+Reports with a "refresh_schedule" (services/report_refresh.py) are cached for
+REPORT_REFRESH_CACHE_TTL unless cache_ttl is set. The worker's runs of the scheduled
+parameter sets are stored in the global scope, whatever cache_scope says.
+"""
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ..core.config import REPORT_CACHE_DEFAULT_TTL, REPORT_CACHE_MAX_ENTRIES, REPORT_REFRESH_CACHE_TTL
+
+
+def _normalize(value: Any) -> str:
+    """Stable JSON representation used for hashing parameters."""
+    return json.dumps(value, sort_keys=True, default=str, separators=(",", ":"))
+
+
+def get_report_version(report) -> str:
+    """Hash of everything that changes the output of a report besides its parameters."""
+    parts = [
+        report.code or "",
+        report.template or "",
+        str(report.style_id or ""),
+        str(report.updated_at or ""),
+    ]
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def get_cache_settings(report) -> Dict[str, Any]:
+    """Reads the cache configuration from Report.meta."""
+    meta = report.meta if isinstance(report.meta, dict) else {}
+    default_ttl = REPORT_CACHE_DEFAULT_TTL
+    if meta.get("refresh_schedule"):
+        default_ttl = max(default_ttl, REPORT_REFRESH_CACHE_TTL)
+    try:
+        ttl = int(meta.get("cache_ttl", default_ttl) or 0)
+    except (TypeError, ValueError):
+        ttl = 0
+    scope = meta.get("cache_scope") or "user"
+    depends_on = meta.get("cache_depends_on") or []
+    if isinstance(depends_on, str):
+        depends_on = [depends_on]
+    return {"ttl": max(0, ttl), "scope": scope, "depends_on": [str(d) for d in depends_on]}
+
+
+def build_cache_key(report, final_params: Dict[str, Any], user_context: Optional[Dict[str, Any]], scope: str = "user") -> str:
+    user_part = ""
+    if scope != "global" and user_context:
+        user_part = str(user_context.get("id", ""))
+    raw = "|".join([
+        str(report.id),
+        get_report_version(report),
+        _normalize(final_params),
+        user_part,
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ReportResultCache:
+    """Thread-safe LRU cache with per-entry TTL and invalidation by report or dependency."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry["expires_at"] <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # Callers may mutate the returned dict (e.g. console concatenation)
+            return copy.copy(entry["value"])
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int, report_id: str, depends_on: Iterable[str] = ()):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = {
+                "value": value,
+                "expires_at": time.monotonic() + ttl,
+                "report_id": str(report_id),
+                "depends_on": set(depends_on),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_report(self, report_id) -> int:
+        report_id = str(report_id)
+        return self._invalidate(lambda e: e["report_id"] == report_id)
+
+    def invalidate_dependency(self, name: str) -> int:
+        return self._invalidate(lambda e: name in e["depends_on"])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _invalidate(self, predicate) -> int:
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if predicate(e)]
+            for k in stale:
+                del self._entries[k]
+            return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+report_cache = ReportResultCache(max_entries=REPORT_CACHE_MAX_ENTRIES)
+
+
+# Dependencies written in a session's open transaction
+_PENDING_DEPENDENCIES = "report_cache_pending_dependencies"
+
+
+def invalidate_dependency(name: str, db=None):
+    """
+    Drops cached reports that declared `name` in meta.cache_depends_on.
+    Pass the session that wrote: if its commit only released a savepoint (lib sessions
+    inside an execution), the entries are dropped once the outer transaction commits.
+    """
+    if db is not None and db.in_transaction():
+        db.info.setdefault(_PENDING_DEPENDENCIES, set()).add(name)
+        return
+    report_cache.invalidate_dependency(name)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    # Invalidating before the commit would let a concurrent run re-cache the old rows
+    if session.in_nested_transaction():
+        return
+    for name in session.info.pop(_PENDING_DEPENDENCIES, ()):
+        report_cache.invalidate_dependency(name)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_on_rollback(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_PENDING_DEPENDENCIES, None)
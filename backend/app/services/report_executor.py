@@ -3,6 +3,9 @@ Sandboxed Python report execution engine.
 Uses RestrictedPython to safely execute report logic.
 """
 import traceback
+import contextvars
+import itertools
+import random
 import json
 import io
 import sys
@@ -35,7 +38,67 @@ class SubscriptableNamespace(SimpleNamespace):
     
     def to_dict(self):
         """Convert back to a dictionary recursively."""
-        return {k: (v.to_dict() if isinstance(v, SubscriptableNamespace) else v) for k, v in vars(self).items()}
+        return {k: _unwrap(v) for k, v in vars(self).items()}
+
+
+def _unwrap(value):
+    if isinstance(value, SubscriptableNamespace):
+        return value.to_dict()
+    if isinstance(value, list):
+        # list.__iter__ skips LazyList's wrapping
+        return [_unwrap(v) for v in list.__iter__(value)]
+    return value
+
+
+def _wrap(value):
+    if type(value) is dict:
+        return LazyNamespace(value)
+    if type(value) is list:
+        return LazyList(value)
+    return value
+
+
+class LazyNamespace(SubscriptableNamespace):
+    """
+    SubscriptableNamespace over a shallow copy of a dict. Nested dicts and lists are
+    wrapped on first access (and kept, so in-place changes stick), instead of the
+    whole tree being converted up front like dict_to_namespace does.
+    """
+    def __init__(self, data=None):
+        super().__init__()
+        if data:
+            self.__dict__.update(data)
+
+    def __getattribute__(self, name):
+        value = object.__getattribute__(self, name)
+        # vars()/__dict__ itself must stay the plain attribute dict
+        if (type(value) is dict or type(value) is list) and not name.startswith("__"):
+            value = _wrap(value)
+            object.__getattribute__(self, "__dict__")[name] = value
+        return value
+
+
+class LazyList(list):
+    """List copy whose dict/list items are wrapped on access, see LazyNamespace."""
+    def __getitem__(self, index):
+        value = list.__getitem__(self, index)
+        if isinstance(index, slice):
+            return LazyList(value)
+        if type(value) is dict or type(value) is list:
+            value = _wrap(value)
+            list.__setitem__(self, index, value)
+        return value
+
+    def __iter__(self):
+        for i, value in enumerate(list.__iter__(self)):
+            if type(value) is dict or type(value) is list:
+                value = _wrap(value)
+                list.__setitem__(self, i, value)
+            yield value
+
+    def __reversed__(self):
+        for i in range(len(self) - 1, -1, -1):
+            yield self[i]
 
 from ..internal_libs.ask_ai import ask_single, check_ai
 from ..internal_libs.openai import openai_lib
@@ -55,34 +118,95 @@ from ..internal_libs import agent_hints_lib
 from ..internal_libs import prompt_lib
 from ..internal_libs import response_lib
 from ..internal_libs import charts
-from ..internal_libs.context_lib import execution_context, object_params_context
+from ..internal_libs.context_lib import execution_context, object_params_context, db_session_context
 from ..internal_libs.logger_lib import executor_logger
+from ..internal_libs.session_lib import unit_of_work
 from ..internal_libs import temp_files_lib
 
+# Schema inference looks at the first SCHEMA_SAMPLE_HEAD items of a list plus a
+# reservoir sample of SCHEMA_SAMPLE_SIZE items from the rest
+SCHEMA_SAMPLE_HEAD = 1000
+SCHEMA_SAMPLE_SIZE = 1000
+
+def _sample_items(data: Any) -> List[Any]:
+    """Head plus a uniform sample of the remaining items, in their original order."""
+    budget = SCHEMA_SAMPLE_HEAD + SCHEMA_SAMPLE_SIZE
+    # Fixed seed: recompiling the same data yields the same schema
+    rng = random.Random(0)
+    if isinstance(data, list):
+        if len(data) <= budget:
+            return data
+        picked = sorted(rng.sample(range(SCHEMA_SAMPLE_HEAD, len(data)), SCHEMA_SAMPLE_SIZE))
+        return data[:SCHEMA_SAMPLE_HEAD] + [data[i] for i in picked]
+
+    iterator = iter(data)
+    head = list(itertools.islice(iterator, SCHEMA_SAMPLE_HEAD))
+    reservoir = []
+    for seen, item in enumerate(iterator):
+        if seen < SCHEMA_SAMPLE_SIZE:
+            reservoir.append((seen, item))
+        else:
+            j = rng.randint(0, seen)
+            if j < SCHEMA_SAMPLE_SIZE:
+                reservoir[j] = (seen, item)
+    return head + [item for _, item in sorted(reservoir, key=lambda pair: pair[0])]
+
+def _dtype_schema(series: pd.Series) -> Dict[str, Any]:
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return {"type": "boolean"}
+    if pd.api.types.is_numeric_dtype(dtype):
+        return {"type": "number"}
+    if pd.api.types.is_datetime64_any_dtype(dtype) or pd.api.types.is_timedelta64_dtype(dtype):
+        return {"type": "any"}
+    # object/string/category columns: the first non-null value decides
+    index = series.first_valid_index()
+    return generate_json_schema(series.loc[index] if index is not None else None)
+
+def _dataframe_schema(df: pd.DataFrame) -> Dict[str, Any]:
+    """Same shape as the schema of df.to_dict("records"), derived from column dtypes."""
+    if df.empty:
+        return {"type": "array", "items": {}}
+    properties = {str(col): _dtype_schema(df.iloc[:, i]) for i, col in enumerate(df.columns)}
+    return {"type": "array", "items": {"type": "object", "properties": properties}}
+
 def generate_json_schema(data: Any) -> Dict[str, Any]:
     """
     Generate a basic JSON Schema from data.
-    If data is a list, merges schemas from all elements to handle nullable fields.
+    Lists (and row iterators) are inferred from a sample and merge the schemas of the sampled
+    elements to handle nullable fields; DataFrames are described by their column dtypes.
     """
     if data is None:
         return {"type": "null"}
-    
-    if isinstance(data, list):
-        if not data:
+
+    if isinstance(data, pd.DataFrame):
+        return _dataframe_schema(data)
+
+    if isinstance(data, list) or is_row_iterator(data):
+        items = _sample_items(data)
+        if not items:
             return {"type": "array", "items": {}}
         
         # Merge schemas of all items to get a complete picture
         merged_properties = {}
+        resolved = set() # properties that already have a non-null schema
         item_schema_type = "object" # Default for list of dicts
         
-        for item in data:
-            item_schema = generate_json_schema(item)
-            if item_schema["type"] == "object" and "properties" in item_schema:
-                for prop, prop_schema in item_schema["properties"].items():
+        for item in items:
+            if isinstance(item, dict):
+                # Rows usually share their keys: once every key is typed there is nothing left to infer
+                if resolved.issuperset(item.keys()):
+                    continue
+                for prop, value in item.items():
+                    if prop in resolved:
+                        continue
+                    prop_schema = generate_json_schema(value)
                     if prop not in merged_properties or merged_properties[prop]["type"] == "null":
                         merged_properties[prop] = prop_schema
+                    if prop_schema["type"] != "null":
+                        resolved.add(prop)
             else:
-                item_schema_type = item_schema["type"]
+                item_schema_type = generate_json_schema(item)["type"]
         
         if merged_properties:
             return {"type": "array", "items": {"type": "object", "properties": merged_properties}}
@@ -100,8 +224,37 @@ def generate_json_schema(data: Any) -> Dict[str, Any]:
         return {"type": "string"}
     return {"type": "any"}
 
+def is_row_iterator(data: Any) -> bool:
+    """True for lazily produced rows (generators, iterators, map/filter objects) returned by GenerateReport."""
+    if isinstance(data, (list, tuple, dict, str, bytes, pd.DataFrame)):
+        return False
+    return hasattr(data, "__iter__") and hasattr(data, "__next__")
+
+def materialize_report_data(data: Any) -> Any:
+    """
+    Converts streaming-friendly results (DataFrame, generators) into plain lists of dicts
+    for consumers that need random access, such as Jinja templates.
+    """
+    if isinstance(data, pd.DataFrame):
+        return data.to_dict(orient="records")
+    if is_row_iterator(data):
+        return list(data)
+    return data
+
+def _bind_context(iterator, ctx: contextvars.Context):
+    """
+    Re-enters the execution context for every step of a lazy result, so generator bodies
+    can still use inner_database and other context-aware libs after execute() returns.
+    """
+    while True:
+        try:
+            item = ctx.run(next, iterator)
+        except StopIteration:
+            return
+        yield item
+
 def dict_to_namespace(d):
-    """Convert dict to SubscriptableNamespace recursively."""
+    """Convert dict to SubscriptableNamespace recursively (eagerly; see LazyNamespace)."""
     if isinstance(d, dict):
         return SubscriptableNamespace(**{k: dict_to_namespace(v) for k, v in d.items()})
     if isinstance(d, list):
@@ -225,7 +378,8 @@ SAFE_GLOBALS = {
         fill_template=common_lib.fill_template
     ),
     "inner_database": SimpleNamespace(
-        unsafe_request=database_lib.unsafe_request
+        unsafe_request=database_lib.unsafe_request,
+        query_df=database_lib.query_df
     ),
     "analytics": SimpleNamespace(
         process_request=analytics.process_analytics_request,
@@ -259,6 +413,7 @@ SAFE_GLOBALS = {
     ),
     "prompts": SimpleNamespace(
         add_prompt=prompt_lib.add_prompt,
+        add_prompts_bulk=prompt_lib.add_prompts_bulk,
         get_prompts_by_category_with_reference_id=prompt_lib.get_prompts_by_category_with_reference_id,
         get_prompts_by_category_with_id=prompt_lib.get_prompts_by_category_with_id,
         delete_prompts_by_period_and_entity=prompt_lib.delete_prompts_by_period_and_entity,
@@ -267,6 +422,7 @@ SAFE_GLOBALS = {
     "response_data": SimpleNamespace(
         clear_recent_records_by_entity_and_category=response_lib.clear_recent_records_by_entity_and_category,
         add_response=response_lib.add_response,
+        add_responses_bulk=response_lib.add_responses_bulk,
         update_response_meta=response_lib.update_response_meta,
         update_response_meta_by_key=response_lib.update_response_meta_by_key,
         get_responses_by_period_and_category=response_lib.get_responses_by_period_and_category
@@ -310,22 +466,20 @@ class ReportTransformer(RestrictingNodeTransformer):
         )
         return self.visit_Assign(assign_node)
 
+# Default of ReportExecutor.execute(previous_snapshot=...): not an incremental run
+_NO_SNAPSHOT = object()
+
 def safe_call_hook(fn, *args):
     """Call a hook function with as many arguments as it accepts (max len(args))."""
-    try:
-        # Try full arguments first
-        return fn(*args)
-    except TypeError as e:
-        msg = str(e)
-        if "takes" in msg and "positional argument" in msg:
-            # Try with fewer arguments if it failed due to argument count
+    for count in range(len(args), 0, -1):
+        try:
+            return fn(*args[:count])
+        except TypeError as e:
+            msg = str(e)
+            # Retry with fewer arguments only if it failed due to argument count
             # This is a bit heuristic but common for this type of plugin system
-            if len(args) > 1:
-                try:
-                    return fn(*args[:-1])
-                except TypeError:
-                    pass
-        raise
+            if count == 1 or not ("takes" in msg and "positional argument" in msg):
+                raise
 
 class ReportExecutor:
     class ReportPrintCollector:
@@ -349,11 +503,18 @@ class ReportExecutor:
     def log(self, message: str, level: str = "info"):
         self._restricted_print(f"[{level.upper()}] {message}")
 
-    def execute(self, parameters: dict, mode: str, user_context: dict = None, execution_id: str = None):
+    def execute(self, parameters: dict, mode: str, user_context: dict = None, execution_id: str = None, previous_snapshot=_NO_SNAPSHOT):
         """
         mode: 'is_design' or 'is_run'
         user_context: dict with user details (id, name, email, role, etc.)
+        previous_snapshot: for incremental reports, passed as the third GenerateReport argument
+        (None when there is no snapshot yet; see services/report_snapshots.py)
         """
+        # Lib calls of this run share one session (see internal_libs/session_lib.py)
+        with unit_of_work():
+            return self._execute(parameters, mode, user_context, execution_id, previous_snapshot)
+
+    def _execute(self, parameters: dict, mode: str, user_context: dict, execution_id: str, previous_snapshot):
         token = None
         params_token = None
         log_token = None
@@ -370,7 +531,8 @@ class ReportExecutor:
                 policy=ReportTransformer
             )
 
-            params_namespace = dict_to_namespace(parameters)
+            # Large JSON parameters (e.g. thousands of ids) are only wrapped where they are used
+            params_namespace = LazyNamespace(parameters)
 
             node_globals = {
                 **SAFE_GLOBALS,
@@ -379,7 +541,7 @@ class ReportExecutor:
                 "_getattr_": custom_getattr,
                 "_setattr_": Guards.guarded_setattr,
                 "_delattr_": Guards.guarded_delattr,
-                "UserExecutor": dict_to_namespace(user_context) if user_context else None,
+                "UserExecutor": LazyNamespace(user_context) if user_context else None,
                 "ReportExecutor": SubscriptableNamespace(id=execution_id) if execution_id else None,
                 "report_parameters": params_namespace,
                 "ReportParameters": params_namespace,
@@ -434,7 +596,10 @@ class ReportExecutor:
                 }
 
             gen_reason = None
-            result = safe_call_hook(gen_report_fn, processed_params, mode)
+            if previous_snapshot is _NO_SNAPSHOT:
+                result = safe_call_hook(gen_report_fn, processed_params, mode)
+            else:
+                result = safe_call_hook(gen_report_fn, processed_params, mode, previous_snapshot)
             
             # Support (data, success, reason), (data, success) and just data
             pdf_scale = 0.5
@@ -467,6 +632,12 @@ class ReportExecutor:
                     "console": self.console_output.getvalue()
                 }
 
+            if is_row_iterator(result_data):
+                ctx = contextvars.copy_context()
+                # The run's session is closed by then; lib calls open their own
+                ctx.run(db_session_context.set, None)
+                result_data = _bind_context(result_data, ctx)
+
             return {
                 "success": True,
                 "data": result_data,
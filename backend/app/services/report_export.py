@@ -0,0 +1,283 @@
+"""
+File exports for GenerateReport results.
+
+GenerateReport may return a list of dicts, a generator/iterator of dicts or a pandas
+DataFrame. Exports stream the rows in chunks so large results are never copied into
+one in-memory file. Columnar exports (Parquet, Arrow IPC) require pyarrow.
+"""
+import csv
+import io
+import itertools
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from .report_executor import is_row_iterator
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    ARROW_INSTALLED = True
+except Exception as e:
+    print(f"WARNING: Parquet/Arrow export disabled. Reason: {e}")
+    ARROW_INSTALLED = False
+
+CSV_CHUNK_ROWS = 1000
+ARROW_CHUNK_ROWS = 10000
+ARROW_COMPRESSIONS = {"zstd", "lz4", "snappy", "gzip", "none"}
+
+
+class RowSource:
+    """A single report's rows: either a DataFrame or an iterator of dicts with a known first row."""
+
+    def __init__(self, frame: Optional[pd.DataFrame] = None, rows: Optional[Iterator[dict]] = None, columns: Optional[List[str]] = None):
+        self.frame = frame
+        self.rows = rows
+        self.columns = columns or []
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.columns
+
+
+def prepare_rows(data: Any, allow_single_dict: bool = False, strict: bool = True) -> RowSource:
+    """
+    Validates report data for export without materialising it.
+    strict=True raises ValueError for non-tabular data; strict=False returns an empty source instead.
+    """
+    if isinstance(data, pd.DataFrame):
+        return RowSource(frame=data, columns=[str(c) for c in data.columns])
+
+    if isinstance(data, dict) and allow_single_dict:
+        return RowSource(rows=iter([data]), columns=list(data.keys()))
+
+    if isinstance(data, list) or is_row_iterator(data):
+        iterator = iter(data)
+        first = next(iterator, None)
+        if first is None:
+            return RowSource()
+        if isinstance(first, dict):
+            return RowSource(rows=itertools.chain([first], iterator), columns=list(first.keys()))
+
+    if strict:
+        raise ValueError("GenerateReport must return a list of dictionaries, a generator of dictionaries or a DataFrame for export")
+    return RowSource()
+
+
+def _drain(buf: io.StringIO) -> str:
+    chunk = buf.getvalue()
+    buf.seek(0)
+    buf.truncate(0)
+    return chunk
+
+
+def iter_csv(sources: Iterable[RowSource], chunk_rows: int = CSV_CHUNK_ROWS) -> Iterator[str]:
+    """
+    Yields CSV text in chunks of ~chunk_rows rows. The header comes from the first
+    non-empty source; later sources are aligned to it (missing columns are left blank).
+    """
+    columns: Optional[List[str]] = None
+    buf = io.StringIO()
+
+    for source in sources:
+        if source.is_empty:
+            continue
+        if columns is None:
+            columns = source.columns
+            csv.writer(buf).writerow(columns)
+
+        if source.frame is not None:
+            frame = source.frame
+            if [str(c) for c in frame.columns] != columns:
+                frame = frame.rename(columns=str).reindex(columns=columns)
+            for start in range(0, len(frame), chunk_rows):
+                frame.iloc[start:start + chunk_rows].to_csv(buf, header=False, index=False, lineterminator="\r\n")
+                yield _drain(buf)
+            continue
+
+        writer = csv.DictWriter(buf, fieldnames=columns, extrasaction="ignore")
+        for i, row in enumerate(source.rows, 1):
+            writer.writerow(row)
+            if i % chunk_rows == 0:
+                yield _drain(buf)
+
+    if buf.tell():
+        yield _drain(buf)
+
+
+# --- Columnar (Arrow / Parquet) ---
+
+def _json_schema_properties(json_schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Column types from a report's compiled schema_json (see generate_json_schema)."""
+    if not isinstance(json_schema, dict):
+        return {}
+    items = json_schema.get("items") if json_schema.get("type") == "array" else json_schema
+    if isinstance(items, dict) and isinstance(items.get("properties"), dict):
+        return items["properties"]
+    return {}
+
+
+def _arrow_type_for_json_schema(prop: Dict[str, Any]):
+    return {
+        "string": pa.string(),
+        "number": pa.float64(),
+        "boolean": pa.bool_(),
+    }.get((prop or {}).get("type"), pa.string())
+
+
+def _jsonify_nested(rows: List[dict]) -> List[dict]:
+    """Encodes dict/list cells as JSON text when they cannot be mapped to Arrow struct/list types."""
+    return [
+        {k: (json.dumps(v, default=str) if isinstance(v, (dict, list)) else v) for k, v in row.items()}
+        for row in rows
+    ]
+
+
+def _infer_arrow_schema(sample: List[dict], json_schema: Optional[Dict[str, Any]] = None) -> Tuple["pa.Schema", bool]:
+    """
+    Infers the Arrow schema from the first chunk of rows. Columns that are entirely null in
+    the sample take their type from the report's compiled JSON schema (or string).
+    Returns (schema, nested_as_json).
+    """
+    nested_as_json = False
+    try:
+        schema = pa.Table.from_pylist(sample).schema
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        nested_as_json = True
+        schema = pa.Table.from_pylist(_jsonify_nested(sample)).schema
+
+    properties = _json_schema_properties(json_schema)
+    fields = []
+    for field in schema:
+        if pa.types.is_null(field.type):
+            field = pa.field(field.name, _arrow_type_for_json_schema(properties.get(field.name)))
+        fields.append(field)
+    return pa.schema(fields), nested_as_json
+
+
+def _rows_to_batch(rows: List[dict], schema: "pa.Schema", nested_as_json: bool) -> "pa.RecordBatch":
+    if nested_as_json:
+        rows = _jsonify_nested(rows)
+    try:
+        return pa.RecordBatch.from_pylist(rows, schema=schema)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Values that Arrow won't coerce directly (e.g. ints arriving as strings); a lossy
+        # cast raises instead of silently corrupting data
+        table = pa.Table.from_pylist(rows)
+        arrays = [
+            table.column(f.name).cast(f.type).combine_chunks() if f.name in table.column_names else pa.nulls(len(rows), f.type)
+            for f in schema
+        ]
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def to_record_batches(source: RowSource, json_schema: Optional[Dict[str, Any]] = None, chunk_rows: int = ARROW_CHUNK_ROWS) -> Tuple["pa.Schema", Iterator["pa.RecordBatch"]]:
+    """
+    Converts a RowSource to an Arrow schema plus a lazy iterator of record batches.
+    The schema is fixed up front (from the DataFrame dtypes or the first chunk of rows).
+    """
+    if source.is_empty:
+        return pa.schema([]), iter(())
+
+    if source.frame is not None:
+        table = pa.Table.from_pandas(source.frame.rename(columns=str), preserve_index=False)
+        return table.schema, iter(table.to_batches(max_chunksize=chunk_rows))
+
+    first_chunk = list(itertools.islice(source.rows, chunk_rows))
+    schema, nested_as_json = _infer_arrow_schema(first_chunk, json_schema)
+
+    def batches():
+        chunk = first_chunk
+        while chunk:
+            yield _rows_to_batch(chunk, schema, nested_as_json)
+            chunk = list(itertools.islice(source.rows, chunk_rows))
+
+    return schema, batches()
+
+
+def concat_sources(sources: Iterable[Tuple[RowSource, Optional[Dict[str, Any]]]]) -> Tuple["pa.Schema", Iterator["pa.RecordBatch"]]:
+    """Builds one table per report and concatenates them, unifying differing schemas."""
+    tables = []
+    for source, json_schema in sources:
+        if source.is_empty:
+            continue
+        schema, batches = to_record_batches(source, json_schema)
+        tables.append(pa.Table.from_batches(list(batches), schema=schema))
+    if not tables:
+        return pa.schema([]), iter(())
+    table = pa.concat_tables(tables, promote_options="permissive")
+    return table.schema, iter(table.to_batches(max_chunksize=ARROW_CHUNK_ROWS))
+
+
+class _DrainableSink:
+    """Minimal write-only file object whose buffered bytes can be handed out between batches."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def resolve_compression(file_format: str, compression: Optional[str]) -> Optional[str]:
+    """Validates a user supplied codec name for 'parquet' or 'arrow'; raises ValueError."""
+    compression = (compression or "none").lower()
+    if compression not in ARROW_COMPRESSIONS:
+        raise ValueError(f"Unsupported compression '{compression}'. Use one of: {', '.join(sorted(ARROW_COMPRESSIONS))}")
+    if compression == "none":
+        return None
+    if file_format == "arrow":
+        if compression not in ("zstd", "lz4"):
+            raise ValueError("Arrow IPC streams only support 'zstd', 'lz4' or 'none' compression")
+        return "lz4_frame" if compression == "lz4" else compression
+    return compression
+
+
+def iter_parquet(schema: "pa.Schema", batches: Iterator["pa.RecordBatch"], codec: Optional[str] = "zstd") -> Iterator[bytes]:
+    """Yields a Parquet file batch by batch (one row group per batch)."""
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression=codec or "none")
+    try:
+        for batch in batches:
+            writer.write_batch(batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def iter_arrow_stream(schema: "pa.Schema", batches: Iterator["pa.RecordBatch"], codec: Optional[str] = "zstd") -> Iterator[bytes]:
+    """Yields an Arrow IPC stream (readable with pyarrow.ipc.open_stream)."""
+    sink = _DrainableSink()
+    writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema, options=pa.ipc.IpcWriteOptions(compression=codec))
+    try:
+        for batch in batches:
+            writer.write_batch(batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,145 @@
+"""
+Markdown rendering for report templates.
+
+Templates render markdown either with the `| markdown` filter or by wrapping output
+in <md>...</md>. Report cells (often AI generated text) mostly repeat between runs,
+so converted HTML is kept in an LRU keyed by the hash of the markdown text.
+
+<md> tags written in the template source are turned into `{% filter md_block %}`
+blocks when the template is compiled (MarkdownTagExtension), so each cell is
+converted while rendering instead of by a regex pass over the finished HTML.
+Tags that only appear in the rendered output (e.g. inside data values or
+{% raw %} blocks, or opened and closed in different template blocks) are still
+handled by render_md_tags.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict
+
+import markdown2
+from jinja2 import Environment, TemplateSyntaxError
+from jinja2.ext import Extension
+
+from ..core.config import MARKDOWN_CACHE_MAX_ENTRIES
+
+MARKDOWN_EXTRAS = ["tables", "fenced-code-blocks", "task_list"]
+
+
+class MarkdownCache:
+    """Thread-safe LRU of markdown -> HTML conversions."""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text: str) -> str:
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+
+        html = markdown2.markdown(text, extras=MARKDOWN_EXTRAS).strip()
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = html
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+markdown_cache = MarkdownCache(max_entries=MARKDOWN_CACHE_MAX_ENTRIES)
+
+
+def markdown_filter(text: Any) -> str:
+    """The `| markdown` Jinja filter."""
+    if not text:
+        return ""
+    return markdown_cache.render(str(text))
+
+
+def md_block_filter(text: Any) -> str:
+    """Body of an <md> block; unlike the filter, empty blocks still go through markdown."""
+    return markdown_cache.render(str(text))
+
+
+def render_md_tags(html: str) -> str:
+    """Converts <md>...</md> sections of rendered HTML in one left-to-right pass."""
+    parts = []
+    pos = 0
+    while True:
+        start = html.find("<md>", pos)
+        if start < 0:
+            break
+        end = html.find("</md>", start + 4)
+        if end < 0:
+            break
+        parts.append(html[pos:start])
+        parts.append(markdown_cache.render(html[start + 4:end]))
+        pos = end + 5
+    if not parts:
+        return html
+    parts.append(html[pos:])
+    return "".join(parts)
+
+
+class MarkdownTagExtension(Extension):
+    """Compiles <md>...</md> in template source to {% filter md_block %}...{% endfilter %}."""
+
+    def preprocess(self, source, name, filename=None):
+        if "<md>" not in source:
+            return source
+        start, end = self.environment.block_start_string, self.environment.block_end_string
+        # {% raw %} sections are output verbatim, so their tags are left to render_md_tags
+        raw_block = re.compile(
+            rf"{re.escape(start)}[-+]?\s*raw\s*[-+]?{re.escape(end)}.*?"
+            rf"(?:{re.escape(start)}[-+]?\s*endraw\s*[-+]?{re.escape(end)}|\Z)",
+            re.DOTALL,
+        )
+        parts = []
+        pos = 0
+        for match in raw_block.finditer(source):
+            parts.append(self._compile_tags(source[pos:match.start()], start, end))
+            parts.append(match.group(0))
+            pos = match.end()
+        parts.append(self._compile_tags(source[pos:], start, end))
+        return "".join(parts)
+
+    @staticmethod
+    def _compile_tags(source: str, start: str, end: str) -> str:
+        return (
+            source
+            .replace("<md>", f"{start} filter md_block {end}")
+            .replace("</md>", f"{start} endfilter {end}")
+        )
+
+
+def compile_report_template(source: str):
+    """Compiles a report template with the markdown filter and <md> blocks."""
+    env = Environment(extensions=[MarkdownTagExtension])
+    env.filters["markdown"] = markdown_filter
+    env.filters["md_block"] = md_block_filter
+    try:
+        return env.from_string(source)
+    except TemplateSyntaxError:
+        # <md> tags that don't nest with the template's blocks; render_md_tags handles them
+        plain_env = Environment()
+        plain_env.filters["markdown"] = markdown_filter
+        return plain_env.from_string(source)
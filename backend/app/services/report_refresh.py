@@ -0,0 +1,281 @@
+"""
+Scheduled report pre-computation.
+
+Reports that are opened by many users at the same time (morning dashboards) can be
+pre-run off-peak for a list of parameter sets. The schedule lives in ``Report.meta``:
+
+    {
+        "refresh_schedule": {
+            "times": ["05:00", "05:30"],          # daily, server local time
+            "parameter_sets": [{"client_id": 1}, {"client_id": 2}],  # default [{}]
+            "run_as": "reports-bot"               # username; default is the report creator
+        }
+    }
+
+A single background thread enqueues the parameter sets of every schedule slot that
+became due and generates them one after another as the run_as user (refresh=True).
+The result is stored in the global scope of the report cache (see
+report_cache.get_cache_settings for the TTL) and as a snapshot of the run_as user in
+ReportRun (see report_snapshots). Interactive /generate requests by any user for one
+of the listed parameter sets are then served from it, in other processes via the
+snapshot. Other parameters are cached with the report's own cache_scope.
+Slots that passed while the server was down are not caught up.
+
+The worker only runs with REPORT_REFRESH_ENABLED. On PostgreSQL the process holding
+an advisory lock enqueues the due slots, so several API processes can enable it.
+"""
+import contextvars
+import json
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from ..core.config import REPORT_REFRESH_DEFAULT_TIME, REPORT_REFRESH_POLL_SECONDS
+from ..core.database import SessionLocal, engine
+from ..internal_libs.context_lib import project_id_context
+from ..internal_libs.logger_lib import system_log
+from ..models.report import Report
+from ..models.user import User
+from . import report_snapshots
+
+# Arbitrary key of the PostgreSQL advisory lock held by the process that runs schedules
+REFRESH_LOCK_ID = 7_204_410_045
+
+def _parse_times(times: Any) -> List[Tuple[int, int]]:
+    if isinstance(times, str):
+        times = [times]
+    parsed = []
+    for value in times or [REPORT_REFRESH_DEFAULT_TIME]:
+        try:
+            hour, minute = (int(part) for part in str(value).split(":"))
+            if 0 <= hour < 24 and 0 <= minute < 60:
+                parsed.append((hour, minute))
+                continue
+        except ValueError:
+            pass
+        system_log(f"[REPORT_REFRESH] Ignoring invalid schedule time {value!r}", level="system")
+    return parsed
+
+
+def get_refresh_schedule(report) -> Optional[Dict[str, Any]]:
+    """Normalized refresh_schedule from Report.meta, or None if the report has none."""
+    meta = report.meta if isinstance(report.meta, dict) else {}
+    schedule = meta.get("refresh_schedule")
+    if not isinstance(schedule, dict):
+        return None
+    parameter_sets = schedule.get("parameter_sets") or [{}]
+    return {
+        "times": _parse_times(schedule.get("times")),
+        "parameter_sets": [p for p in parameter_sets if isinstance(p, dict)],
+        "run_as": schedule.get("run_as"),
+    }
+
+
+def is_scheduled(schedule: Optional[Dict[str, Any]], parameters: Optional[Dict[str, Any]]) -> bool:
+    """True if the parameter set is one the schedule pre-computes."""
+    return schedule is not None and (parameters or {}) in schedule["parameter_sets"]
+
+
+def get_run_as_user(db, report, schedule: Dict[str, Any]) -> Optional[User]:
+    """The user scheduled runs execute as: run_as, or the report creator."""
+    user = None
+    if schedule["run_as"]:
+        user = db.query(User).filter(User.username == schedule["run_as"]).first()
+    if user is None:
+        user = db.query(User).filter(User.id == report.created_by).first()
+    return user
+
+
+def is_due(times: List[Tuple[int, int]], since: datetime, until: datetime) -> bool:
+    """True if one of the daily times falls into (since, until]."""
+    day = since.date()
+    while day <= until.date():
+        for hour, minute in times:
+            slot = datetime(day.year, day.month, day.day, hour, minute)
+            if since < slot <= until:
+                return True
+        day += timedelta(days=1)
+    return False
+
+
+class ReportRefreshWorker:
+    def __init__(self, poll_seconds: int = 60):
+        self.poll_seconds = poll_seconds
+        self._queue: "queue.Queue[Optional[Tuple[str, str]]]" = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_runs: Dict[str, Dict[str, Any]] = {}
+        self._leader_conn = None
+        self.runs = 0
+        self.failures = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="report-refresh", daemon=True)
+            self._thread.start()
+
+    def shutdown(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            self._queue.put(None)
+            thread.join(timeout=5)
+
+    def enqueue(self, report_id, parameters: Dict[str, Any]) -> bool:
+        """Queues one parameter set of a report; False if it is already waiting."""
+        key = (str(report_id), json.dumps(parameters or {}, sort_keys=True, default=str))
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+        self._queue.put(key)
+        return True
+
+    def enqueue_report(self, report) -> int:
+        schedule = get_refresh_schedule(report)
+        if schedule is None:
+            return 0
+        return sum(self.enqueue(report.id, params) for params in schedule["parameter_sets"])
+
+    def enqueue_due(self, since: datetime, until: datetime) -> int:
+        """Queues every scheduled report with a slot in (since, until]."""
+        db = SessionLocal()
+        try:
+            # meta is free-form JSON, so schedules are filtered here rather than in SQL
+            rows = db.query(Report.id, Report.meta).all()
+        finally:
+            db.close()
+        queued = 0
+        for row in rows:
+            schedule = get_refresh_schedule(row)
+            if schedule and is_due(schedule["times"], since, until):
+                queued += sum(self.enqueue(row.id, params) for params in schedule["parameter_sets"])
+        return queued
+
+    def _is_leader(self) -> bool:
+        """
+        True if this process runs the schedules. On PostgreSQL that is the process whose
+        connection holds REFRESH_LOCK_ID; the lock is released when it closes or dies.
+        """
+        if engine.dialect.name != "postgresql":
+            return True
+        if self._leader_conn is not None:
+            try:
+                self._leader_conn.execute(text("SELECT 1"))
+                self._leader_conn.commit()
+                return True
+            except Exception:
+                self._release_leadership()
+        conn = engine.connect()
+        try:
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": REFRESH_LOCK_ID}).scalar()
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+        if not acquired:
+            conn.close()
+            return False
+        self._leader_conn = conn
+        system_log("[REPORT_REFRESH] This process now runs the refresh schedules", level="system")
+        return True
+
+    def _release_leadership(self):
+        conn, self._leader_conn = self._leader_conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _loop(self):
+        last_tick = datetime.now()
+        try:
+            while not self._stop.is_set():
+                try:
+                    key = self._queue.get(timeout=self.poll_seconds)
+                except queue.Empty:
+                    key = None
+                if key is not None:
+                    with self._lock:
+                        self._pending.discard(key)
+                    # Every job gets a fresh context (project id is set per report)
+                    contextvars.Context().run(self._run_job, key[0], json.loads(key[1]))
+
+                now = datetime.now()
+                if (now - last_tick).total_seconds() >= self.poll_seconds:
+                    try:
+                        if self._is_leader():
+                            self.enqueue_due(last_tick, now)
+                    except Exception as e:
+                        system_log(f"[REPORT_REFRESH] Schedule check failed: {e}", level="system")
+                    last_tick = now
+        finally:
+            self._release_leadership()
+
+    def _run_job(self, report_id: str, parameters: Dict[str, Any]):
+        # Report generation lives with the report endpoints
+        from ..routers.report import _generate_report_html
+
+        started = time.monotonic()
+        db = SessionLocal()
+        error = None
+        try:
+            report = db.query(Report).filter(Report.id == uuid.UUID(report_id)).first()
+            schedule = get_refresh_schedule(report) if report else None
+            # Only listed parameter sets are shared with every user
+            if not is_scheduled(schedule, parameters):
+                return
+            user = get_run_as_user(db, report, schedule)
+
+            project_id_context.set(str(report.project_id) if report.project_id else None)
+            user_context = {"id": str(user.id), "username": user.username, "role": str(user.role)}
+            res = _generate_report_html(report.id, parameters, db, user_context=user_context, refresh=True, scheduled=True)
+            if res.get("validation_error"):
+                error = res["validation_error"]
+            else:
+                report_snapshots.record_run(db, report.id, parameters, user.id, result=res, scheduled=True)
+        except Exception as e:
+            db.rollback()
+            error = getattr(e, "detail", None) or str(e)
+        finally:
+            db.close()
+
+        duration = round(time.monotonic() - started, 3)
+        with self._lock:
+            self.runs += 1
+            if error:
+                self.failures += 1
+            self._last_runs[report_id] = {
+                "finished_at": datetime.now().isoformat(timespec="seconds"),
+                "duration": duration,
+                "parameters": parameters,
+                "error": error,
+            }
+        if error:
+            system_log(f"[REPORT_REFRESH] Report {report_id} {parameters} failed: {error}", level="system")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self._thread is not None,
+                "leader": engine.dialect.name != "postgresql" or self._leader_conn is not None,
+                "queued": len(self._pending),
+                "runs": self.runs,
+                "failures": self.failures,
+                "last_runs": dict(self._last_runs),
+            }
+
+
+report_refresh = ReportRefreshWorker(poll_seconds=REPORT_REFRESH_POLL_SECONDS)
@@ -0,0 +1,185 @@
+"""
+Report result snapshots stored in ReportRun.result_snapshot.
+
+Snapshotting is opt-in per report through ``Report.meta``:
+
+    {
+        "snapshot": true,            # store data + HTML of every generated run
+        "incremental": "append",     # optional, implies "snapshot"; see below
+        "snapshot_scope": "user"     # "user" (default, falls back to cache_scope) or "global"
+    }
+
+Scheduled runs (services/report_refresh.py) are always snapshotted, under the
+schedule's run_as user; other processes serve the scheduled results from them.
+
+A snapshot is the zlib-compressed, base64-encoded JSON of
+``{"watermark", "data", "html", "pdf_scale"}``. The watermark is the time execution of the run
+started, so rows written while the report was running are picked up next time.
+
+Incremental reports get the latest snapshot for the same parameters as a third
+argument, ``GenerateReport(params, mode, previous)``, where ``previous`` is None or
+``{"data": [...], "watermark": "<ISO timestamp>", "run_id": "..."}``:
+
+- ``"incremental": true`` - GenerateReport returns the complete result and may reuse
+  ``previous["data"]``.
+- ``"incremental": "append"`` - GenerateReport returns only the rows newer than the
+  watermark; they are appended to the previous data.
+"""
+import base64
+import itertools
+import json
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from ..core.config import REPORT_SNAPSHOT_KEEP, REPORT_SNAPSHOT_MAX_BYTES
+from ..internal_libs.logger_lib import system_log
+from ..models.report import Report, ReportRun
+from .report_executor import is_row_iterator
+
+# Runs inspected when looking for the latest snapshot of a parameter set
+SNAPSHOT_SCAN_LIMIT = 50
+
+
+def get_snapshot_settings(report) -> Dict[str, Any]:
+    """Reads the snapshot configuration from Report.meta."""
+    meta = report.meta if isinstance(report.meta, dict) else {}
+    incremental = meta.get("incremental") or False
+    if incremental not in (False, "append"):
+        incremental = True
+    scope = meta.get("snapshot_scope") or meta.get("cache_scope") or "user"
+    return {
+        "enabled": bool(meta.get("snapshot")) or bool(incremental),
+        "incremental": incremental,
+        "scope": scope,
+    }
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _normalize(value: Any) -> str:
+    return json.dumps(value or {}, sort_keys=True, default=str, separators=(",", ":"))
+
+
+def _owner(scope: str, user_context: Optional[Dict[str, Any]]) -> Optional[uuid.UUID]:
+    if scope == "global" or not user_context or not user_context.get("id"):
+        return None
+    return uuid.UUID(str(user_context["id"]))
+
+
+def encode_snapshot(data: Any, html: Optional[str], watermark: Optional[datetime], pdf_scale: Optional[float] = None) -> str:
+    if isinstance(data, pd.DataFrame):
+        data = json.loads(data.to_json(orient="records", date_format="iso"))
+    payload = {
+        "watermark": watermark.isoformat() if watermark else None,
+        "data": data,
+        "html": html,
+        "pdf_scale": pdf_scale,
+    }
+    raw = json.dumps(payload, default=str, separators=(",", ":")).encode("utf-8")
+    return base64.b64encode(zlib.compress(raw, 6)).decode("ascii")
+
+
+def decode_snapshot(snapshot: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Returns {"watermark", "data", "html", "pdf_scale"} or None for empty/unreadable snapshots."""
+    if not snapshot:
+        return None
+    try:
+        return json.loads(zlib.decompress(base64.b64decode(snapshot)))
+    except (ValueError, zlib.error) as e:
+        system_log(f"[REPORT_SNAPSHOT] Unreadable snapshot skipped: {e}", level="system")
+        return None
+
+
+def _matching_run_ids(db: Session, report_id, parameters: Optional[Dict[str, Any]], owner: Optional[uuid.UUID], limit: int, since: Optional[datetime] = None):
+    """Newest first; only id/parameters are loaded, snapshots stay in the database."""
+    query = db.query(ReportRun.id, ReportRun.parameters_json).filter(
+        ReportRun.report_id == report_id,
+        ReportRun.result_snapshot.isnot(None),
+    )
+    if owner is not None:
+        query = query.filter(ReportRun.executed_by == owner)
+    if since is not None:
+        query = query.filter(ReportRun.executed_at >= since)
+    rows = query.order_by(ReportRun.executed_at.desc()).limit(limit).all()
+    if parameters is None:
+        return [row.id for row in rows]
+    wanted = _normalize(parameters)
+    return [row.id for row in rows if _normalize(row.parameters_json) == wanted]
+
+
+def latest_snapshot(db: Session, report_id, parameters: Optional[Dict[str, Any]] = None, user_context: Optional[Dict[str, Any]] = None, scope: str = "user", max_age: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    Latest snapshot of a report, optionally for one parameter set (None matches any)
+    and no older than max_age seconds.
+    Returns the decoded snapshot plus run_id/executed_at/parameters, or None.
+    """
+    since = utcnow() - timedelta(seconds=max_age) if max_age is not None else None
+    run_ids = _matching_run_ids(db, report_id, parameters, _owner(scope, user_context), SNAPSHOT_SCAN_LIMIT, since)
+    if not run_ids:
+        return None
+    run = db.query(ReportRun).filter(ReportRun.id == run_ids[0]).first()
+    snapshot = decode_snapshot(run.result_snapshot) if run else None
+    if snapshot is None:
+        return None
+    snapshot.update({
+        "run_id": str(run.id),
+        "executed_at": run.executed_at,
+        "parameters": run.parameters_json or {},
+    })
+    return snapshot
+
+
+def merge_incremental(previous_data: Any, data: Any) -> Any:
+    """Appends the rows of an "append" run to the previous snapshot's rows."""
+    if not previous_data:
+        return data
+    if isinstance(data, pd.DataFrame):
+        return pd.concat([pd.DataFrame(previous_data), data], ignore_index=True)
+    if is_row_iterator(data):
+        return itertools.chain(previous_data, data)
+    if isinstance(data, list) and isinstance(previous_data, list):
+        return previous_data + data
+    return data
+
+
+def record_run(db: Session, report_id, parameters: Dict[str, Any], user_id, result: Optional[Dict[str, Any]] = None, scheduled: bool = False) -> ReportRun:
+    """
+    Adds a ReportRun and commits. When `result` (from _generate_report_html) is given
+    and the report has snapshots enabled, its data and HTML are stored with the run.
+    Scheduled runs are stored even when snapshots are disabled.
+    """
+    # Already in the session's identity map after generation
+    report = db.get(Report, report_id)
+    run = ReportRun(
+        report_id=report_id,
+        executed_by=user_id,
+        parameters_json=parameters,
+        result_snapshot=None
+    )
+    settings = get_snapshot_settings(report) if report else {"enabled": False}
+    # Cache hits reproduce an already snapshotted result
+    if result and (settings["enabled"] or scheduled) and not result.get("validation_error") and not result.get("cache_hit"):
+        snapshot = encode_snapshot(result.get("data"), result.get("html"), result.get("watermark"), result.get("pdf_scale"))
+        if len(snapshot) > REPORT_SNAPSHOT_MAX_BYTES:
+            system_log(f"[REPORT_SNAPSHOT] {report.name}: snapshot of {len(snapshot)} bytes exceeds REPORT_SNAPSHOT_MAX_BYTES, not stored", level="system")
+        else:
+            run.result_snapshot = snapshot
+            # Explicit timestamp: sub-second precision orders runs written within the same second
+            run.executed_at = utcnow()
+    db.add(run)
+    db.flush()
+
+    if run.result_snapshot is not None and REPORT_SNAPSHOT_KEEP > 0:
+        owner = None if settings["scope"] == "global" else user_id
+        stale = _matching_run_ids(db, report_id, parameters, owner, SNAPSHOT_SCAN_LIMIT)[REPORT_SNAPSHOT_KEEP:]
+        if stale:
+            db.query(ReportRun).filter(ReportRun.id.in_(stale)).update({ReportRun.result_snapshot: None}, synchronize_session=False)
+    db.commit()
+    return run
@@ -0,0 +1,44 @@
+import sys
+import os
+import unittest
+
+import pandas as pd
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.report_executor import generate_json_schema
+
+class TestGenerateJsonSchema(unittest.TestCase):
+    def test_nullable_fields_take_first_non_null_type(self):
+        rows = [{"a": None, "b": 1}, {"a": "x", "c": [1]}, {"a": 5}]
+        self.assertEqual(generate_json_schema(rows), {
+            "type": "array",
+            "items": {"type": "object", "properties": {
+                "a": {"type": "string"},
+                "b": {"type": "number"},
+                "c": {"type": "array", "items": {"type": "number"}},
+            }},
+        })
+
+    def test_scalars_and_empty_lists(self):
+        self.assertEqual(generate_json_schema([]), {"type": "array", "items": {}})
+        self.assertEqual(generate_json_schema([1, 2]), {"type": "array", "items": {"type": "number"}})
+        self.assertEqual(generate_json_schema(None), {"type": "null"})
+
+    def test_dataframe_matches_records(self):
+        df = pd.DataFrame({
+            "i": [1, 2], "f": [1.5, None], "s": ["x", None], "b": [True, False],
+            "o": [None, None], "d": [{"k": 1}, None],
+        })
+        self.assertEqual(generate_json_schema(df), generate_json_schema(df.to_dict("records")))
+        self.assertEqual(generate_json_schema(pd.DataFrame()), {"type": "array", "items": {}})
+
+    def test_large_results_are_sampled_consistently(self):
+        rows = [{"id": i, "val": None if i < 5000 else i * 0.5} for i in range(100_000)]
+        schema = generate_json_schema(rows)
+        self.assertEqual(schema["items"]["properties"]["val"], {"type": "number"})
+        self.assertEqual(generate_json_schema(iter(rows)), schema)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import sys
+import os
+import unittest
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.report_executor import LazyNamespace, dict_to_namespace
+
+class TestLazyNamespace(unittest.TestCase):
+    def test_matches_eager_conversion(self):
+        data = {"a": {"b": [1, {"c": 2}]}, "ids": [1, 2, 3], "s": "x"}
+        lazy, eager = LazyNamespace(data), dict_to_namespace(data)
+        self.assertEqual(lazy.a.b[1].c, eager.a.b[1].c)
+        self.assertEqual(lazy["a"]["b"][0], 1)
+        self.assertEqual(lazy.get("missing", 5), 5)
+        self.assertEqual(lazy.to_dict(), data)
+
+    def test_mutations_stay_in_namespace(self):
+        data = {"f": {"status": "a"}, "ids": [1]}
+        ns = LazyNamespace(data)
+        ns.f.status = "b"
+        ns.ids.append(2)
+        ns["new"] = 1
+        self.assertEqual(ns.to_dict(), {"f": {"status": "b"}, "ids": [1, 2], "new": 1})
+        self.assertEqual(data, {"f": {"status": "a"}, "ids": [1]})
+
+if __name__ == "__main__":
+    unittest.main()
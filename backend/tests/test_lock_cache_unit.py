@@ -0,0 +1,74 @@
+import sys
+import os
+import uuid
+import unittest
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.locks import LockCache, lock_cache, raise_if_locked
+from app.models.lock import LockData
+
+class TestLockCache(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        LockData.__table__.create(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.queries = 0
+        event.listen(self.engine, "before_cursor_execute", self._count)
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def _count(self, *args):
+        self.queries += 1
+
+    def _lock(self, entity_id, entity_type="metadata"):
+        self.db.add(LockData(entity_id=entity_id, entity_type=entity_type))
+        self.db.commit()
+
+    def test_locked_ids_are_loaded_once_per_type(self):
+        locked, free = uuid.uuid4(), uuid.uuid4()
+        self._lock(locked)
+        cache = LockCache(ttl=60)
+        self.queries = 0
+        self.assertIn(locked, cache.locked_ids(self.db, "metadata"))
+        self.assertNotIn(free, cache.locked_ids(self.db, "metadata"))
+        self.assertEqual(cache.locked_ids(self.db, "reports"), frozenset())
+        self.assertEqual(self.queries, 2)
+
+    def test_invalidate_reloads_the_type(self):
+        entity_id = uuid.uuid4()
+        cache = LockCache(ttl=60)
+        self.assertNotIn(entity_id, cache.locked_ids(self.db, "metadata"))
+        self._lock(entity_id)
+        self.assertNotIn(entity_id, cache.locked_ids(self.db, "metadata"))
+        cache.invalidate("metadata")
+        self.assertIn(entity_id, cache.locked_ids(self.db, "metadata"))
+
+    def test_load_racing_an_invalidate_is_not_stored(self):
+        entity_id = uuid.uuid4()
+        cache = LockCache(ttl=60)
+        # The lock is toggled while the ids are being loaded
+        racing = lambda *args: cache.invalidate("metadata")
+        event.listen(self.engine, "after_cursor_execute", racing)
+        cache.locked_ids(self.db, "metadata")
+        event.remove(self.engine, "after_cursor_execute", racing)
+        self._lock(entity_id)
+        self.assertIn(entity_id, cache.locked_ids(self.db, "metadata"))
+
+    def test_raise_if_locked_reads_the_database(self):
+        entity_id = uuid.uuid4()
+        self.assertNotIn(entity_id, lock_cache.locked_ids(self.db, "metadata"))
+        self._lock(entity_id)
+        with self.assertRaises(HTTPException):
+            raise_if_locked(self.db, entity_id, "metadata")
+        lock_cache.invalidate()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import sys
+import os
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.database import Base
+from app.models.schema import Schema, MetadataRecord, MetadataClosure
+from app.services.metadata_tree import root_id, subtree_ids_with_schema, subtree_size
+
+class TestMetadataClosure(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=self.engine, tables=[Schema.__table__, MetadataRecord.__table__, MetadataClosure.__table__])
+        self.db = sessionmaker(bind=self.engine)()
+        self.a = Schema(key="a", content={})
+        self.b = Schema(key="b", content={})
+        self.db.add_all([self.a, self.b])
+        self.db.flush()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def _add(self, schema, parent=None):
+        record = MetadataRecord(schema_id=schema.id, parent_id=parent.id if parent else None, data={})
+        self.db.add(record)
+        self.db.flush()
+        return record
+
+    def test_closure_follows_inserts_moves_and_deletes(self):
+        root = self._add(self.a)
+        child = self._add(self.b, root)
+        grandchild = self._add(self.b, child)
+        other = self._add(self.a)
+        self.db.commit()
+        self.assertEqual(root_id(self.db, grandchild.id), root.id)
+        self.assertEqual(subtree_size(self.db, root.id), 2)
+        matches = self.db.execute(subtree_ids_with_schema([root.id], "b")).scalars().all()
+        self.assertEqual(set(matches), {child.id, grandchild.id})
+
+        child.parent_id = other.id
+        self.db.commit()
+        self.assertEqual(root_id(self.db, grandchild.id), other.id)
+        self.assertEqual(subtree_size(self.db, root.id), 0)
+        self.assertEqual(subtree_size(self.db, other.id), 2)
+
+        self.db.delete(child)
+        self.db.commit()
+        self.assertEqual(subtree_size(self.db, other.id), 0)
+        self.assertEqual(self.db.query(MetadataClosure).count(), 2)
+
+    def test_moving_under_a_descendant_is_refused(self):
+        root = self._add(self.a)
+        child = self._add(self.a, root)
+        self.db.commit()
+        root.parent_id = child.id
+        with self.assertRaises(ValueError):
+            self.db.commit()
+        self.db.rollback()
+
+if __name__ == "__main__":
+    unittest.main()
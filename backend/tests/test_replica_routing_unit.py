@@ -0,0 +1,55 @@
+import sys
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, text
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core import database
+from app.core.database import RoutingSession, replica_reads
+
+class TestReplicaRouting(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.primary = create_engine(f"sqlite:///{self.tmp.name}/primary.db")
+        self.replica = create_engine(f"sqlite:///{self.tmp.name}/replica.db")
+        for bind, label in ((self.primary, "primary"), (self.replica, "replica")):
+            with bind.begin() as conn:
+                conn.execute(text("CREATE TABLE items (name VARCHAR)"))
+                conn.execute(text("CREATE TABLE other (name VARCHAR)"))
+                conn.execute(text("INSERT INTO items VALUES (:n)"), {"n": label})
+                conn.execute(text("INSERT INTO other VALUES (:n)"), {"n": label})
+        self._previous = database.replica_engine
+        database.replica_engine = self.replica
+
+    def tearDown(self):
+        database.replica_engine = self._previous
+        self.primary.dispose()
+        self.replica.dispose()
+        self.tmp.cleanup()
+
+    def _source(self, db, table):
+        return db.execute(text(f"SELECT name FROM {table}")).scalars().all()
+
+    def test_reads_go_to_the_replica_only_when_allowed(self):
+        db = RoutingSession(bind=self.primary)
+        self.assertEqual(self._source(db, "items"), ["primary"])
+        with replica_reads(db):
+            self.assertEqual(self._source(db, "items"), ["replica"])
+            self.assertIs(db.get_bind(clause=text("SELECT name FROM items FOR UPDATE")), self.primary)
+        db.close()
+
+    def test_written_tables_stick_to_the_primary(self):
+        db = RoutingSession(bind=self.primary)
+        with replica_reads(db):
+            db.execute(text("INSERT INTO items VALUES ('new')"))
+            self.assertEqual(sorted(self._source(db, "items")), ["new", "primary"])
+            self.assertEqual(self._source(db, "other"), ["replica"])
+        db.rollback()
+        db.close()
+
+if __name__ == "__main__":
+    unittest.main()
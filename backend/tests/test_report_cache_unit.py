@@ -0,0 +1,87 @@
+import sys
+import os
+import unittest
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.report_cache import ReportResultCache, build_cache_key, get_cache_settings, invalidate_dependency, report_cache
+
+def _report(**overrides):
+    data = dict(id="r1", code="def GenerateReport(p): return []", template="<p></p>",
+                style_id=None, updated_at=None, meta={"cache_ttl": 60})
+    data.update(overrides)
+    return SimpleNamespace(**data)
+
+class TestReportCache(unittest.TestCase):
+    def test_key_ignores_param_order_and_tracks_code(self):
+        report = _report()
+        user = {"id": "u1"}
+        k1 = build_cache_key(report, {"a": 1, "b": 2}, user)
+        k2 = build_cache_key(report, {"b": 2, "a": 1}, user)
+        self.assertEqual(k1, k2)
+        self.assertNotEqual(k1, build_cache_key(_report(code="changed"), {"a": 1, "b": 2}, user))
+
+    def test_scope(self):
+        report = _report()
+        self.assertNotEqual(build_cache_key(report, {}, {"id": "u1"}), build_cache_key(report, {}, {"id": "u2"}))
+        self.assertEqual(
+            build_cache_key(report, {}, {"id": "u1"}, scope="global"),
+            build_cache_key(report, {}, {"id": "u2"}, scope="global")
+        )
+
+    def test_settings_default_disabled(self):
+        self.assertEqual(get_cache_settings(_report(meta=None))["ttl"], 0)
+        self.assertEqual(get_cache_settings(_report(meta={"cache_depends_on": "response"}))["depends_on"], ["response"])
+
+    def test_scheduled_reports_are_cached(self):
+        schedule = {"refresh_schedule": {"times": ["05:00"]}}
+        self.assertGreater(get_cache_settings(_report(meta=schedule))["ttl"], 0)
+        self.assertEqual(get_cache_settings(_report(meta={**schedule, "cache_ttl": 0}))["ttl"], 0)
+
+    def test_invalidation(self):
+        cache = ReportResultCache(max_entries=2)
+        cache.set("a", {"data": 1}, 60, "r1", ["response"])
+        cache.set("b", {"data": 2}, 60, "r2")
+        self.assertEqual(cache.get("a")["data"], 1)
+        cache.invalidate_dependency("response")
+        self.assertIsNone(cache.get("a"))
+        cache.invalidate_report("r2")
+        self.assertIsNone(cache.get("b"))
+
+    def _write_in_savepoint(self, db):
+        # A lib call inside an execution: its commit only releases a savepoint
+        db.execute(text("SELECT 1"))
+        savepoint = db.begin_nested()
+        savepoint.commit()
+        invalidate_dependency("response", db)
+
+    def test_dependency_invalidation_waits_for_the_outer_commit(self):
+        db = Session(create_engine("sqlite://"))
+        report_cache.set("a", {"data": 1}, 60, "r1", ["response"])
+        self._write_in_savepoint(db)
+        self.assertIsNotNone(report_cache.get("a"))
+        db.commit()
+        self.assertIsNone(report_cache.get("a"))
+
+        report_cache.set("a", {"data": 1}, 60, "r1", ["response"])
+        self._write_in_savepoint(db)
+        db.rollback()
+        db.commit()
+        self.assertIsNotNone(report_cache.get("a"))
+        report_cache.clear()
+        db.close()
+
+    def test_lru_bound(self):
+        cache = ReportResultCache(max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.set(key, {}, 60, key)
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+
+if __name__ == '__main__':
+    unittest.main()
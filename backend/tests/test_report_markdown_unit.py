@@ -0,0 +1,47 @@
+import sys
+import os
+import unittest
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from jinja2 import Environment
+
+from app.services.report_markdown import MarkdownTagExtension, compile_report_template, render_md_tags
+
+def _preprocess(source):
+    return Environment(extensions=[MarkdownTagExtension]).preprocess(source)
+
+def _render(source, **context):
+    # Same steps as report generation
+    html = compile_report_template(source).render(**context)
+    return render_md_tags(html) if "<md>" in html else html
+
+class TestReportMarkdown(unittest.TestCase):
+    def test_filter(self):
+        self.assertEqual(_render("{{ text | markdown }}", text="**x**"), "<p><strong>x</strong></p>")
+        self.assertEqual(_render("{{ text | markdown }}", text=""), "")
+
+    def test_md_block(self):
+        source = "{% for row in rows %}<md>**{{ row }}**</md>{% endfor %}"
+        self.assertEqual(_render(source, rows=["a", "b"]), "<p><strong>a</strong></p><p><strong>b</strong></p>")
+        self.assertEqual(_preprocess("<md>x</md>"), "{% filter md_block %}x{% endfilter %}")
+
+    def test_md_tags_in_data(self):
+        self.assertEqual(_render("{{ cell }}", cell="<md>*y*</md>"), "<p><em>y</em></p>")
+
+    def test_raw_block_is_left_verbatim(self):
+        source = "<md>a</md>{% raw %}<md>b</md>{% endraw %}"
+        self.assertEqual(_preprocess(source), "{% filter md_block %}a{% endfilter %}{% raw %}<md>b</md>{% endraw %}")
+        self.assertEqual(_render("{% raw %}<md>**x**</md>{% endraw %}"), "<p><strong>x</strong></p>")
+        self.assertEqual(
+            _render("<md>*a*</md>{%- raw -%} {{ <md>b</md> }} {%- endraw %}"),
+            "<p><em>a</em></p>{{ <p>b</p> }}"
+        )
+
+    def test_tags_across_blocks_fall_back(self):
+        source = "{% if flag %}<md>**x**{% endif %}</md>"
+        self.assertEqual(_render(source, flag=True), "<p><strong>x</strong></p>")
+
+if __name__ == '__main__':
+    unittest.main()